@@ -4,7 +4,8 @@ Demand Alerts Admin Configuration
 
 from django.contrib import admin
 from django.utils import timezone
-from .models import DemandAlert
+from .models import DemandAlert, DemandHotspot
+from . import services
 
 
 @admin.register(DemandAlert)
@@ -74,15 +75,43 @@ class DemandAlertAdmin(admin.ModelAdmin):
     
     def mark_as_dispatched(self, request, queryset):
         """Bulk action to mark alerts as dispatched"""
-        updated = queryset.update(status='dispatched')
+        updated = services.transition(queryset, 'dispatched')
         self.message_user(request, f"{updated} alert(s) marked as dispatched.")
     mark_as_dispatched.short_description = "Mark selected as Dispatched"
     
     def mark_as_resolved(self, request, queryset):
         """Bulk action to mark alerts as resolved"""
-        count = 0
-        for alert in queryset:
-            alert.mark_resolved()
-            count += 1
-        self.message_user(request, f"{count} alert(s) marked as resolved.")
-    mark_as_resolved.short_description = "Mark selected as Resolved"
\ No newline at end of file
+        updated = services.resolve(queryset)
+        self.message_user(request, f"{updated} alert(s) marked as resolved.")
+    mark_as_resolved.short_description = "Mark selected as Resolved"
+
+
+@admin.register(DemandHotspot)
+class DemandHotspotAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for DemandHotspot model (read-only)
+    """
+    list_display = (
+        'stop',
+        'report_count',
+        'reporter_count',
+        'max_people',
+        'median_people',
+        'first_reported_at',
+        'last_reported_at',
+        'expires_at',
+        'closed_at'
+    )
+    list_filter = ('stop__route', 'first_reported_at')
+    search_fields = ('stop__name', 'stop__route__number')
+    date_hierarchy = 'first_reported_at'
+    ordering = ('-last_reported_at',)
+    exclude = ('people_counts', 'reporters', 'version')
+    readonly_fields = list_display
+    
+    def get_queryset(self, request):
+        """Optimize queries"""
+        return super().get_queryset(request).select_related('stop', 'stop__route')
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,366 @@
+"""
+Demand Anomaly Detection
+Streaming detector flagging stops whose demand deviates sharply from
+their usual level for that hour of the week
+
+Crowd reports (people waiting, at report time) and pre-informs
+(passengers, at travel time) are added to per stop and hour buckets.
+Once an hour has passed its bucket is folded into an exponentially
+weighted mean and variance for its hour-of-week slot; a stop with no
+demand in that hour folds a zero, so quiet hours pull the mean down.
+Open buckets, including upcoming hours that pre-informs already fill,
+are scored against those statistics.
+
+A process without a snapshot rebuilds its statistics from the stored
+reports and demand cube cells the first time it uses the detector.
+"""
+
+import logging
+import math
+import os
+import pickle
+import tempfile
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from routes.models import Stop
+from preinforms.models import DemandCell
+from .models import DemandAlert
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+# EWMA smoothing factor for the per-slot mean and variance
+ALPHA = 0.2
+
+# Standard deviations from the mean before a bucket is flagged
+THRESHOLD = 3.0
+
+# Folded hours a slot needs before it can be flagged
+MIN_HISTORY = 4
+
+# Floor on the standard deviation, so quiet slots are not flagged for
+# a handful of extra people
+MIN_STDDEV = 2.0
+
+# Weeks of stored demand folded when there is no snapshot; enough for
+# every slot to reach MIN_HISTORY
+SEED_WEEKS = MIN_HISTORY
+
+
+def slot(date, hour):
+    """Hour-of-week index, Monday 00:00 = 0"""
+    return date.weekday() * 24 + hour
+
+
+def hour_start(date, hour):
+    return datetime.combine(date, dt_time(hour))
+
+
+class StopStats:
+    """
+    EWMA statistics of one stop for every hour of the week
+    """
+    __slots__ = ('mean', 'var', 'seen')
+
+    def __init__(self):
+        self.mean = array('d', [0.0]) * HOURS_PER_WEEK
+        self.var = array('d', [0.0]) * HOURS_PER_WEEK
+        self.seen = array('H', [0]) * HOURS_PER_WEEK
+
+    def fold(self, index, value):
+        """Add one completed hour to a slot's mean and variance"""
+        if not self.seen[index]:
+            self.mean[index] = value
+        else:
+            diff = value - self.mean[index]
+            increment = ALPHA * diff
+            self.mean[index] += increment
+            self.var[index] = (1 - ALPHA) * (self.var[index] + diff * increment)
+        if self.seen[index] < 65535:
+            self.seen[index] += 1
+
+    def score(self, index, value):
+        """Deviation from normal in standard deviations, or None without history"""
+        if self.seen[index] < MIN_HISTORY:
+            return None
+        stddev = max(math.sqrt(self.var[index]), MIN_STDDEV)
+        return (value - self.mean[index]) / stddev
+
+
+class AnomalyDetector:
+    """
+    Per-stop statistics plus the totals of hours still open
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.buckets = {}
+        # Start of the first hour not folded yet
+        self.folded_until = None
+        self._loaded = False
+        self._snapshot_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self.load()
+
+    def observe(self, stop_id, date, hour, value):
+        """
+        Add demand for a stop in one hour; O(1)
+
+        A negative value takes demand back. Hours already folded
+        are left alone.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self.folded_until and hour_start(date, hour) < self.folded_until:
+                return
+            key = (stop_id, date, hour)
+            total = self.buckets.get(key, 0) + value
+            if total > 0:
+                self.buckets[key] = total
+            else:
+                self.buckets.pop(key, None)
+        self._maybe_snapshot()
+
+    def observe_alert(self, alert):
+        created = timezone.localtime(alert.created_at)
+        self.observe(alert.stop_id, created.date(), created.hour, alert.number_of_people)
+
+    def observe_preinform(self, preinform):
+        self.observe(
+            preinform.boarding_stop_id,
+            preinform.date_of_travel,
+            preinform.desired_time.hour,
+            preinform.passenger_count
+        )
+
+    def apply_change(self, old, new):
+        """
+        Move demand when a pre-inform is edited, cancelled or deleted
+
+        Args:
+            old, new: Demand cube contributions, either may be None
+        """
+        if old == new:
+            return
+        if old:
+            (_, stop_id, date, hour), passengers = old
+            self.observe(stop_id, date, hour, -passengers)
+        if new:
+            (_, stop_id, date, hour), passengers = new
+            self.observe(stop_id, date, hour, passengers)
+
+    def fold_closed(self, now=None):
+        """
+        Fold hours that have ended into the statistics
+
+        Every stop with statistics folds each ended hour, as a zero
+        when it had no demand. At most a week of skipped hours is
+        folded, so a long pause does not stall the caller.
+
+        Returns:
+            int: Number of slots folded
+        """
+        now = timezone.localtime(now or timezone.now())
+        current = hour_start(now.date(), now.hour)
+        folded = 0
+        with self._lock:
+            self._ensure_loaded()
+            ended = max(
+                self.folded_until or current,
+                current - timedelta(hours=HOURS_PER_WEEK)
+            )
+            while ended < current:
+                date, index = ended.date(), slot(ended.date(), ended.hour)
+                for stop_id, stats in self.stats.items():
+                    stats.fold(index, self.buckets.pop((stop_id, date, ended.hour), 0))
+                folded += len(self.stats)
+                ended += timedelta(hours=1)
+
+            # Whatever is left belongs to stops seen for the first time,
+            # or to hours before the window above
+            closed = [key for key in self.buckets if hour_start(key[1], key[2]) < current]
+            for key in closed:
+                stop_id, date, hour = key
+                stats = self.stats.get(stop_id)
+                if stats is None:
+                    stats = self.stats[stop_id] = StopStats()
+                stats.fold(slot(date, hour), self.buckets.pop(key))
+            self.folded_until = current
+        return folded + len(closed)
+
+    def anomalies(self, now=None, threshold=THRESHOLD):
+        """
+        Open hours whose demand is far above normal, highest score first
+
+        Returns:
+            list: dicts with stop_id, date, hour, demand, expected and score
+        """
+        self.fold_closed(now)
+        flagged = []
+        with self._lock:
+            for (stop_id, date, hour), value in self.buckets.items():
+                stats = self.stats.get(stop_id)
+                if stats is None:
+                    continue
+                index = slot(date, hour)
+                score = stats.score(index, value)
+                if score is not None and score >= threshold:
+                    flagged.append({
+                        'stop_id': stop_id,
+                        'date': date,
+                        'hour': hour,
+                        'demand': value,
+                        'expected': round(stats.mean[index], 1),
+                        'score': round(score, 2),
+                    })
+        flagged.sort(key=lambda row: row['score'], reverse=True)
+        return flagged
+
+    # Snapshots
+
+    def _snapshot_path(self):
+        return getattr(settings, 'ANOMALY_SNAPSHOT_PATH', None)
+
+    def _maybe_snapshot(self):
+        interval = getattr(settings, 'ANOMALY_SNAPSHOT_SECONDS', 300)
+        if not self._snapshot_path() or time.monotonic() - self._snapshot_at < interval:
+            return
+        self._snapshot_at = time.monotonic()
+        threading.Thread(target=self.snapshot, name='demand-anomaly-snapshot', daemon=True).start()
+
+    def snapshot(self):
+        """Write the detector state to ANOMALY_SNAPSHOT_PATH atomically"""
+        path = self._snapshot_path()
+        if not path:
+            return
+        with self._lock:
+            state = {
+                'stats': {
+                    stop_id: (stats.mean.tobytes(), stats.var.tobytes(), stats.seen.tobytes())
+                    for stop_id, stats in self.stats.items()
+                },
+                'buckets': dict(self.buckets),
+                'folded_until': self.folded_until,
+            }
+        try:
+            directory = os.path.dirname(os.fspath(path)) or '.'
+            with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as handle:
+                pickle.dump(state, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(handle.name, path)
+        except OSError:
+            logger.exception("Could not write demand anomaly snapshot to %s", path)
+
+    def load(self):
+        """Restore state from the last snapshot, or seed it from the database"""
+        path = self._snapshot_path()
+        if not path or not os.path.exists(path):
+            self.seed()
+            return
+        try:
+            with open(path, 'rb') as handle:
+                state = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            logger.exception("Could not read demand anomaly snapshot from %s", path)
+            return
+
+        for stop_id, (mean, var, seen) in state['stats'].items():
+            stats = StopStats()
+            stats.mean = array('d')
+            stats.mean.frombytes(mean)
+            stats.var = array('d')
+            stats.var.frombytes(var)
+            stats.seen = array('H')
+            stats.seen.frombytes(seen)
+            self.stats[stop_id] = stats
+        for key, value in state['buckets'].items():
+            self.buckets[key] = self.buckets.get(key, 0) + value
+        self.folded_until = state.get('folded_until')
+
+    def seed(self, now=None):
+        """
+        Fold the last SEED_WEEKS of stored demand into the statistics
+
+        Hours are folded in order, zeros included, as if the detector
+        had been running. Open hours are left to the signals, which
+        add every report and pre-inform as it is saved. Called with
+        the lock held.
+        """
+        now = timezone.localtime(now or timezone.now())
+        current = hour_start(now.date(), now.hour)
+        start = current - timedelta(weeks=SEED_WEEKS)
+
+        history = defaultdict(int)
+        alerts = DemandAlert.objects.filter(
+            created_at__gte=timezone.make_aware(start),
+            created_at__lt=timezone.make_aware(current)
+        ).annotate(
+            day=TruncDate('created_at'),
+            hour=ExtractHour('created_at')
+        ).values('stop_id', 'day', 'hour').annotate(
+            people=Sum('number_of_people')
+        ).order_by()
+        for row in alerts:
+            history[(row['stop_id'], row['day'], row['hour'])] += row['people']
+
+        cells = DemandCell.objects.filter(
+            date__gte=start.date(),
+            date__lte=current.date()
+        ).values('boarding_stop_id', 'date', 'hour').annotate(
+            passengers=Sum('passenger_count')
+        ).order_by()
+        for row in cells:
+            if start <= hour_start(row['date'], row['hour']) < current:
+                history[(row['boarding_stop_id'], row['date'], row['hour'])] += row['passengers']
+
+        if not history:
+            return
+        for stop_id, _, _ in history:
+            if stop_id not in self.stats:
+                self.stats[stop_id] = StopStats()
+
+        ended = start
+        while ended < current:
+            date, index = ended.date(), slot(ended.date(), ended.hour)
+            for stop_id, stats in self.stats.items():
+                stats.fold(index, history.get((stop_id, date, ended.hour), 0))
+            ended += timedelta(hours=1)
+        self.folded_until = current
+
+    def clear(self):
+        with self._lock:
+            self.stats.clear()
+            self.buckets.clear()
+            self.folded_until = None
+
+
+detector = AnomalyDetector()
+
+
+def ranked_anomalies(limit=20, threshold=THRESHOLD):
+    """
+    Flagged stops with their names, highest score first
+
+    Returns:
+        list: anomaly dicts with stop_name and route_id added
+    """
+    flagged = detector.anomalies(threshold=threshold)[:limit]
+    stops = Stop.objects.in_bulk({row['stop_id'] for row in flagged})
+    for row in flagged:
+        stop = stops.get(row['stop_id'])
+        row['stop_name'] = stop.name if stop else None
+        row['route_id'] = stop.route_id if stop else None
+    return flagged
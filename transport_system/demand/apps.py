@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DemandConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "demand"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,167 @@
+"""
+Dispatch Recommendations
+Matches open crowd reports to buses with spare seats that are about
+to pass the stop
+
+Stops have no coordinates, so proximity is measured along the route:
+a trip's position is interpolated from its departure and arrival times
+and its cost for a stop is the time until it passes it. Trips come from
+the compiled timetables, whose seat counts are patched in place on
+every booking, so each call only queries the open alerts and the buses
+it recommends.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from schedules import timetable
+from schedules.models import Schedule
+from .models import DemandAlert
+
+
+def _lookahead_seconds():
+    return getattr(settings, 'DISPATCH_LOOKAHEAD_MINUTES', 60) * 60
+
+
+def open_demand(now=None):
+    """
+    Waiting passengers per stop from open alerts
+
+    Returns:
+        list: dicts with stop_id, stop_name, route_id, distance,
+              total_distance, people and alerts
+    """
+    return list(
+        DemandAlert.objects.active(now).values('stop_id').annotate(
+            stop_name=F('stop__name'),
+            route_id=F('stop__route_id'),
+            distance=F('stop__distance_from_origin'),
+            total_distance=F('stop__route__total_distance'),
+            people=Max('number_of_people'),
+            alerts=Count('id')
+        ).order_by('-people')
+    )
+
+
+def candidate_trips(compiled, demand, now_seconds, lookahead):
+    """
+    Trips with seats that serve a stop and pass it within the lookahead
+
+    Yields:
+        tuple: (seconds until the trip passes the stop, trip position,
+                kilometres between the bus and the stop)
+    """
+    total = float(demand['total_distance']) or 1.0
+    fraction = min(max(float(demand['distance']) / total, 0.0), 1.0)
+    stop_bit = compiled.pattern.bit(demand['stop_id'])
+
+    for index in range(len(compiled)):
+        departure = compiled.departures[index]
+        if departure > now_seconds + lookahead:
+            break  # Departures are sorted
+        if not compiled.stop_masks[index] & stop_bit or compiled.available_seats[index] <= 0:
+            continue
+
+        arrival = compiled.arrivals[index]
+        if arrival < departure:
+            arrival += 86400
+        passes_at = departure + (arrival - departure) * fraction
+        eta = passes_at - now_seconds
+        if not 0 <= eta <= lookahead:
+            continue
+
+        progress = min(max((now_seconds - departure) / ((arrival - departure) or 1), 0.0), 1.0)
+        yield eta, index, float(demand['distance']) - progress * total
+
+
+def recommend(now=None):
+    """
+    Assign buses to open demand, nearest first
+
+    Greedy over (stop, trip) pairs in order of time to reach the stop:
+    each pair takes as many waiting passengers as the trip still has
+    seats for. A trip can pick up at several stops along its run, and a
+    large crowd can be split over several trips.
+
+    Returns:
+        list: One dict per stop with the assigned trips and how many
+              passengers are left unserved
+    """
+    now = timezone.localtime(now or timezone.now())
+    now_seconds = timetable.time_to_seconds(now.time())
+    lookahead = _lookahead_seconds()
+
+    demands = open_demand(now)
+    by_route = defaultdict(list)
+    for position, demand in enumerate(demands):
+        by_route[demand['route_id']].append(position)
+
+    compiled_by_route = {}
+    pairs = []
+    for route_id, positions in by_route.items():
+        compiled = compiled_by_route[route_id] = timetable.get_timetable(route_id, now.date())
+        for position in positions:
+            for eta, index, distance in candidate_trips(compiled, demands[position], now_seconds, lookahead):
+                pairs.append((eta, position, route_id, index, distance))
+    pairs.sort(key=lambda pair: pair[0])
+
+    waiting = [demand['people'] for demand in demands]
+    seats = {}
+    assignments = defaultdict(list)
+    for eta, position, route_id, index, distance in pairs:
+        if not waiting[position]:
+            continue
+        compiled = compiled_by_route[route_id]
+        key = (route_id, index)
+        free = seats.setdefault(key, compiled.available_seats[index])
+        if not free:
+            continue
+
+        taken = min(free, waiting[position])
+        seats[key] = free - taken
+        waiting[position] -= taken
+        assignments[position].append({
+            'schedule_id': compiled.schedule_ids[index],
+            'eta_minutes': round(eta / 60, 1),
+            'distance_km': round(distance, 2),
+            'seats_offered': taken,
+        })
+
+    # Bus details only for recommended trips
+    schedule_ids = {trip['schedule_id'] for trips in assignments.values() for trip in trips}
+    buses = {
+        row['id']: row
+        for row in Schedule.objects.filter(id__in=schedule_ids).values(
+            'id', 'bus_id',
+            number_plate=F('bus__number_plate'),
+            latitude=F('bus__current_latitude'),
+            longitude=F('bus__current_longitude'),
+            location_updated_at=F('bus__last_location_update'),
+        )
+    }
+
+    recommendations = []
+    for position, demand in enumerate(demands):
+        trips = assignments.get(position, [])
+        for trip in trips:
+            bus = buses.get(trip['schedule_id'], {})
+            trip.update({
+                'bus_id': bus.get('bus_id'),
+                'number_plate': bus.get('number_plate'),
+                'latitude': bus.get('latitude'),
+                'longitude': bus.get('longitude'),
+                'location_updated_at': bus.get('location_updated_at'),
+            })
+        recommendations.append({
+            'stop_id': demand['stop_id'],
+            'stop_name': demand['stop_name'],
+            'route_id': demand['route_id'],
+            'people_waiting': demand['people'],
+            'alerts': demand['alerts'],
+            'assignments': trips,
+            'unserved': waiting[position],
+        })
+    return recommendations
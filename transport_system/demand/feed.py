@@ -0,0 +1,58 @@
+"""
+Active Demand Alert Feed
+Builds the control room's list of open alerts with a fixed number of
+queries and shares it through the cache
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Value
+from django.utils import timezone
+
+from .models import DemandAlert
+from .serializers import ActiveDemandAlertSerializer
+
+CACHE_KEY = 'demand-alerts:active'
+
+
+def active_alerts(now=None):
+    """
+    Open alerts with their reporter, stop and route joined in, and the
+    time left until expiry computed by the database
+    """
+    now = now or timezone.now()
+    return DemandAlert.objects.active(now).select_related(
+        'user', 'stop', 'stop__route'
+    ).annotate(
+        remaining=ExpressionWrapper(
+            F('expires_at') - Value(now, output_field=DateTimeField()),
+            output_field=DurationField()
+        )
+    ).order_by('-created_at')
+
+
+def build():
+    alerts = ActiveDemandAlertSerializer(active_alerts(), many=True).data
+    return {
+        'total_active_alerts': len(alerts),
+        'alerts': alerts,
+    }
+
+
+def get_active_feed():
+    """
+    Get the open alert payload, shared by every caller for a few seconds
+
+    Returns:
+        dict: total_active_alerts and alerts
+    """
+    payload = cache.get(CACHE_KEY)
+    if payload is None:
+        payload = build()
+        cache.set(CACHE_KEY, payload, getattr(settings, 'ACTIVE_ALERTS_CACHE_TTL', 5))
+    return payload
+
+
+def invalidate():
+    """Drop the cached payload after alerts change"""
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,234 @@
+"""
+Demand Hotspots
+Merges crowd reports for the same stop within a sliding window and
+serves the open hotspots from memory
+
+A stop has at most one open hotspot. It is closed when its window
+lapses or when none of its reports is still active, and a later
+report starts a new one. The statistics are kept in bounded form:
+a histogram of number_of_people and the first MAX_REPORTERS
+reporters, so a busy stop does not grow its row without limit.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ACTIVE_STATUSES, DemandAlert, DemandHotspot
+
+logger = logging.getLogger(__name__)
+
+# Optimistic merge attempts before giving up on a contended hotspot
+MAX_ATTEMPTS = 5
+
+# Distinct reporters remembered per hotspot; reporter_count stops here
+MAX_REPORTERS = 50
+
+# Larger crowds share the top histogram bucket; max_people stays exact
+MAX_PEOPLE_BUCKET = 500
+
+
+def window():
+    return timedelta(minutes=getattr(settings, 'HOTSPOT_WINDOW_MINUTES', 15))
+
+
+def histogram_median(people_counts):
+    """
+    Median of a {number_of_people: reports} histogram
+
+    JSON keys are strings, so the buckets are sorted numerically.
+    """
+    total = sum(people_counts.values())
+    if not total:
+        return 0
+    middle = ((total - 1) // 2, total // 2)
+    values = []
+    seen = 0
+    for people in sorted(people_counts, key=int):
+        seen += people_counts[people]
+        while len(values) < 2 and seen > middle[len(values)]:
+            values.append(int(people))
+        if len(values) == 2:
+            break
+    return sum(values) / 2
+
+
+def initial_stats(alert):
+    """Field values for a hotspot started by one report"""
+    return {
+        'first_reported_at': alert.created_at,
+        'last_reported_at': alert.created_at,
+        'expires_at': alert.expires_at,
+        'report_count': 1,
+        'reporter_count': 1,
+        'max_people': alert.number_of_people,
+        'median_people': alert.number_of_people,
+        'people_counts': {str(min(alert.number_of_people, MAX_PEOPLE_BUCKET)): 1},
+        'reporters': [alert.user_id],
+    }
+
+
+def merged_stats(hotspot, alert):
+    """
+    Hotspot statistics with one more report added
+
+    Returns:
+        dict: Field values for the hotspot update
+    """
+    people_counts = dict(hotspot.people_counts)
+    bucket = str(min(alert.number_of_people, MAX_PEOPLE_BUCKET))
+    people_counts[bucket] = people_counts.get(bucket, 0) + 1
+
+    reporters = hotspot.reporters
+    if alert.user_id not in reporters and len(reporters) < MAX_REPORTERS:
+        reporters = reporters + [alert.user_id]
+
+    return {
+        'last_reported_at': max(hotspot.last_reported_at, alert.created_at),
+        'expires_at': max(hotspot.expires_at, alert.expires_at),
+        'report_count': hotspot.report_count + 1,
+        'reporter_count': len(reporters),
+        'max_people': max(hotspot.max_people, alert.number_of_people),
+        'median_people': histogram_median(people_counts),
+        'people_counts': people_counts,
+        'reporters': reporters,
+    }
+
+
+def record_report(alert):
+    """
+    Merge a new crowd report into its stop's hotspot
+
+    Merges are compare-and-set updates on the hotspot version, so
+    concurrent reports retry instead of overwriting each other. The
+    one-open-hotspot-per-stop constraint makes concurrent reports that
+    both find no open hotspot retry as a merge.
+
+    Returns:
+        DemandHotspot: The hotspot the report was merged into, or None
+                       if it stayed contended for MAX_ATTEMPTS tries
+    """
+    cutoff = alert.created_at - window()
+    open_hotspots = DemandHotspot.objects.filter(stop_id=alert.stop_id, closed_at__isnull=True)
+
+    hotspot = None
+    for _ in range(MAX_ATTEMPTS):
+        current = open_hotspots.first()
+        if current is None:
+            try:
+                with transaction.atomic():
+                    hotspot = DemandHotspot.objects.create(stop_id=alert.stop_id, **initial_stats(alert))
+                break
+            except IntegrityError:
+                # Another report opened the stop's hotspot first
+                continue
+
+        if current.last_reported_at < cutoff:
+            # Window lapsed: close it and start a new one
+            open_hotspots.filter(pk=current.pk).update(
+                closed_at=alert.created_at, version=F('version') + 1
+            )
+            continue
+
+        stats = merged_stats(current, alert)
+        updated = open_hotspots.filter(
+            pk=current.pk,
+            version=current.version
+        ).update(version=F('version') + 1, **stats)
+        if updated:
+            for name, value in stats.items():
+                setattr(current, name, value)
+            current.version += 1
+            hotspot = current
+            break
+
+    if hotspot is None:
+        logger.warning("Demand alert %s not merged: hotspot of stop %s is contended", alert.pk, alert.stop_id)
+        return None
+
+    DemandAlert.objects.filter(pk=alert.pk).update(hotspot=hotspot)
+    board.mark_stale()
+    return hotspot
+
+
+def close_settled(hotspot_ids=None, now=None):
+    """
+    Close open hotspots none of whose reports is still active
+
+    Args:
+        hotspot_ids: Hotspots to check; every open one when None
+
+    Returns:
+        int: Number of hotspots closed
+    """
+    settled = DemandHotspot.objects.filter(closed_at__isnull=True).exclude(
+        alerts__status__in=ACTIVE_STATUSES
+    )
+    if hotspot_ids is not None:
+        settled = settled.filter(pk__in=hotspot_ids)
+
+    closed = settled.update(closed_at=now or timezone.now(), version=F('version') + 1)
+    if closed:
+        board.mark_stale()
+    return closed
+
+
+class HotspotBoard:
+    """
+    Snapshot of open hotspots kept in memory
+
+    Reloaded with one query when older than HOTSPOT_REFRESH_SECONDS or
+    after a local merge.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = None
+        self._loaded_at = 0.0
+
+    def mark_stale(self):
+        with self._lock:
+            self._rows = None
+
+    def _load(self):
+        return list(
+            DemandHotspot.objects.filter(
+                closed_at__isnull=True,
+                expires_at__gt=timezone.now()
+            ).order_by('-max_people', '-last_reported_at').values(
+                'id', 'stop_id', 'first_reported_at', 'last_reported_at', 'expires_at',
+                'report_count', 'reporter_count', 'max_people', 'median_people',
+                stop_name=F('stop__name'),
+                route_id=F('stop__route_id'),
+                route_number=F('stop__route__number'),
+            )
+        )
+
+    def active(self):
+        """
+        Open hotspots, largest crowds first
+
+        Returns:
+            list: dicts with hotspot, stop and route fields
+        """
+        refresh = getattr(settings, 'HOTSPOT_REFRESH_SECONDS', 5)
+        with self._lock:
+            rows = self._rows
+            fresh = rows is not None and time.monotonic() - self._loaded_at < refresh
+        if not fresh:
+            rows = self._load()
+            with self._lock:
+                self._rows = rows
+                self._loaded_at = time.monotonic()
+
+        now = timezone.now()
+        return [row for row in rows if row['expires_at'] > now]
+
+
+board = HotspotBoard()
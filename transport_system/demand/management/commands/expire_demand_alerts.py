@@ -0,0 +1,39 @@
+"""
+Expire demand alerts past their expiry time
+
+Intended to run every few minutes so the set of open alerts stays small.
+
+Usage:
+    python manage.py expire_demand_alerts
+    python manage.py expire_demand_alerts --batch-size 5000 --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from demand.services import expire_overdue
+
+
+class Command(BaseCommand):
+    help = "Mark open demand alerts whose expiry time has passed as expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Alerts expired per UPDATE"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many alerts would expire"
+        )
+
+    def handle(self, *args, **options):
+        count = expire_overdue(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+
+        verb = "Would expire" if options['dry_run'] else "Expired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} demand alert(s)"))
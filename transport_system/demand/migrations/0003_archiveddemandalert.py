@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand', '0002_initial'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDemandAlert',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original alert id', primary_key=True, serialize=False)),
+                ('number_of_people', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('reported', 'Reported'), ('verified', 'Verified by Admin'), ('dispatched', 'Bus Dispatched'), ('resolved', 'Resolved'), ('expired', 'Expired')], max_length=20)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('expires_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('admin_notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('stop', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='routes.stop')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Demand Alert',
+                'verbose_name_plural': 'Archived Demand Alerts',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
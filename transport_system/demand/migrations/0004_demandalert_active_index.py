@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand', '0003_archiveddemandalert'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demandalert',
+            index=models.Index(fields=['status', 'expires_at'], name='demand_alert_active_idx'),
+        ),
+    ]
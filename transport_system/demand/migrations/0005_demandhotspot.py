@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand', '0004_demandalert_active_index'),
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandHotspot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_reported_at', models.DateTimeField(help_text='Time of the first merged report')),
+                ('last_reported_at', models.DateTimeField(help_text='Time of the latest merged report')),
+                ('expires_at', models.DateTimeField(help_text='When the latest merged report expires')),
+                ('report_count', models.PositiveIntegerField(default=0)),
+                ('reporter_count', models.PositiveIntegerField(default=0, help_text='Distinct passengers who reported')),
+                ('max_people', models.PositiveIntegerField(default=0)),
+                ('median_people', models.FloatField(default=0)),
+                ('samples', models.JSONField(default=list, help_text='number_of_people of each report')),
+                ('reporters', models.JSONField(default=list, help_text='Ids of reporting users')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('stop', models.ForeignKey(help_text='Stop where people are waiting', on_delete=django.db.models.deletion.CASCADE, related_name='demand_hotspots', to='routes.stop')),
+            ],
+            options={
+                'verbose_name': 'Demand Hotspot',
+                'verbose_name_plural': 'Demand Hotspots',
+                'ordering': ['-last_reported_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='demandalert',
+            name='hotspot',
+            field=models.ForeignKey(blank=True, help_text='Hotspot this report was merged into', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='demand.demandhotspot'),
+        ),
+        migrations.AddIndex(
+            model_name='demandhotspot',
+            index=models.Index(fields=['stop', 'last_reported_at'], name='demand_dema_stop_id_dc68cd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demandhotspot',
+            index=models.Index(fields=['expires_at'], name='demand_dema_expires_f175e1_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations, models
+
+
+# Frozen copies of demand.hotspots.MAX_PEOPLE_BUCKET and MAX_REPORTERS
+MAX_PEOPLE_BUCKET = 500
+MAX_REPORTERS = 50
+
+
+def bound_stats(apps, schema_editor):
+    """Fold sample lists into histograms and keep one open hotspot per stop"""
+    DemandHotspot = apps.get_model('demand', 'DemandHotspot')
+
+    hotspots = list(DemandHotspot.objects.order_by('stop_id', '-last_reported_at', '-id'))
+    latest = set()
+    for hotspot in hotspots:
+        people_counts = {}
+        for people in hotspot.samples:
+            bucket = str(min(people, MAX_PEOPLE_BUCKET))
+            people_counts[bucket] = people_counts.get(bucket, 0) + 1
+        hotspot.people_counts = people_counts
+        hotspot.reporters = hotspot.reporters[:MAX_REPORTERS]
+        hotspot.reporter_count = len(hotspot.reporters)
+        if hotspot.stop_id in latest:
+            hotspot.closed_at = hotspot.last_reported_at
+        latest.add(hotspot.stop_id)
+    DemandHotspot.objects.bulk_update(
+        hotspots, ['people_counts', 'reporters', 'reporter_count', 'closed_at'], batch_size=500
+    )
+
+
+def unbound_stats(apps, schema_editor):
+    DemandHotspot = apps.get_model('demand', 'DemandHotspot')
+    hotspots = list(DemandHotspot.objects.all())
+    for hotspot in hotspots:
+        hotspot.samples = [
+            int(people)
+            for people, count in sorted(hotspot.people_counts.items(), key=lambda item: int(item[0]))
+            for _ in range(count)
+        ]
+    DemandHotspot.objects.bulk_update(hotspots, ['samples'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand', '0005_demandhotspot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandhotspot',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, help_text='When the window lapsed or the last open report was settled', null=True),
+        ),
+        migrations.AddField(
+            model_name='demandhotspot',
+            name='people_counts',
+            field=models.JSONField(default=dict, help_text='Number of reports per number_of_people'),
+        ),
+        migrations.AlterField(
+            model_name='demandhotspot',
+            name='reporter_count',
+            field=models.PositiveIntegerField(default=0, help_text='Distinct passengers who reported (counted up to a cap)'),
+        ),
+        migrations.AlterField(
+            model_name='demandhotspot',
+            name='reporters',
+            field=models.JSONField(default=list, help_text='Ids of the first reporting users'),
+        ),
+        migrations.RunPython(bound_stats, unbound_stats),
+        migrations.RemoveField(
+            model_name='demandhotspot',
+            name='samples',
+        ),
+        migrations.AddConstraint(
+            model_name='demandhotspot',
+            constraint=models.UniqueConstraint(condition=models.Q(('closed_at__isnull', True)), fields=('stop',), name='demand_hotspot_one_open_per_stop'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand', '0006_bounded_hotspot_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archiveddemandalert',
+            name='hotspot',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='demand.demandhotspot'),
+        ),
+    ]
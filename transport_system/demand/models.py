@@ -8,6 +8,28 @@ from django.conf import settings
 from django.utils import timezone
 from routes.models import Stop
 
+# Statuses of alerts that still need attention
+ACTIVE_STATUSES = ('reported', 'verified', 'dispatched')
+
+
+class DemandAlertQuerySet(models.QuerySet):
+    """
+    QuerySet for DemandAlert
+    """
+    def active(self, now=None):
+        """Alerts that have not expired or been closed"""
+        return self.filter(
+            status__in=ACTIVE_STATUSES,
+            expires_at__gt=now or timezone.now()
+        )
+    
+    def overdue(self, now=None):
+        """Alerts still open whose expiry time has passed"""
+        return self.filter(
+            status__in=ACTIVE_STATUSES,
+            expires_at__lte=now or timezone.now()
+        )
+
 
 class DemandAlert(models.Model):
     """
@@ -71,6 +93,18 @@ class DemandAlert(models.Model):
         help_text="Notes from control room"
     )
     
+    # Set when the report is merged into a hotspot
+    hotspot = models.ForeignKey(
+        'DemandHotspot',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='alerts',
+        help_text="Hotspot this report was merged into"
+    )
+    
+    objects = DemandAlertQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Demand Alert'
         verbose_name_plural = 'Demand Alerts'
@@ -78,6 +112,9 @@ class DemandAlert(models.Model):
         indexes = [
             models.Index(fields=['created_at', 'status']),
             models.Index(fields=['stop', 'status']),
+            # Open alerts are a few status ranges of this index, which
+            # the expiry sweep keeps small
+            models.Index(fields=['status', 'expires_at'], name='demand_alert_active_idx'),
         ]
     
     def save(self, *args, **kwargs):
@@ -93,7 +130,7 @@ class DemandAlert(models.Model):
     
     def is_active(self):
         """Check if alert is still valid (not expired)"""
-        return timezone.now() < self.expires_at and self.status not in ['resolved', 'expired']
+        return timezone.now() < self.expires_at and self.status in ACTIVE_STATUSES
     
     def mark_resolved(self):
         """Mark alert as resolved"""
@@ -104,4 +141,109 @@ class DemandAlert(models.Model):
     def mark_expired(self):
         """Mark alert as expired"""
         self.status = 'expired'
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class DemandHotspot(models.Model):
+    """
+    Demand Hotspot Model
+    Crowd reports for one stop merged over a sliding window, so a busy
+    stop shows up once instead of as dozens of near-identical alerts
+    """
+    stop = models.ForeignKey(
+        Stop,
+        on_delete=models.CASCADE,
+        related_name='demand_hotspots',
+        help_text="Stop where people are waiting"
+    )
+    
+    # Window covered by the merged reports
+    first_reported_at = models.DateTimeField(help_text="Time of the first merged report")
+    last_reported_at = models.DateTimeField(help_text="Time of the latest merged report")
+    expires_at = models.DateTimeField(help_text="When the latest merged report expires")
+    closed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the window lapsed or the last open report was settled"
+    )
+    
+    # Running statistics of number_of_people
+    report_count = models.PositiveIntegerField(default=0)
+    reporter_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Distinct passengers who reported (counted up to a cap)"
+    )
+    max_people = models.PositiveIntegerField(default=0)
+    median_people = models.FloatField(default=0)
+    
+    # Bounded inputs for the statistics above
+    people_counts = models.JSONField(default=dict, help_text="Number of reports per number_of_people")
+    reporters = models.JSONField(default=list, help_text="Ids of the first reporting users")
+    
+    # Bumped on every merge; updates are conditional on it
+    version = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Demand Hotspot'
+        verbose_name_plural = 'Demand Hotspots'
+        ordering = ['-last_reported_at']
+        indexes = [
+            models.Index(fields=['stop', 'last_reported_at']),
+            models.Index(fields=['expires_at']),
+        ]
+        constraints = [
+            # Reports for a stop merge into at most one open hotspot
+            models.UniqueConstraint(
+                fields=['stop'],
+                condition=models.Q(closed_at__isnull=True),
+                name='demand_hotspot_one_open_per_stop'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.report_count} report(s) at {self.stop.name} since {self.first_reported_at}"
+    
+    def is_active(self):
+        return self.closed_at is None and timezone.now() < self.expires_at
+
+class ArchivedDemandAlert(models.Model):
+    """
+    Archived Demand Alert Model
+    Cold storage for old alerts moved out of the live table
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original alert id")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    stop = models.ForeignKey(
+        Stop,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    number_of_people = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=DemandAlert.STATUS_CHOICES)
+    created_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    admin_notes = models.TextField(blank=True)
+    hotspot = models.ForeignKey(
+        'DemandHotspot',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Archived Demand Alert'
+        verbose_name_plural = 'Archived Demand Alerts'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Archived alert {self.id} at stop {self.stop_id}"
@@ -4,7 +4,7 @@ Demand Alerts Serializers
 
 from rest_framework import serializers
 from .models import DemandAlert
-from routes.serializers import StopSerializer
+from routes.serializers import StopSerializer, StopIdField
 
 
 class DemandAlertSerializer(serializers.ModelSerializer):
@@ -50,10 +50,27 @@ class DemandAlertSerializer(serializers.ModelSerializer):
         return 0
 
 
+class ActiveDemandAlertSerializer(DemandAlertSerializer):
+    """
+    DemandAlert serializer for querysets of open alerts annotated with
+    remaining time, so no clock reads or lookups happen per row
+    """
+    def get_is_active(self, obj):
+        return True
+    
+    def get_time_remaining(self, obj):
+        return max(int(obj.remaining.total_seconds() / 60), 0)
+
+
 class DemandAlertCreateSerializer(serializers.ModelSerializer):
     """
     Simplified serializer for creating demand alerts
+    
+    The stop is checked against the cached membership index and saved
+    as an id.
     """
+    stop = StopIdField(source='stop_id')
+    
     class Meta:
         model = DemandAlert
         fields = [
@@ -0,0 +1,85 @@
+"""
+Demand Alert Services
+Set-based status transitions for demand alerts
+"""
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import ACTIVE_STATUSES, DemandAlert
+
+# Statuses an alert may move to, and the statuses it may move from
+TRANSITIONS = {
+    'verified': ('reported',),
+    'dispatched': ('reported', 'verified'),
+    'resolved': ACTIVE_STATUSES,
+    'expired': ACTIVE_STATUSES,
+}
+
+# Sent once per bulk transition with `status` and `count`, instead of a
+# post_save per alert
+alerts_transitioned = Signal()
+
+
+def transition(queryset, status, now=None):
+    """
+    Move alerts to a new status with a single UPDATE
+
+    Args:
+        queryset: DemandAlert queryset; alerts that cannot move to
+                  `status` from their current one are left alone
+        status: Target status, one of TRANSITIONS
+        now: Time stamped as resolved_at when resolving
+
+    Returns:
+        int: Number of alerts transitioned
+    """
+    if status not in TRANSITIONS:
+        raise ValueError(f"Unknown demand alert status: {status}")
+
+    fields = {'status': status}
+    if status == 'resolved':
+        fields['resolved_at'] = now or timezone.now()
+
+    updated = queryset.filter(status__in=TRANSITIONS[status]).update(**fields)
+    if updated:
+        alerts_transitioned.send(sender=DemandAlert, status=status, count=updated)
+    return updated
+
+
+def resolve(queryset, now=None):
+    """Resolve open alerts; see transition()"""
+    return transition(queryset, 'resolved', now=now)
+
+
+def expire_overdue(now=None, batch_size=1000, dry_run=False):
+    """
+    Mark open alerts past their expiry time as expired
+
+    Chunks of primary keys are read through the (status, expires_at)
+    index and transitioned with one UPDATE each.
+
+    Returns:
+        int: Number of alerts expired (or that would be, for a dry run)
+    """
+    now = now or timezone.now()
+    overdue = DemandAlert.objects.overdue(now)
+
+    if dry_run:
+        return overdue.count()
+
+    expired = 0
+    while True:
+        ids = list(overdue.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            # Re-check in case an alert was resolved since it was read
+            expired += DemandAlert.objects.overdue(now).filter(
+                pk__in=ids
+            ).update(status='expired')
+
+    if expired:
+        alerts_transitioned.send(sender=DemandAlert, status='expired', count=expired)
+    return expired
@@ -0,0 +1,51 @@
+"""
+Demand Signals
+Merge new crowd reports into stop hotspots and the anomaly detector,
+close hotspots whose reports are settled, and keep the cached active
+alert feed fresh
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ACTIVE_STATUSES, DemandAlert
+from . import feed, hotspots
+from .anomalies import detector
+from .services import alerts_transitioned
+
+
+@receiver(post_save, sender=DemandAlert)
+def alert_created(sender, instance, created, **kwargs):
+    """Merge a new report into its stop's hotspot and anomaly statistics"""
+    if created:
+        hotspots.record_report(instance)
+        detector.observe_alert(instance)
+
+
+@receiver(post_save, sender=DemandAlert)
+@receiver(post_delete, sender=DemandAlert)
+def alert_changed(sender, instance, **kwargs):
+    """Drop the cached active alert feed"""
+    feed.invalidate()
+
+
+@receiver(post_save, sender=DemandAlert)
+def alert_settled(sender, instance, created, **kwargs):
+    """Close the hotspot once a resolved or expired report was its last open one"""
+    if not created and instance.hotspot_id and instance.status not in ACTIVE_STATUSES:
+        hotspots.close_settled([instance.hotspot_id])
+
+
+@receiver(post_delete, sender=DemandAlert)
+def alert_removed(sender, instance, **kwargs):
+    """Close the hotspot once a deleted open report was its last open one"""
+    if instance.hotspot_id and instance.status in ACTIVE_STATUSES:
+        hotspots.close_settled([instance.hotspot_id])
+
+
+@receiver(alerts_transitioned)
+def alerts_bulk_changed(sender, status, count, **kwargs):
+    """Drop the cached active alert feed once for a bulk status change"""
+    feed.invalidate()
+    if status not in ACTIVE_STATUSES:
+        hotspots.close_settled()
@@ -1,3 +1,419 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from routes.models import Route, Stop
+from schedules import timetable
+from schedules.models import Bus, Schedule
+from preinforms.models import PreInform
+from users.models import CustomUser
+from .anomalies import SEED_WEEKS, AnomalyDetector, detector, slot
+from .models import DemandAlert, DemandHotspot
+from . import dispatch, feed, hotspots, services
+from .throttling import CrowdReportThrottle
+
+
+@override_settings(DEMAND_ALERT_BURST=3, DEMAND_ALERT_THROTTLE_CACHE=None, ANOMALY_SNAPSHOT_PATH=None)
+class CrowdReportThrottleTests(TestCase):
+    """
+    Crowd reports are rate limited per user and stop
+    """
+
+    def setUp(self):
+        CrowdReportThrottle._buckets.clear()
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        self.other_stop = Stop.objects.create(route=route, name='B', sequence=2, distance_from_origin=20)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email='p@x.com', password='x'))
+
+    def report(self, stop):
+        return self.client.post('/api/demand-alerts/', {'stop': stop, 'number_of_people': 10}, format='json')
+
+    def test_spellings_of_a_stop_share_a_bucket(self):
+        stop = self.stop.id
+        codes = [
+            self.report(value).status_code
+            for value in (stop, f'{stop}.0', f'0{stop}', f' {stop}', f'{stop}.00', f'00{stop}')
+        ]
+        self.assertEqual(codes, [201, 201, 201, 429, 429, 429])
+        self.assertEqual(DemandAlert.objects.count(), 3)
+
+    def test_other_stops_have_their_own_bucket(self):
+        for _ in range(3):
+            self.assertEqual(self.report(self.stop.id).status_code, 201)
+        self.assertEqual(self.report(self.stop.id).status_code, 429)
+        self.assertEqual(self.report(self.other_stop.id).status_code, 201)
+
+
+    def test_invalid_reports_do_not_use_up_the_burst(self):
+        for _ in range(3):
+            response = self.client.post(
+                '/api/demand-alerts/', {'stop': self.stop.id, 'number_of_people': -1}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual([self.report(self.stop.id).status_code for _ in range(4)], [201, 201, 201, 429])
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class AnomalyDetectorTests(TestCase):
+    """
+    Quiet hours decay the statistics and withdrawn demand is taken back
+    """
+
+    def setUp(self):
+        detector.clear()
+        self.addCleanup(detector.clear)
+        self.start = timezone.make_aware(datetime(2026, 1, 5, 8, 30))
+
+    def test_hours_without_demand_fold_zero(self):
+        monitor = AnomalyDetector()
+        monitor.observe(1, self.start.date(), 8, 10)
+        monitor.fold_closed(self.start + timedelta(hours=1))
+        stats = monitor.stats[1]
+        self.assertEqual(stats.mean[slot(self.start.date(), 8)], 10)
+
+        monitor.fold_closed(self.start + timedelta(weeks=1, hours=1))
+
+        self.assertEqual(stats.seen[slot(self.start.date(), 9)], 1)
+        self.assertEqual(stats.mean[slot(self.start.date(), 9)], 0)
+        self.assertEqual(stats.seen[slot(self.start.date(), 8)], 2)
+        self.assertAlmostEqual(stats.mean[slot(self.start.date(), 8)], 8)
+
+    def test_folded_hours_ignore_late_observations(self):
+        monitor = AnomalyDetector()
+        monitor.observe(1, self.start.date(), 8, 10)
+        monitor.fold_closed(self.start + timedelta(hours=1))
+
+        monitor.observe(1, self.start.date(), 8, 5)
+
+        self.assertEqual(monitor.buckets, {})
+
+    def test_first_load_without_snapshot_seeds_from_stored_demand(self):
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        now = timezone.localtime()
+        reported = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        for week in range(SEED_WEEKS):
+            alert = DemandAlert.objects.create(user=user, stop=stop, number_of_people=10)
+            DemandAlert.objects.filter(pk=alert.pk).update(created_at=reported - timedelta(weeks=week))
+
+        monitor = AnomalyDetector()
+        monitor.fold_closed(now)
+
+        stats = monitor.stats[stop.id]
+        index = slot(reported.date(), reported.hour)
+        self.assertEqual(stats.seen[index], SEED_WEEKS)
+        self.assertEqual(stats.mean[index], 10)
+        self.assertEqual(stats.seen[slot(reported.date(), (reported.hour + 1) % 24)], SEED_WEEKS)
+        self.assertEqual(monitor.folded_until, now.replace(minute=0, second=0, microsecond=0, tzinfo=None))
+
+    def test_cancelled_and_edited_preinforms_are_taken_back(self):
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        travel = timezone.localdate() + timedelta(days=2)
+        preinform = PreInform.objects.create(
+            user=CustomUser.objects.create_user(email='p@x.com', password='x'),
+            route=route, boarding_stop=stop, date_of_travel=travel,
+            desired_time=time(8), passenger_count=4
+        )
+        self.assertEqual(detector.buckets, {(stop.id, travel, 8): 4})
+
+        preinform.passenger_count = 1
+        preinform.save()
+        self.assertEqual(detector.buckets, {(stop.id, travel, 8): 1})
+
+        preinform.status = 'cancelled'
+        preinform.save()
+        self.assertEqual(detector.buckets, {})
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class HotspotTests(TestCase):
+    """
+    Reports merge into one bounded open hotspot per stop
+    """
+
+    def setUp(self):
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        self.users = [
+            CustomUser.objects.create_user(email=f'p{i}@x.com', password='x')
+            for i in range(3)
+        ]
+
+    def report(self, people, user=0):
+        return DemandAlert.objects.create(user=self.users[user], stop=self.stop, number_of_people=people)
+
+    def test_statistics_are_bounded_aggregates(self):
+        for user, people in enumerate([10, 40, 20, 20, 10000]):
+            self.report(people, user=user % 3)
+
+        hotspot = DemandHotspot.objects.get()
+        self.assertEqual(hotspot.report_count, 5)
+        self.assertEqual(hotspot.reporter_count, 3)
+        self.assertEqual(hotspot.max_people, 10000)
+        self.assertEqual(hotspot.median_people, 20)
+        self.assertEqual(
+            hotspot.people_counts,
+            {'10': 1, '20': 2, '40': 1, str(hotspots.MAX_PEOPLE_BUCKET): 1}
+        )
+
+    def test_histogram_median_matches_sample_median(self):
+        self.assertEqual(hotspots.histogram_median({'10': 2, '20': 2}), 15)
+        self.assertEqual(hotspots.histogram_median({'10': 1, '20': 3}), 20)
+        self.assertEqual(hotspots.histogram_median({'5': 1}), 5)
+        self.assertEqual(hotspots.histogram_median({}), 0)
+
+    def test_settling_every_report_closes_the_hotspot(self):
+        first = self.report(10)
+        self.report(12, user=1)
+        services.resolve(DemandAlert.objects.filter(pk=first.pk))
+        self.assertIsNone(DemandHotspot.objects.get().closed_at)
+
+        services.resolve(DemandAlert.objects.all())
+        self.assertIsNotNone(DemandHotspot.objects.get().closed_at)
+        self.assertEqual(hotspots.board.active(), [])
+
+        self.report(30)
+        self.assertEqual(DemandHotspot.objects.filter(closed_at__isnull=True).count(), 1)
+        self.assertEqual(DemandHotspot.objects.count(), 2)
+
+    def test_lapsed_window_starts_a_new_hotspot(self):
+        self.report(10)
+        DemandHotspot.objects.update(last_reported_at=timezone.now() - timedelta(hours=1))
+
+        self.report(20)
+
+        old, new = DemandHotspot.objects.order_by('id')
+        self.assertIsNotNone(old.closed_at)
+        self.assertIsNone(new.closed_at)
+        self.assertEqual(new.report_count, 1)
+
+    def test_one_open_hotspot_per_stop(self):
+        alert = self.report(10)
+        with self.assertRaises(IntegrityError):
+            DemandHotspot.objects.create(stop=self.stop, **hotspots.initial_stats(alert))
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class BulkResolveTests(TestCase):
+    """
+    Admins resolve matching open alerts with one request
+    """
+
+    def setUp(self):
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        other = Stop.objects.create(route=route, name='B', sequence=2, distance_from_origin=20)
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.alerts = [
+            DemandAlert.objects.create(user=user, stop=stop, number_of_people=10)
+            for stop in (self.stop, self.stop, other)
+        ]
+        DemandAlert.objects.filter(pk=self.alerts[1].pk).update(status='expired')
+        self.client = APIClient()
+        self.client.force_authenticate(
+            CustomUser.objects.create_user(email='a@x.com', password='x', role='admin')
+        )
+
+    def resolve(self, data):
+        return self.client.post('/api/demand-alerts/resolve/', data, format='json')
+
+    def test_resolves_only_open_alerts_of_the_stop(self):
+        response = self.resolve({'stop_id': self.stop.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['resolved'], 1)
+        self.assertEqual(
+            list(DemandAlert.objects.order_by('pk').values_list('status', flat=True)),
+            ['resolved', 'expired', 'reported']
+        )
+        self.assertIsNotNone(DemandAlert.objects.get(pk=self.alerts[0].pk).resolved_at)
+
+    def test_rejects_bad_input_and_non_admins(self):
+        self.assertEqual(self.resolve({}).status_code, 400)
+        self.assertEqual(self.resolve({'ids': ['x']}).status_code, 400)
+        self.assertEqual(self.resolve({'ids': 5}).status_code, 400)
+
+        self.client.force_authenticate(CustomUser.objects.get(email='p@x.com'))
+        self.assertEqual(self.resolve({'ids': [self.alerts[0].pk]}).status_code, 403)
+        self.assertFalse(DemandAlert.objects.filter(status='resolved').exists())
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class ActiveFeedTests(TestCase):
+    """
+    The open alert feed is built with one query
+    """
+
+    def setUp(self):
+        feed.invalidate()
+        self.addCleanup(feed.invalidate)
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stops = [
+            Stop.objects.create(route=route, name=name, sequence=i, distance_from_origin=i)
+            for i, name in enumerate('AB', 1)
+        ]
+        now = timezone.now()
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        for stop in stops:
+            for minutes in (10, 40):
+                self.alert(user, stop, expires_at=now + timedelta(minutes=minutes, seconds=30))
+        # Lapsed and closed alerts are left out
+        self.alert(user, stops[0], expires_at=now - timedelta(minutes=1))
+        self.alert(user, stops[0], expires_at=now + timedelta(minutes=10), status='resolved')
+
+    def alert(self, user, stop, **fields):
+        alert = DemandAlert.objects.create(user=user, stop=stop, number_of_people=5)
+        DemandAlert.objects.filter(pk=alert.pk).update(**fields)
+
+    def test_one_query_with_remaining_time(self):
+        with self.assertNumQueries(1):
+            payload = feed.build()
+
+        self.assertEqual(payload['total_active_alerts'], 4)
+        self.assertEqual(
+            sorted(alert['time_remaining'] for alert in payload['alerts']), [10, 10, 40, 40]
+        )
+        self.assertTrue(all(alert['is_active'] for alert in payload['alerts']))
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class AlertExpiryTests(TestCase):
+    """
+    Open alerts are active until their expiry and then swept to expired
+    """
+
+    def setUp(self):
+        self.now = timezone.now()
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.alerts = {}
+        for status in ('reported', 'verified', 'resolved'):
+            for label, offset in (('open', 10), ('lapsed', -10)):
+                alert = DemandAlert.objects.create(user=user, stop=stop, number_of_people=5)
+                DemandAlert.objects.filter(pk=alert.pk).update(
+                    status=status, expires_at=self.now + timedelta(minutes=offset)
+                )
+                self.alerts[(status, label)] = alert.pk
+
+    def ids(self, *keys):
+        return {self.alerts[key] for key in keys}
+
+    def test_active_and_overdue_split_open_alerts_at_now(self):
+        active = set(DemandAlert.objects.active(self.now).values_list('pk', flat=True))
+        overdue = set(DemandAlert.objects.overdue(self.now).values_list('pk', flat=True))
+
+        self.assertEqual(active, self.ids(('reported', 'open'), ('verified', 'open')))
+        self.assertEqual(overdue, self.ids(('reported', 'lapsed'), ('verified', 'lapsed')))
+        # Later on, every open alert is overdue
+        self.assertEqual(DemandAlert.objects.overdue(self.now + timedelta(hours=1)).count(), 4)
+
+    def test_expire_overdue_sweeps_in_batches(self):
+        self.assertEqual(services.expire_overdue(self.now, dry_run=True), 2)
+        self.assertEqual(DemandAlert.objects.filter(status='expired').count(), 0)
+
+        self.assertEqual(services.expire_overdue(self.now, batch_size=1), 2)
+
+        self.assertEqual(
+            set(DemandAlert.objects.filter(status='expired').values_list('pk', flat=True)),
+            self.ids(('reported', 'lapsed'), ('verified', 'lapsed'))
+        )
+        self.assertEqual(
+            DemandAlert.objects.get(pk=self.alerts[('resolved', 'lapsed')]).status, 'resolved'
+        )
+        self.assertEqual(services.expire_overdue(self.now), 0)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None, DISPATCH_LOOKAHEAD_MINUTES=60)
+class DispatchTests(TestCase):
+    """
+    Open demand is matched to the trips that reach it soonest
+    """
+
+    def setUp(self):
+        timetable.clear()
+        self.addCleanup(timetable.clear)
+        self.now = timezone.make_aware(datetime.combine(timezone.localdate(), time(9)))
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stops = [
+            Stop.objects.create(route=route, name=name, sequence=i, distance_from_origin=distance)
+            for i, (name, distance) in enumerate((('A', 0), ('M', 10), ('B', 20)), 1)
+        ]
+        driver = CustomUser.objects.create_user(email='d@x.com', password='x', role='driver')
+        self.trips = {}
+        for plate, departure, seats in (
+            ('KL-1', time(8, 50), 3),      # On the road, passes M at 09:20
+            ('KL-2', time(9, 10), 40),     # Passes M at 09:40
+            ('KL-3', time(7, 50), 40),     # Finished its run
+            ('KL-4', time(11), 40),        # Beyond the lookahead
+        ):
+            self.trips[plate] = Schedule.objects.create(
+                route=route, bus=Bus.objects.create(number_plate=plate, capacity=40),
+                driver=driver, date=self.now.date(), departure_time=departure,
+                arrival_time=time(departure.hour + 1, departure.minute),
+                total_seats=40, available_seats=seats
+            ).id
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        for stop, people in ((self.stops[1], 10), (self.stops[2], 5)):
+            alert = DemandAlert.objects.create(user=user, stop=stop, number_of_people=people)
+            DemandAlert.objects.filter(pk=alert.pk).update(expires_at=self.now + timedelta(minutes=30))
+
+    def test_nearest_trips_fill_the_largest_crowd_first(self):
+        dispatch.recommend(self.now)
+        with self.assertNumQueries(2):
+            middle, last = dispatch.recommend(self.now)
+
+        self.assertEqual((middle['stop_id'], middle['people_waiting']), (self.stops[1].id, 10))
+        self.assertEqual(
+            [(trip['schedule_id'], trip['eta_minutes'], trip['seats_offered']) for trip in middle['assignments']],
+            [(self.trips['KL-1'], 20.0, 3), (self.trips['KL-2'], 40.0, 7)]
+        )
+        self.assertEqual(middle['assignments'][0]['number_plate'], 'KL-1')
+        self.assertAlmostEqual(middle['assignments'][0]['distance_km'], 6.67)
+        self.assertEqual(middle['unserved'], 0)
+
+        # KL-1 is full by then and KL-2 reaches B after the lookahead
+        self.assertEqual((last['stop_id'], last['assignments'], last['unserved']), (self.stops[2].id, [], 5))
+
+    def test_booked_out_trip_is_skipped(self):
+        schedule = Schedule.objects.get(pk=self.trips['KL-1'])
+        schedule.available_seats = 0
+        schedule.save(update_fields=['available_seats', 'updated_at'])
+
+        middle, _ = dispatch.recommend(self.now)
+
+        self.assertEqual(
+            [(trip['schedule_id'], trip['seats_offered']) for trip in middle['assignments']],
+            [(self.trips['KL-2'], 10)]
+        )
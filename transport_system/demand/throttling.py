@@ -0,0 +1,116 @@
+"""
+Demand Alert Throttling
+Token buckets per user and stop for crowd reports
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import IntegerField
+from rest_framework.throttling import BaseThrottle
+
+# Buckets kept in process before the least recently used are dropped
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    """
+    Token bucket state: `tokens` available as of `updated_at`
+    """
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, tokens, updated_at):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+    def take(self, now, burst, refill_seconds):
+        """
+        Refill for the time passed and take one token if available
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one is
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) / refill_seconds)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) * refill_seconds
+
+
+class CrowdReportThrottle(BaseThrottle):
+    """
+    Limit crowd reports per user and stop
+
+    Each (user, stop) pair gets DEMAND_ALERT_BURST reports, refilled at
+    one per DEMAND_ALERT_REFILL_SECONDS. Buckets live in process memory;
+    set DEMAND_ALERT_THROTTLE_CACHE to a cache alias to share them
+    between workers (a read-modify-write per request, so concurrent
+    requests on different workers may occasionally both pass).
+
+    Views using it check throttles after validating the report, so
+    rejected payloads do not use up a token.
+    """
+    _buckets = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.burst = getattr(settings, 'DEMAND_ALERT_BURST', 3)
+        self.refill_seconds = getattr(settings, 'DEMAND_ALERT_REFILL_SECONDS', 300)
+        self.wait_seconds = None
+
+    def get_cache_key(self, request):
+        return f'demand-alert-throttle:{request.user.pk}:{self.stop_id(request)}'
+
+    @staticmethod
+    def stop_id(request):
+        """
+        The reported stop id, parsed like the serializer parses it
+
+        "1", "01", " 1" and "1.0" all name stop 1 and share a bucket;
+        unparseable values share one bucket per user.
+        """
+        value = request.data.get('stop') if hasattr(request.data, 'get') else None
+        try:
+            return IntegerField().to_internal_value(value)
+        except ValidationError:
+            return None
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True  # Rejected by the permission check instead
+
+        key = self.get_cache_key(request)
+        now = time.time()
+        alias = getattr(settings, 'DEMAND_ALERT_THROTTLE_CACHE', None)
+        if alias:
+            self.wait_seconds = self._take_shared(caches[alias], key, now)
+        else:
+            self.wait_seconds = self._take_local(key, now)
+        return not self.wait_seconds
+
+    def _take_local(self, key, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+                if len(self._buckets) > MAX_BUCKETS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now, self.burst, self.refill_seconds)
+
+    def _take_shared(self, cache, key, now):
+        tokens, updated_at = cache.get(key) or (self.burst, now)
+        bucket = TokenBucket(tokens, updated_at)
+        wait = bucket.take(now, self.burst, self.refill_seconds)
+        # A bucket untouched for a full refill is full again, so let it expire
+        cache.set(key, (bucket.tokens, bucket.updated_at), int(self.burst * self.refill_seconds) + 1)
+        return wait
+
+    def wait(self):
+        return self.wait_seconds
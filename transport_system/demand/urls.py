@@ -13,5 +13,9 @@ urlpatterns = [
     path('api/demand-alerts/', views.DemandAlertCreateView.as_view(), name='demand-alert-create'),
     path('api/demand-alerts/list/', views.DemandAlertListView.as_view(), name='demand-alert-list'),
     path('api/demand-alerts/active/', views.active_demand_alerts_view, name='active-demand-alerts'),
+    path('api/demand-alerts/dispatch/', views.dispatch_recommendations_view, name='dispatch-recommendations'),
+    path('api/demand-anomalies/', views.demand_anomalies_view, name='demand-anomalies'),
+    path('api/demand-hotspots/', views.demand_hotspots_view, name='demand-hotspots'),
+    path('api/demand-alerts/resolve/', views.bulk_resolve_demand_alerts_view, name='bulk-resolve-demand-alerts'),
     path('api/demand-alerts/<int:alert_id>/resolve/', views.resolve_demand_alert_view, name='resolve-demand-alert'),
 ]
\ No newline at end of file
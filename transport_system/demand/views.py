@@ -11,6 +11,8 @@ from django.utils import timezone
 from .models import DemandAlert
 from .serializers import DemandAlertSerializer, DemandAlertCreateSerializer
 from routes.models import Stop
+from .throttling import CrowdReportThrottle
+from . import anomalies, dispatch, feed, hotspots, services
 
 
 class DemandAlertCreateView(generics.CreateAPIView):
@@ -22,18 +24,25 @@ class DemandAlertCreateView(generics.CreateAPIView):
         "stop": 5,
         "number_of_people": 25
     }
+    
+    Valid reports are rate limited per user and stop (429 when exceeded).
     """
     queryset = DemandAlert.objects.all()
     serializer_class = DemandAlertCreateSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [CrowdReportThrottle]
     
     def perform_create(self, serializer):
         """Set the user to currently logged-in user"""
         serializer.save(user=self.request.user)
     
+    def check_throttles(self, request):
+        """Deferred to create() so invalid reports don't use up a token"""
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        super().check_throttles(request)
         self.perform_create(serializer)
         
         # Return full details
@@ -81,10 +90,7 @@ class DemandAlertListView(generics.ListAPIView):
             queryset = queryset.filter(status=status_param)
         if active_only:
             # Only show alerts that haven't expired
-            queryset = queryset.filter(
-                expires_at__gt=timezone.now(),
-                status__in=['reported', 'verified', 'dispatched']
-            )
+            queryset = queryset.active()
         
         return queryset.order_by('-created_at')
 
@@ -95,17 +101,87 @@ def active_demand_alerts_view(request):
     Get all currently active demand alerts
     
     GET /api/demand-alerts/active/
+    
+    The payload is cached for ACTIVE_ALERTS_CACHE_TTL seconds and shared
+    by all control room clients; any alert change drops it.
+    """
+    return Response(feed.get_active_feed())
+
+
+@api_view(['GET'])
+def demand_hotspots_view(request):
+    """
+    Get open demand hotspots, largest crowds first
+    
+    GET /api/demand-hotspots/
+    
+    Each hotspot merges the crowd reports for one stop that arrived
+    within HOTSPOT_WINDOW_MINUTES of each other.
+    """
+    active_hotspots = hotspots.board.active()
+    
+    return Response({
+        'total_hotspots': len(active_hotspots),
+        'hotspots': active_hotspots
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dispatch_recommendations_view(request):
+    """
+    Recommend buses for stops with open demand alerts (Admin only)
+    
+    GET /api/demand-alerts/dispatch/
+    
+    For each stop, trips with spare seats that pass it soonest are
+    assigned until the crowd is covered.
     """
-    active_alerts = DemandAlert.objects.filter(
-        expires_at__gt=timezone.now(),
-        status__in=['reported', 'verified', 'dispatched']
-    ).select_related('stop', 'stop__route').order_by('-created_at')
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can view dispatch recommendations'},
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    serializer = DemandAlertSerializer(active_alerts, many=True)
+    recommendations = dispatch.recommend()
     
     return Response({
-        'total_active_alerts': len(serializer.data),
-        'alerts': serializer.data
+        'total_stops': len(recommendations),
+        'recommendations': recommendations
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def demand_anomalies_view(request):
+    """
+    Stops with unusually high demand, most anomalous first (Admin only)
+    
+    GET /api/demand-anomalies/
+    Optional params:
+    - limit: Maximum number of anomalies (default: 20)
+    - threshold: Minimum score in standard deviations (default: 3)
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can view demand anomalies'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        limit = int(request.query_params.get('limit', 20))
+        threshold = float(request.query_params.get('threshold', anomalies.THRESHOLD))
+    except ValueError:
+        return Response(
+            {'error': 'limit must be an integer and threshold a number'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    flagged = anomalies.ranked_anomalies(limit=limit, threshold=threshold)
+    
+    return Response({
+        'total_anomalies': len(flagged),
+        'anomalies': flagged
     })
 
 
@@ -123,20 +199,71 @@ def resolve_demand_alert_view(request, alert_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    try:
-        alert = DemandAlert.objects.get(id=alert_id)
-        alert.mark_resolved()
-        
-        return Response({
-            'success': True,
-            'message': 'Alert resolved successfully'
-        })
-        
-    except DemandAlert.DoesNotExist:
+    alerts = DemandAlert.objects.filter(id=alert_id)
+    if not services.resolve(alerts) and not alerts.exists():
         return Response(
             {'error': 'Alert not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    return Response({
+        'success': True,
+        'message': 'Alert resolved successfully'
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_resolve_demand_alerts_view(request):
+    """
+    Resolve many open demand alerts at once (Admin only)
+    
+    POST /api/demand-alerts/resolve/
+    {"ids": [1, 2, 3]}
+    or
+    {"stop_id": 5}   (or "route_id", e.g. after a bus cleared the route)
+    
+    Runs as one UPDATE however many alerts match.
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can resolve alerts'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    ids = request.data.get('ids')
+    stop_id = request.data.get('stop_id')
+    route_id = request.data.get('route_id')
+    
+    if not ids and not stop_id and not route_id:
+        return Response(
+            {'error': 'Provide "ids", "stop_id" or "route_id"'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    queryset = DemandAlert.objects.all()
+    try:
+        if ids:
+            if not isinstance(ids, list):
+                raise ValueError
+            queryset = queryset.filter(pk__in=[int(pk) for pk in ids])
+        if stop_id:
+            queryset = queryset.filter(stop_id=int(stop_id))
+        if route_id:
+            queryset = queryset.filter(stop__route_id=int(route_id))
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'ids, stop_id and route_id must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    resolved = services.resolve(queryset)
+    
+    return Response({
+        'success': True,
+        'message': f'{resolved} alert(s) resolved',
+        'resolved': resolved
+    })
 
 
 def demand_alert_page(request):
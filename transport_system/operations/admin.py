@@ -4,7 +4,7 @@ Operations Admin Configuration
 
 from django.contrib import admin
 from django.db.models import Sum, Avg
-from .models import WeeklyPerformance
+from .models import WeeklyPerformance, DemandForecast, DailyPerformance, Job
 
 
 @admin.register(WeeklyPerformance)
@@ -93,4 +93,69 @@ class WeeklyPerformanceAdmin(admin.ModelAdmin):
         except (AttributeError, KeyError):
             pass
         
-        return response
\ No newline at end of file
+        return response
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for trained demand forecasts (read-only)
+    """
+    list_display = ('route', 'window_start', 'window_end', 'weeks', 'trend', 'scale', 'trained_at')
+    ordering = ('route',)
+    exclude = ('profile',)
+    readonly_fields = ('route', 'window_start', 'window_end', 'weeks', 'trend', 'scale', 'trained_at')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DailyPerformance)
+class DailyPerformanceAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for daily rollups (read-only, rebuilt by
+    refresh_daily_performance)
+    """
+    list_display = (
+        'bus',
+        'route',
+        'date',
+        'trips',
+        'total_kms',
+        'estimated_passengers',
+        'actual_passengers',
+        'total_profit',
+        'dirty'
+    )
+    list_filter = ('date', 'route', 'dirty')
+    search_fields = ('bus__number_plate', 'route__number')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+    
+    def get_queryset(self, request):
+        """Optimize queries"""
+        return super().get_queryset(request).select_related('bus', 'route')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for background jobs (read-only)
+    """
+    list_display = ('id', 'task', 'status', 'progress', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    readonly_fields = (
+        'task', 'arguments', 'status', 'progress', 'message', 'result', 'error',
+        'created_by', 'created_at', 'started_at', 'finished_at'
+    )
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,104 @@
+"""
+Analytics Queries
+Grouped aggregates of WeeklyPerformance for the analytics dashboard
+
+Every breakdown is one values().annotate() query, so the number of
+queries does not depend on how many weeks, routes or buses are shown.
+"""
+
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from preinforms import cube
+from .models import WeeklyPerformance
+
+
+def _per_km(total):
+    """Ratio of an annotated total to the annotated total_kms, 0 without kms"""
+    return Case(
+        When(
+            total_kms__gt=0,
+            then=Cast(F(total), FloatField()) / Cast(F('total_kms'), FloatField())
+        ),
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+
+
+def weekly_trends(start_date):
+    """
+    Profit, revenue and passengers per week, oldest first
+
+    Returns:
+        list: dicts with week_start_date, total_profit, total_revenue
+              and total_passengers
+    """
+    return list(
+        WeeklyPerformance.objects.filter(
+            week_start_date__gte=start_date
+        ).values('week_start_date').annotate(
+            total_profit=Sum('total_profit'),
+            total_revenue=Sum('total_revenue'),
+            total_passengers=Sum('total_passengers'),
+        ).order_by('week_start_date')
+    )
+
+
+def route_performance(start_date, limit=10):
+    """
+    Most profitable routes with their profit per km
+
+    Returns:
+        list: dicts with route__number, route__name, total_profit,
+              total_kms, total_passengers and profit_per_km
+    """
+    return list(
+        WeeklyPerformance.objects.filter(
+            week_start_date__gte=start_date
+        ).values('route__number', 'route__name').annotate(
+            total_profit=Sum('total_profit'),
+            total_kms=Sum('total_kms'),
+            total_passengers=Sum('total_passengers'),
+        ).annotate(
+            profit_per_km=_per_km('total_profit')
+        ).order_by('-total_profit', 'route__number')[:limit]
+    )
+
+
+def bus_efficiency(start_date, limit=10):
+    """
+    Buses earning the most revenue per km
+
+    Returns:
+        list: dicts with bus__number_plate, total_profit, total_revenue,
+              total_kms, total_passengers and revenue_per_km
+    """
+    return list(
+        WeeklyPerformance.objects.filter(
+            week_start_date__gte=start_date
+        ).values('bus__number_plate').annotate(
+            total_profit=Sum('total_profit'),
+            total_revenue=Sum('total_revenue'),
+            total_kms=Sum('total_kms'),
+            total_passengers=Sum('total_passengers'),
+        ).annotate(
+            revenue_per_km=_per_km('total_revenue')
+        ).order_by('-revenue_per_km', 'bus__number_plate')[:limit]
+    )
+
+
+def dashboard(start_date):
+    """
+    Everything shown on the analytics dashboard since start_date
+
+    Returns:
+        dict: weekly_trends, route_performance, bus_efficiency and
+              demand_patterns
+    """
+    return {
+        'weekly_trends': weekly_trends(start_date),
+        'route_performance': route_performance(start_date),
+        'bus_efficiency': bus_efficiency(start_date),
+        # Pre-aggregated in the demand cube
+        'demand_patterns': cube.weekday_hour_pattern(start_date),
+    }
@@ -0,0 +1,165 @@
+"""
+Archival Pipeline
+Moves old rows from live tables into archive tables in batches
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from schedules.models import Bus, Schedule, BusSchedule, StopTime, ArchivedSchedule, ArchivedBusSchedule
+from schedules import stop_times, timetable
+from preinforms.models import PreInform, ArchivedPreInform
+from demand.models import ACTIVE_STATUSES, DemandAlert, ArchivedDemandAlert
+from demand import feed, hotspots
+
+
+# (live model, archive model, field compared against the cutoff)
+ARCHIVE_SPECS = [
+    (Schedule, ArchivedSchedule, 'date'),
+    (BusSchedule, ArchivedBusSchedule, 'date'),
+    (PreInform, ArchivedPreInform, 'date_of_travel'),
+    (DemandAlert, ArchivedDemandAlert, 'created_at'),
+]
+
+
+def default_cutoff():
+    """Date before which rows are considered cold"""
+    days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 180)
+    return timezone.localdate() - timedelta(days=days)
+
+
+def _cutoff_value(model, field_name, cutoff):
+    """Convert the cutoff date to a datetime for DateTimeFields"""
+    field = model._meta.get_field(field_name)
+    if field.get_internal_type() == 'DateTimeField':
+        return timezone.make_aware(datetime.combine(cutoff, time.min))
+    return cutoff
+
+
+def _copy_fields(model, archive_model):
+    """Column names shared by a live model and its archive"""
+    archived = {field.attname for field in archive_model._meta.concrete_fields}
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in archived
+    ]
+
+
+def _delete_batch(model, ids):
+    """
+    Delete one archived batch without per-row delete signals
+
+    A queryset delete() loads every row and sends post_delete for each
+    one, so cache invalidations would run a query per row. The rows are
+    removed with a single DELETE instead and the handlers' work is done
+    once for the batch. Pre-informs and assignments need none: their
+    demand stays in the cube and their days' rollups are kept.
+    """
+    rows = model.objects.filter(pk__in=ids)
+
+    trips = hotspot_ids = ()
+    if model is Schedule:
+        trips = set(rows.values_list('route_id', 'date'))
+        StopTime.objects.filter(schedule__in=ids).delete()
+        Bus.objects.filter(current_schedule__in=ids).update(current_schedule=None)
+    elif model is DemandAlert:
+        hotspot_ids = set(rows.filter(
+            hotspot__isnull=False, status__in=ACTIVE_STATUSES
+        ).values_list('hotspot_id', flat=True))
+
+    rows._raw_delete(rows.db)
+
+    if model is Schedule:
+        for route_id, date in trips:
+            timetable.invalidate(route_id, date)
+        stop_times.invalidate_trip_boards(trips)
+    elif model is DemandAlert:
+        feed.invalidate()
+        if hotspot_ids:
+            hotspots.close_settled(hotspot_ids)
+
+
+def archive_model(model, archive_model, field_name, cutoff, batch_size=500, dry_run=False):
+    """
+    Move rows older than the cutoff into the archive table
+
+    Each batch is copied and deleted in its own transaction so a
+    long run never holds a lock on the whole table.
+
+    Returns:
+        int: Number of rows archived (or that would be, for a dry run)
+    """
+    stale = model.objects.filter(
+        **{f'{field_name}__lt': _cutoff_value(model, field_name, cutoff)}
+    )
+    if dry_run:
+        return stale.count()
+
+    fields = _copy_fields(model, archive_model)
+    moved = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(stale.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            rows = model.objects.filter(pk__in=ids).values(*fields)
+            archive_model.objects.bulk_create(
+                [archive_model(**row) for row in rows],
+                ignore_conflicts=True
+            )
+            _delete_batch(model, ids)
+
+        moved += len(ids)
+
+    return moved
+
+
+def archive_all(cutoff=None, batch_size=500, dry_run=False):
+    """
+    Archive every registered table
+
+    Returns:
+        dict: Rows moved per model label
+    """
+    cutoff = cutoff or default_cutoff()
+    return {
+        model._meta.label: archive_model(
+            model, archived, field_name, cutoff,
+            batch_size=batch_size, dry_run=dry_run
+        )
+        for model, archived, field_name in ARCHIVE_SPECS
+    }
+
+
+def sources(model):
+    """
+    A live model and its archive, for reads that must see both
+
+    Returns:
+        tuple: (live model, archive model)
+    """
+    return model, next(
+        archive for live, archive, _ in ARCHIVE_SPECS if live is model
+    )
+
+
+def with_archive(model, *fields, **filters):
+    """
+    Query live and archived rows together for analytics
+
+    Example:
+        with_archive(PreInform, 'route_id', 'passenger_count',
+                     date_of_travel__year=2024)
+
+    Returns:
+        QuerySet: values() union of hot and cold rows
+    """
+    hot, cold = sources(model)
+    hot = hot.objects.filter(**filters).order_by().values(*fields)
+    cold = cold.objects.filter(**filters).order_by().values(*fields)
+    return hot.union(cold, all=True)
@@ -0,0 +1,275 @@
+"""
+Demand Forecasting
+Seasonal demand models per route: an hour-of-week profile smoothed
+with an EWMA across weeks, a weekly trend, and a scale calibrated
+against actual passenger counts
+
+Series are kept in array('d') buffers of HOURS_PER_WEEK slots, so
+training needs no numerical libraries.
+"""
+
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from demand.models import DemandAlert
+from preinforms.models import DemandCell
+from preinforms.subscriptions import virtual_cells
+from routes.models import Route
+from .models import WeeklyPerformance, DemandForecast
+
+HOURS_PER_WEEK = 7 * 24
+
+# Smoothing factor for the EWMA over weeks (higher follows recent weeks)
+DEFAULT_ALPHA = 0.3
+
+# A crowd report is a weaker demand signal than a pre-inform
+ALERT_WEIGHT = 0.5
+
+# Bounds on the fitted weekly trend, so short noisy histories stay sane
+MAX_TREND = 0.25
+
+
+def week_start(date):
+    """Monday of a date's week"""
+    return date - timedelta(days=date.weekday())
+
+
+def slot(date, hour):
+    """Hour-of-week index, Monday 00:00 = 0"""
+    return date.weekday() * 24 + hour
+
+
+def empty_week():
+    return array('d', [0.0]) * HOURS_PER_WEEK
+
+
+def training_window(weeks, today=None):
+    """
+    Last full weeks before the current one
+
+    Returns:
+        tuple: (first Monday, last Sunday)
+    """
+    today = today or timezone.localdate()
+    end = week_start(today) - timedelta(days=1)
+    start = end - timedelta(days=weeks * 7 - 1)
+    return start, end
+
+
+def collect_series(start, end, route_ids):
+    """
+    Hourly demand signal per route and week
+
+    Pre-informed passengers (from the demand cube, plus recurring
+    subscriptions) and weighted crowd reports are added per hour.
+
+    Returns:
+        dict: {route_id: [array per week, oldest first]}
+    """
+    weeks = ((end - start).days + 1) // 7
+    series = {route_id: [empty_week() for _ in range(weeks)] for route_id in route_ids}
+
+    def add(route_id, date, hour, value):
+        weekly = series.get(route_id)
+        if weekly is not None:
+            weekly[(date - start).days // 7][slot(date, hour)] += value
+
+    for row in DemandCell.objects.filter(
+        date__gte=start,
+        date__lte=end
+    ).values('route_id', 'date', 'hour').annotate(
+        passengers=Sum('passenger_count')
+    ).order_by():
+        add(row['route_id'], row['date'], row['hour'], row['passengers'])
+
+    for (route_id, _, date, hour), (passengers, _) in virtual_cells(start, end).items():
+        add(route_id, date, hour, passengers)
+
+    for row in DemandAlert.objects.filter(
+        created_at__date__gte=start,
+        created_at__date__lte=end
+    ).annotate(
+        date=TruncDate('created_at'),
+        hour=ExtractHour('created_at')
+    ).values('stop__route_id', 'date', 'hour').annotate(
+        people=Sum('number_of_people')
+    ).order_by():
+        add(row['stop__route_id'], row['date'], row['hour'], row['people'] * ALERT_WEIGHT)
+
+    return series
+
+
+def actual_passengers(start, end, route_ids):
+    """
+    Recorded ticket sales per route and week
+
+    Returns:
+        dict: {route_id: {week index: passengers}}
+    """
+    actuals = defaultdict(dict)
+    for row in WeeklyPerformance.objects.filter(
+        route_id__in=route_ids,
+        week_start_date__gte=start,
+        week_start_date__lte=end,
+        actual_passengers__gt=0
+    ).values('route_id', 'week_start_date').annotate(
+        actual=Sum('actual_passengers')
+    ).order_by():
+        actuals[row['route_id']][(row['week_start_date'] - start).days // 7] = row['actual']
+    return actuals
+
+
+def ewma_profile(weeks, alpha=DEFAULT_ALPHA):
+    """Smooth each hour-of-week slot across weeks, oldest first"""
+    profile = array('d', weeks[0]) if weeks else empty_week()
+    for week in weeks[1:]:
+        for index in range(HOURS_PER_WEEK):
+            profile[index] = alpha * week[index] + (1 - alpha) * profile[index]
+    return profile
+
+
+def weekly_trend(totals):
+    """
+    Least-squares slope of weekly totals, relative to their mean
+
+    Returns:
+        float: e.g. 0.05 for demand growing 5% of the mean per week
+    """
+    count = len(totals)
+    mean = sum(totals) / count if count else 0
+    if count < 2 or not mean:
+        return 0.0
+
+    mean_x = (count - 1) / 2
+    covariance = sum((x - mean_x) * (y - mean) for x, y in enumerate(totals))
+    variance = sum((x - mean_x) ** 2 for x in range(count))
+    return max(-MAX_TREND, min(MAX_TREND, covariance / variance / mean))
+
+
+def calibration_scale(weeks, actuals):
+    """
+    Ratio of recorded passengers to the demand signal
+
+    Only weeks with recorded ticket sales are compared; without any the
+    signal is used as is.
+    """
+    signal = sum(sum(weeks[index]) for index in actuals)
+    if not actuals or not signal:
+        return 1.0
+    return sum(actuals.values()) / signal
+
+
+def fit(weeks, actuals=None, alpha=DEFAULT_ALPHA):
+    """
+    Fit one route's model
+
+    Args:
+        weeks: Hourly signal arrays per week, oldest first
+        actuals: {week index: recorded passengers}
+
+    Returns:
+        tuple: (profile, trend, scale)
+    """
+    return (
+        ewma_profile(weeks, alpha),
+        weekly_trend([sum(week) for week in weeks]),
+        calibration_scale(weeks, actuals or {}),
+    )
+
+
+def train(route_ids=None, weeks=None, alpha=DEFAULT_ALPHA, today=None):
+    """
+    Train and store forecasts for routes (all routes by default)
+
+    Returns:
+        int: Number of forecasts stored
+    """
+    weeks = weeks or getattr(settings, 'FORECAST_TRAINING_WEEKS', 12)
+    if route_ids is None:
+        route_ids = list(Route.objects.values_list('id', flat=True))
+    start, end = training_window(weeks, today)
+
+    series = collect_series(start, end, route_ids)
+    actuals = actual_passengers(start, end, route_ids)
+
+    for route_id, weekly in series.items():
+        profile, trend, scale = fit(weekly, actuals.get(route_id), alpha)
+        DemandForecast.objects.update_or_create(
+            route_id=route_id,
+            defaults={
+                'window_start': start,
+                'window_end': end,
+                'weeks': weeks,
+                'profile': profile.tobytes(),
+                'trend': trend,
+                'scale': scale,
+            }
+        )
+        cache.delete(cache_key(route_id))
+
+    return len(series)
+
+
+class Forecast:
+    """
+    A trained forecast ready to serve
+    """
+    __slots__ = ('route_id', 'window_end', 'trend', 'scale', 'profile', 'trained_at')
+
+    def __init__(self, route_id, window_end, trend, scale, profile, trained_at):
+        self.route_id = route_id
+        self.window_end = window_end
+        self.trend = trend
+        self.scale = scale
+        self.profile = profile
+        self.trained_at = trained_at
+
+    def expected(self, date, hour):
+        """Expected passengers in one hour"""
+        weeks_ahead = (date - self.window_end).days / 7
+        growth = max(0.0, 1 + self.trend * weeks_ahead)
+        return self.profile[slot(date, hour)] * growth * self.scale
+
+    def day(self, date):
+        """Expected passengers for each hour of a day"""
+        return [self.expected(date, hour) for hour in range(24)]
+
+
+def cache_key(route_id):
+    return f'demand-forecast:{route_id}'
+
+
+def get_forecast(route_id):
+    """
+    Get the trained forecast for a route, or None if not trained yet
+
+    Decoded forecasts are cached so serving needs no query.
+    """
+    forecast = cache.get(cache_key(route_id))
+    if forecast is not None:
+        return forecast
+
+    row = DemandForecast.objects.filter(route_id=route_id).values(
+        'window_end', 'trend', 'scale', 'profile', 'trained_at'
+    ).first()
+    if row is None:
+        return None
+
+    profile = array('d')
+    profile.frombytes(bytes(row['profile']))
+    forecast = Forecast(
+        route_id, row['window_end'], row['trend'], row['scale'], profile, row['trained_at']
+    )
+    cache.set(
+        cache_key(route_id),
+        forecast,
+        getattr(settings, 'FORECAST_CACHE_TTL', 300)
+    )
+    return forecast
@@ -0,0 +1,169 @@
+"""
+Background Jobs
+Runs batch tasks outside the request/response cycle
+
+Tasks are plain functions registered under a name with @task. They are
+queued as Job rows and run either by a small thread pool inside the web
+process (JOB_RUNNER = 'thread', for development) or by one or more
+python manage.py run_jobs workers (JOB_RUNNER = 'worker'). A job is
+claimed with a compare-and-set on its status, so a job queued while
+both are active still runs exactly once.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Task name -> function(job, **arguments)
+_registry = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def task(name):
+    """
+    Register a function as a background task
+
+    The function is called with the Job as first argument, followed
+    by the job's arguments, and returns a JSON-serializable result.
+    """
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def registered():
+    return sorted(_registry)
+
+
+def _runner():
+    return getattr(settings, 'JOB_RUNNER', 'thread')
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'JOB_THREADS', 2),
+                thread_name_prefix='job'
+            )
+        return _executor
+
+
+def enqueue(name, user=None, **arguments):
+    """
+    Queue a registered task
+
+    The row is written in the caller's transaction and only handed to
+    the thread pool once that commits, so a rolled back request never
+    starts a job.
+
+    Returns:
+        Job: The queued job
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+
+    job = Job.objects.create(task=name, arguments=arguments, created_by=user)
+    if _runner() == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job
+
+
+def latest(name, **arguments):
+    """
+    Most recent job of a task, e.g. latest(TASK, route_id=1)
+
+    Returns:
+        Job: The latest job with these arguments, or None
+    """
+    filters = {f'arguments__{key}': value for key, value in arguments.items()}
+    return Job.objects.filter(task=name, **filters).order_by('-created_at', '-pk').first()
+
+
+def claim(job_id=None):
+    """
+    Mark a queued job as running
+
+    Args:
+        job_id: Job to claim; the oldest queued job when None
+
+    Returns:
+        Job: The claimed job, or None if there was nothing to claim
+    """
+    queued = Job.objects.filter(status='queued')
+    while True:
+        if job_id is None:
+            candidate = queued.order_by('created_at', 'pk').values_list('pk', flat=True).first()
+            if candidate is None:
+                return None
+        else:
+            candidate = job_id
+
+        # Another runner may claim the same job between the read and here
+        claimed = queued.filter(pk=candidate).update(status='running', started_at=timezone.now())
+        if claimed:
+            return Job.objects.get(pk=candidate)
+        if job_id is not None:
+            return None
+
+
+def set_progress(job, progress, message=''):
+    """Record how far a running job has got"""
+    job.progress = max(0, min(int(progress), 100))
+    job.message = message[:200]
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message)
+
+
+def run(job):
+    """
+    Run a claimed job and store its result or error
+
+    Returns:
+        Job: The finished job
+    """
+    func = _registry.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Task {job.task} is not registered")
+        job.result = func(job, **job.arguments)
+        job.status = 'succeeded'
+        job.progress = 100
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.task)
+        job.status = 'failed'
+        job.error = f"{type(exc).__name__}: {exc}"
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'progress', 'error', 'finished_at'])
+    return job
+
+
+def run_next():
+    """
+    Claim and run the oldest queued job
+
+    Returns:
+        Job: The finished job, or None if the queue was empty
+    """
+    job = claim()
+    return run(job) if job else None
+
+
+def _run_in_thread(job_id):
+    try:
+        job = claim(job_id)
+        if job:
+            run(job)
+    finally:
+        close_old_connections()
@@ -0,0 +1,51 @@
+"""
+Move historical rows into archive tables
+
+Usage:
+    python manage.py archive_history
+    python manage.py archive_history --days 90 --batch-size 1000 --dry-run
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from operations.archive import archive_all
+
+
+class Command(BaseCommand):
+    help = "Archive schedules, assignments, pre-informs and demand alerts older than the horizon"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180),
+            help="Archive rows older than this many days"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Rows moved per transaction"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many rows would be archived"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['days'])
+        results = archive_all(
+            cutoff=cutoff,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        for label, count in results.items():
+            self.stdout.write(f"{verb} {count} {label} row(s) older than {cutoff}")
+        self.stdout.write(self.style.SUCCESS("Archival complete"))
@@ -0,0 +1,27 @@
+"""
+Roll up changed days into DailyPerformance
+
+Usage:
+    python manage.py refresh_daily_performance
+    python manage.py refresh_daily_performance --full
+"""
+
+from django.core.management.base import BaseCommand
+
+from operations.rollups import refresh
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily performance rollups for days whose schedules or pre-informs changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="Rebuild every day since the archive cutoff, not only changed ones"
+        )
+
+    def handle(self, *args, **options):
+        days, rows = refresh(full=options['full'])
+        self.stdout.write(f"Rebuilt {days} day(s), {rows} rollup row(s)")
+        self.stdout.write(self.style.SUCCESS("Rollup refresh complete"))
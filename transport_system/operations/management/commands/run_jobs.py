@@ -0,0 +1,51 @@
+"""
+Run queued background jobs
+
+Usage:
+    python manage.py run_jobs
+    python manage.py run_jobs --once
+    python manage.py run_jobs --sleep 5
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from operations import jobs
+
+
+class Command(BaseCommand):
+    help = "Work through queued background jobs (use with JOB_RUNNER = 'worker')"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once the queue is empty instead of waiting for more jobs"
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=getattr(settings, 'JOB_POLL_SECONDS', 2),
+            help="Seconds to wait between polls of an empty queue"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Running jobs for: {', '.join(jobs.registered())}")
+        ran = 0
+        while True:
+            job = jobs.run_next()
+            if job is None:
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['sleep'])
+                continue
+
+            ran += 1
+            style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+            self.stdout.write(style(f"{job.task} #{job.pk}: {job.status}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)"))
@@ -0,0 +1,52 @@
+"""
+Train demand forecasts per route
+
+Intended to run nightly or weekly, after the demand cube is reconciled.
+
+Usage:
+    python manage.py train_forecasts
+    python manage.py train_forecasts --weeks 8 --alpha 0.5 --route 1 --route 2
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from operations.forecasting import train, DEFAULT_ALPHA
+
+
+class Command(BaseCommand):
+    help = "Train seasonal demand forecasts from pre-informs, demand alerts and actual passengers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=getattr(settings, 'FORECAST_TRAINING_WEEKS', 12),
+            help="Full weeks of history to train on"
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=DEFAULT_ALPHA,
+            help="EWMA smoothing factor between 0 and 1"
+        )
+        parser.add_argument(
+            '--route',
+            type=int,
+            action='append',
+            dest='routes',
+            help="Only train this route id (repeatable)"
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['alpha'] <= 1:
+            raise CommandError("--alpha must be between 0 and 1")
+        if options['weeks'] < 1:
+            raise CommandError("--weeks must be at least 1")
+
+        count = train(
+            route_ids=options['routes'],
+            weeks=options['weeks'],
+            alpha=options['alpha']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Trained {count} route forecast(s)"))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0002_initial'),
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateField(help_text='First day of training data')),
+                ('window_end', models.DateField(help_text='Last day of training data')),
+                ('weeks', models.PositiveSmallIntegerField(help_text='Weeks of training data')),
+                ('profile', models.BinaryField(help_text='Hour-of-week demand profile (168 doubles)')),
+                ('trend', models.FloatField(default=0, help_text='Relative change in weekly demand per week')),
+                ('scale', models.FloatField(default=1, help_text='Actual passengers per pre-informed passenger')),
+                ('trained_at', models.DateTimeField(auto_now=True)),
+                ('route', models.OneToOneField(help_text='Route being forecast', on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecast', to='routes.route')),
+            ],
+            options={
+                'verbose_name': 'Demand Forecast',
+                'verbose_name_plural': 'Demand Forecasts',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0003_demandforecast'),
+        ('routes', '0003_link_stops_to_places'),
+        ('schedules', '0005_stoptime_place'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('processed_until', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Service day')),
+                ('trips', models.PositiveIntegerField(default=0, help_text='Bus assignments on this route and day')),
+                ('total_kms', models.DecimalField(decimal_places=2, default=0, help_text='Kilometers traveled', max_digits=10)),
+                ('estimated_passengers', models.PositiveIntegerField(default=0, help_text="This bus's share of the route's pre-informed passengers")),
+                ('actual_passengers', models.PositiveIntegerField(default=0, help_text="Seats booked on this bus's trips")),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_profit', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('dirty', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bus', models.ForeignKey(help_text='Bus being tracked', on_delete=django.db.models.deletion.CASCADE, related_name='daily_performances', to='schedules.bus')),
+                ('route', models.ForeignKey(help_text='Route being served', on_delete=django.db.models.deletion.CASCADE, related_name='daily_performances', to='routes.route')),
+            ],
+            options={
+                'verbose_name': 'Daily Performance',
+                'verbose_name_plural': 'Daily Performances',
+                'ordering': ['-date', 'bus'],
+                'indexes': [models.Index(fields=['date', 'route'], name='operations__date_fe1638_idx'), models.Index(fields=['bus', 'date'], name='operations__bus_id_61ba36_idx')],
+                'unique_together': {('bus', 'route', 'date')},
+            },
+        ),
+    ]
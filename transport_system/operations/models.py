@@ -5,10 +5,43 @@ Tracks performance metrics and financial data
 
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from schedules.models import Bus
 from routes.models import Route
 from decimal import Decimal
 
+# Assumption: Average journey is half the route distance
+AVERAGE_JOURNEY_SHARE = Decimal('0.5')
+
+
+def calculate_financials(passengers, route_distance, total_kms, mileage,
+                         ticket_price=None, fuel_price=None):
+    """
+    Revenue, cost and profit of a bus on a route
+    
+    Args:
+        passengers: Paying passengers (actual if known, else estimated)
+        route_distance: Length of the route in km
+        total_kms: Kilometres driven
+        mileage: Bus fuel efficiency in km/liter
+        ticket_price, fuel_price: Decimal prices; read from settings
+                                  when not given
+    
+    Returns:
+        tuple: (revenue, cost, profit) as Decimals
+    """
+    if ticket_price is None:
+        ticket_price = Decimal(settings.TICKET_PRICE_PER_KM)
+    if fuel_price is None:
+        fuel_price = Decimal(settings.FUEL_PRICE_PER_LITER)
+    
+    revenue = passengers * (route_distance * AVERAGE_JOURNEY_SHARE) * ticket_price
+    
+    # Cost is fuel only for now
+    cost = total_kms / Decimal(mileage) * fuel_price
+    
+    return revenue, cost, revenue - cost
+
 
 class WeeklyPerformance(models.Model):
     """
@@ -108,22 +141,13 @@ class WeeklyPerformance(models.Model):
             else self.estimated_passengers
         )
         
-        # Calculate revenue
-        # Assumption: Average journey is half the route distance
-        average_journey_distance = self.route.total_distance * Decimal('0.5')
-        self.total_revenue = (
-            passengers_for_revenue * 
-            average_journey_distance * 
-            Decimal(settings.TICKET_PRICE_PER_KM)
+        self.total_revenue, self.total_cost, self.total_profit = calculate_financials(
+            passengers_for_revenue,
+            self.route.total_distance,
+            self.total_kms,
+            self.bus.mileage
         )
         
-        # Calculate cost (fuel cost only for now)
-        fuel_used = self.total_kms / Decimal(self.bus.mileage)
-        self.total_cost = fuel_used * Decimal(settings.FUEL_PRICE_PER_LITER)
-        
-        # Calculate profit
-        self.total_profit = self.total_revenue - self.total_cost
-        
         super().save(*args, **kwargs)
     
     def profit_per_km(self):
@@ -140,4 +164,182 @@ class WeeklyPerformance(models.Model):
     
     def is_profitable(self):
         """Check if this operation was profitable"""
-        return self.total_profit > 0
\ No newline at end of file
+        return self.total_profit > 0
+
+class DemandForecast(models.Model):
+    """
+    Demand Forecast Model
+    Trained seasonal demand profile for one route
+    
+    The profile holds expected passengers for each hour of the week
+    (Monday 00:00 first), packed as 168 doubles.
+    """
+    route = models.OneToOneField(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='demand_forecast',
+        help_text="Route being forecast"
+    )
+    
+    # Training window
+    window_start = models.DateField(help_text="First day of training data")
+    window_end = models.DateField(help_text="Last day of training data")
+    weeks = models.PositiveSmallIntegerField(help_text="Weeks of training data")
+    
+    # Model parameters
+    profile = models.BinaryField(help_text="Hour-of-week demand profile (168 doubles)")
+    trend = models.FloatField(
+        default=0,
+        help_text="Relative change in weekly demand per week"
+    )
+    scale = models.FloatField(
+        default=1,
+        help_text="Actual passengers per pre-informed passenger"
+    )
+    
+    trained_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Demand Forecast'
+        verbose_name_plural = 'Demand Forecasts'
+    
+    def __str__(self):
+        return f"Forecast for {self.route} ({self.window_start} to {self.window_end})"
+
+
+class DailyPerformance(models.Model):
+    """
+    Daily Performance Model
+    Rollup of trips, passengers and financials per bus, route and day
+    
+    Maintained incrementally by operations.rollups; range dashboards
+    sum these rows instead of rescanning schedules and pre-informs.
+    """
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name='daily_performances',
+        help_text="Bus being tracked"
+    )
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='daily_performances',
+        help_text="Route being served"
+    )
+    date = models.DateField(help_text="Service day")
+    
+    trips = models.PositiveIntegerField(
+        default=0,
+        help_text="Bus assignments on this route and day"
+    )
+    total_kms = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Kilometers traveled"
+    )
+    estimated_passengers = models.PositiveIntegerField(
+        default=0,
+        help_text="This bus's share of the route's pre-informed passengers"
+    )
+    actual_passengers = models.PositiveIntegerField(
+        default=0,
+        help_text="Seats booked on this bus's trips"
+    )
+    total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_profit = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    
+    # Set when a source row of this day is deleted, so the next refresh
+    # rebuilds the day
+    dirty = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Daily Performance'
+        verbose_name_plural = 'Daily Performances'
+        ordering = ['-date', 'bus']
+        unique_together = ['bus', 'route', 'date']
+        indexes = [
+            models.Index(fields=['date', 'route']),
+            models.Index(fields=['bus', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.bus} - {self.route} - {self.date}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Rollup Watermark Model
+    Source rows changed after `processed_until` have not been rolled up
+    """
+    name = models.CharField(max_length=50, unique=True)
+    processed_until = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+    
+    def __str__(self):
+        return f"{self.name} up to {self.processed_until}"
+
+
+class Job(models.Model):
+    """
+    Background Job Model
+    A queued run of a registered batch task, with its progress and result
+    
+    Jobs are claimed by the in-process thread pool or by
+    python manage.py run_jobs (see operations.jobs).
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    
+    task = models.CharField(max_length=100, help_text="Registered task name")
+    arguments = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Keyword arguments for the task"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    
+    # Progress reported by the task while it runs
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    message = models.CharField(max_length=200, blank=True)
+    
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text="User who started the job"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+    
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
@@ -0,0 +1,152 @@
+"""
+Weekly Report Engine
+Builds WeeklyPerformance rows for every bus and route of a week
+
+Each source table is read with one grouped query: bus assignments per
+(bus, route) from the live and archive tables, estimated passengers
+per route from the demand cube, and the actual passengers already
+entered on existing rows. All rows are written with a single upsert,
+so the cost does not grow with per-row queries.
+
+Financials are computed in Python, one calculate_financials call per
+(bus, route) group. The loop runs no queries. Its passenger input
+includes subscription occurrences that are only expanded in Python,
+so SQL cannot aggregate it. Daily rollups use the same function, so
+both reports price trips the same way.
+
+Cancelled pre-informs are not part of the estimate.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from schedules.models import BusSchedule
+from preinforms import cube
+from . import archive
+from .models import WeeklyPerformance, calculate_financials
+
+# Fields refreshed when a week's report is generated again; entered
+# actual passengers are kept
+UPDATE_FIELDS = [
+    'estimated_passengers',
+    'total_passengers',
+    'total_kms',
+    'total_revenue',
+    'total_cost',
+    'total_profit',
+    'updated_at',
+]
+
+
+def last_week_start(today=None):
+    """Monday of the previous week"""
+    today = today or timezone.localdate()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def assignment_groups(week_start, week_end):
+    """
+    Bus assignments of a week grouped by bus and route
+
+    Archived assignments are read too, so past weeks can be rebuilt.
+
+    Returns:
+        list: dicts with bus_id, route_id, trips, total_kms,
+              route_distance and mileage
+    """
+    groups = {}
+    for model in archive.sources(BusSchedule):
+        for row in model.objects.filter(
+            date__gte=week_start,
+            date__lte=week_end
+        ).values('bus_id', 'route_id').annotate(
+            trips=Count('id'),
+            total_kms=Sum('route__total_distance'),
+            route_distance=Max('route__total_distance'),
+            mileage=Max('bus__mileage'),
+        ).order_by():
+            key = (row['bus_id'], row['route_id'])
+            if key in groups:
+                groups[key]['trips'] += row['trips']
+                groups[key]['total_kms'] += row['total_kms']
+            else:
+                groups[key] = row
+    return [groups[key] for key in sorted(groups)]
+
+
+def build_week(week_start):
+    """
+    Compute and upsert the weekly performance of every bus and route
+
+    Args:
+        week_start: Monday of the week to report on
+
+    Returns:
+        list: One dict per (bus, route) with bus_id, route_id, trips,
+              estimated_passengers, total_kms, total_profit and created
+    """
+    week_end = week_start + timedelta(days=6)
+
+    groups = assignment_groups(week_start, week_end)
+    if not groups:
+        return []
+
+    route_estimates = cube.route_passenger_totals(week_start, week_end)
+    existing = {
+        (bus_id, route_id): actual
+        for bus_id, route_id, actual in WeeklyPerformance.objects.filter(
+            week_start_date=week_start
+        ).values_list('bus_id', 'route_id', 'actual_passengers')
+    }
+
+    ticket_price = Decimal(settings.TICKET_PRICE_PER_KM)
+    fuel_price = Decimal(settings.FUEL_PRICE_PER_LITER)
+
+    rows = []
+    report = []
+    for group in groups:
+        key = (group['bus_id'], group['route_id'])
+        estimated = route_estimates.get(group['route_id'], 0)
+        actual = existing.get(key, 0)
+        revenue, cost, profit = calculate_financials(
+            actual if actual > 0 else estimated,
+            group['route_distance'],
+            group['total_kms'],
+            group['mileage'],
+            ticket_price=ticket_price,
+            fuel_price=fuel_price
+        )
+        rows.append(WeeklyPerformance(
+            bus_id=group['bus_id'],
+            route_id=group['route_id'],
+            week_start_date=week_start,
+            estimated_passengers=estimated,
+            actual_passengers=actual,
+            total_passengers=estimated + actual,
+            total_kms=group['total_kms'],
+            total_revenue=revenue,
+            total_cost=cost,
+            total_profit=profit,
+        ))
+        report.append({
+            'bus_id': group['bus_id'],
+            'route_id': group['route_id'],
+            'trips': group['trips'],
+            'estimated_passengers': estimated,
+            'total_kms': group['total_kms'],
+            'total_profit': profit,
+            'created': key not in existing,
+        })
+
+    WeeklyPerformance.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['bus', 'route', 'week_start_date'],
+        update_fields=UPDATE_FIELDS
+    )
+    return report
@@ -0,0 +1,310 @@
+"""
+Daily Performance Rollups
+Incrementally maintained DailyPerformance rows and range summaries
+
+A refresh only rebuilds days whose source rows changed since the last
+run. Changes are found through updated_at on bus assignments, trips,
+pre-informs and subscriptions, compared against a stored watermark.
+Deleted rows, rows moved to another date and changes to a route's
+distance or a bus's mileage cannot be seen that way, so signals flag
+the affected days instead.
+
+Days before the archive cutoff are frozen: their source rows may
+already be archived, and their rollups are the record that remains.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from schedules.models import BusSchedule, Schedule
+from preinforms.models import PreInform, PreInformSubscription
+from preinforms import cube
+from . import archive
+from .archive import default_cutoff
+from .models import DailyPerformance, RollupWatermark, calculate_financials
+
+WATERMARK = 'daily_performance'
+
+# Days rebuilt per transaction
+CHUNK_DAYS = 31
+
+# Summary groupings: values() fields (and annotations) per group_by
+GROUPINGS = {
+    'day': {'period': F('date')},
+    'week': {'period': TruncWeek('date')},
+    'month': {'period': TruncMonth('date')},
+    'route': {'route_number': F('route__number'), 'route_name': F('route__name')},
+    'bus': {'number_plate': F('bus__number_plate')},
+}
+
+
+def mark_dirty(date):
+    """Flag a day's rollups for the next refresh"""
+    if date >= default_cutoff():
+        DailyPerformance.objects.filter(date=date, dirty=False).update(dirty=True)
+
+
+def mark_rows_dirty(**filters):
+    """Flag the live rollups of a bus or route, e.g. route_id=1"""
+    DailyPerformance.objects.filter(
+        date__gte=default_cutoff(), dirty=False, **filters
+    ).update(dirty=True)
+
+
+def subscription_days(start_date, end_date=None):
+    """
+    Live days whose rollups a subscription can touch
+
+    Returns:
+        tuple: (first, last) day; first > last when there are none
+    """
+    horizon = timezone.localdate() + timedelta(days=getattr(settings, 'SUBSCRIPTION_HORIZON_DAYS', 28))
+    return max(start_date, default_cutoff()), min(end_date or horizon, horizon)
+
+
+def mark_subscription_dirty(subscription):
+    """Flag every day a subscription covered, e.g. once it is deleted"""
+    first, last = subscription_days(subscription.start_date, subscription.end_date)
+    DailyPerformance.objects.filter(date__gte=first, date__lte=last, dirty=False).update(dirty=True)
+
+
+def split(total, weights):
+    """
+    Divide an integer total in proportion to weights
+
+    Largest remainders get the leftover units, so shares add up to
+    the total exactly.
+    """
+    weight_sum = sum(weights)
+    if not total or not weight_sum:
+        return [0] * len(weights)
+
+    exact = [total * weight / weight_sum for weight in weights]
+    shares = [int(value) for value in exact]
+    leftover = total - sum(shares)
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in by_remainder[:leftover]:
+        shares[i] += 1
+    return shares
+
+
+def changed_days(since=None):
+    """
+    Days whose rollups are out of date
+
+    Args:
+        since: Watermark; None means every live day
+
+    Returns:
+        list: Sorted dates on or after the archive cutoff
+    """
+    cutoff = default_cutoff()
+    changed = {'updated_at__gt': since} if since else {}
+
+    days = set()
+    for model, field in ((BusSchedule, 'date'), (Schedule, 'date'), (PreInform, 'date_of_travel')):
+        days.update(
+            model.objects.filter(
+                **{f'{field}__gte': cutoff}, **changed
+            ).values_list(field, flat=True).distinct().order_by()
+        )
+
+    # A changed subscription moves its virtual occurrences on every day it
+    # covers. Its end date is ignored, as the change may have moved it
+    # earlier and the days after it lost their occurrences.
+    for start in PreInformSubscription.objects.filter(**changed).values_list('start_date', flat=True):
+        day, last = subscription_days(start)
+        while day <= last:
+            days.add(day)
+            day += timedelta(days=1)
+
+    days.update(
+        DailyPerformance.objects.filter(
+            dirty=True, date__gte=cutoff
+        ).values_list('date', flat=True).distinct().order_by()
+    )
+    return sorted(days)
+
+
+def _groups(days):
+    """
+    Assignments and bookings per (bus, route, date), one query per
+    live and archive table
+
+    Returns:
+        dict: {(bus_id, route_id, date): dict of trips, total_kms,
+               booked, route_distance and mileage}
+    """
+    groups = {}
+
+    def group(row):
+        key = (row['bus_id'], row['route_id'], row['date'])
+        if key not in groups:
+            groups[key] = {
+                'trips': 0,
+                'total_kms': Decimal('0'),
+                'booked': 0,
+                'route_distance': row['route_distance'],
+                'mileage': row['mileage'],
+            }
+        return groups[key]
+
+    # Rebuilt days may reach before the archive cutoff
+    for model in archive.sources(BusSchedule):
+        for row in model.objects.filter(date__in=days).values(
+            'bus_id', 'route_id', 'date'
+        ).annotate(
+            trips=Count('id'),
+            total_kms=Sum('route__total_distance'),
+            route_distance=Max('route__total_distance'),
+            mileage=Max('bus__mileage'),
+        ).order_by():
+            entry = group(row)
+            entry['trips'] += row['trips']
+            entry['total_kms'] += row['total_kms']
+
+    for model in archive.sources(Schedule):
+        for row in model.objects.filter(date__in=days).values(
+            'bus_id', 'route_id', 'date'
+        ).annotate(
+            booked=Sum(F('total_seats') - F('available_seats')),
+            route_distance=Max('route__total_distance'),
+            mileage=Max('bus__mileage'),
+        ).order_by():
+            group(row)['booked'] += row['booked'] or 0
+
+    return groups
+
+
+def build_days(days):
+    """
+    Compute unsaved DailyPerformance rows for the given days
+
+    A route's estimated passengers for a day are shared between its
+    buses by number of assignments.
+    """
+    groups = _groups(days)
+    estimates = cube.route_day_totals(days[0], days[-1])
+
+    by_route_day = defaultdict(list)
+    for key in sorted(groups):
+        bus_id, route_id, date = key
+        by_route_day[(route_id, date)].append(key)
+
+    ticket_price = Decimal(settings.TICKET_PRICE_PER_KM)
+    fuel_price = Decimal(settings.FUEL_PRICE_PER_LITER)
+
+    rows = []
+    for route_day, keys in by_route_day.items():
+        # Buses with booked trips but no assignment still get a share
+        weights = [groups[key]['trips'] for key in keys]
+        shares = split(estimates.get(route_day, 0), weights if any(weights) else [1] * len(keys))
+        for key, estimated in zip(keys, shares):
+            entry = groups[key]
+            actual = entry['booked']
+            revenue, cost, profit = calculate_financials(
+                actual if actual > 0 else estimated,
+                entry['route_distance'],
+                entry['total_kms'],
+                entry['mileage'],
+                ticket_price=ticket_price,
+                fuel_price=fuel_price
+            )
+            rows.append(DailyPerformance(
+                bus_id=key[0],
+                route_id=key[1],
+                date=key[2],
+                trips=entry['trips'],
+                total_kms=entry['total_kms'],
+                estimated_passengers=estimated,
+                actual_passengers=actual,
+                total_revenue=revenue,
+                total_cost=cost,
+                total_profit=profit,
+            ))
+    return rows
+
+
+def rebuild_days(days):
+    """
+    Replace the rollups of the given days, CHUNK_DAYS per transaction
+
+    Returns:
+        int: Number of rows written
+    """
+    written = 0
+    for start in range(0, len(days), CHUNK_DAYS):
+        chunk = days[start:start + CHUNK_DAYS]
+        rows = build_days(chunk)
+        with transaction.atomic():
+            DailyPerformance.objects.filter(date__in=chunk).delete()
+            DailyPerformance.objects.bulk_create(rows, batch_size=500)
+        written += len(rows)
+    return written
+
+
+def refresh(full=False):
+    """
+    Bring rollups up to date
+
+    Args:
+        full: Rebuild every live day instead of only changed ones
+
+    Returns:
+        tuple: (days rebuilt, rows written)
+    """
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    # Read before scanning, so changes made during the run are seen again.
+    # A row stamped before this but committed after the scan would still
+    # be missed, so the watermark stays ROLLUP_WATERMARK_LAG_SECONDS behind.
+    started = timezone.now()
+
+    days = changed_days(None if full else watermark.processed_until)
+    written = rebuild_days(days)
+
+    watermark.processed_until = started - timedelta(
+        seconds=getattr(settings, 'ROLLUP_WATERMARK_LAG_SECONDS', 300)
+    )
+    watermark.save(update_fields=['processed_until'])
+    return len(days), written
+
+
+def summarize(date_from, date_to, group_by='day'):
+    """
+    Sum rollups over a date range
+
+    Args:
+        group_by: 'day', 'week', 'month', 'route' or 'bus'
+
+    Returns:
+        list: dicts with the grouping fields, trips, total_kms,
+              estimated_passengers, actual_passengers, total_revenue,
+              total_cost and total_profit
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping: {group_by}")
+
+    fields = GROUPINGS[group_by]
+    queryset = DailyPerformance.objects.filter(
+        date__gte=date_from,
+        date__lte=date_to
+    ).annotate(**fields).values(*fields).annotate(
+        trips=Sum('trips'),
+        total_kms=Sum('total_kms'),
+        estimated_passengers=Sum('estimated_passengers'),
+        actual_passengers=Sum('actual_passengers'),
+        total_revenue=Sum('total_revenue'),
+        total_cost=Sum('total_cost'),
+        total_profit=Sum('total_profit'),
+    )
+
+    if 'period' in fields:
+        return list(queryset.order_by('period'))
+    return list(queryset.order_by('-total_profit'))
@@ -0,0 +1,52 @@
+"""
+Operations Serializers
+"""
+
+from rest_framework import serializers
+from .models import Job
+from . import jobs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for background jobs
+    """
+    class Meta:
+        model = Job
+        fields = [
+            'id',
+            'task',
+            'arguments',
+            'status',
+            'progress',
+            'message',
+            'result',
+            'error',
+            'created_by',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'progress', 'message', 'result', 'error',
+            'created_by', 'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def validate_task(self, value):
+        if value not in jobs.registered():
+            raise serializers.ValidationError(
+                f"Unknown task. Available: {', '.join(jobs.registered())}"
+            )
+        return value
+    
+    def validate_arguments(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("arguments must be an object")
+        return value
+    
+    def create(self, validated_data):
+        return jobs.enqueue(
+            validated_data['task'],
+            user=validated_data.get('created_by'),
+            **validated_data.get('arguments', {})
+        )
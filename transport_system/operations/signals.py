@@ -0,0 +1,114 @@
+"""
+Operations Signals
+Flag daily rollups whose source rows are deleted or moved to another
+day, or whose route distance or bus mileage changes, and queue route
+timing propagation
+"""
+
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from routes.models import Route
+from schedules.models import Bus, BusSchedule, Schedule
+from schedules import propagation
+from preinforms.models import PreInform, PreInformSubscription
+from preinforms import cube
+from . import jobs, rollups
+
+
+@receiver(post_delete, sender=BusSchedule)
+@receiver(post_delete, sender=Schedule)
+def trip_deleted(sender, instance, **kwargs):
+    # Archived rows keep their rollups, as they keep their demand in the cube
+    if not cube.is_suspended():
+        rollups.mark_dirty(instance.date)
+
+
+@receiver(post_delete, sender=PreInform)
+def preinform_deleted(sender, instance, **kwargs):
+    if not cube.is_suspended():
+        rollups.mark_dirty(instance.date_of_travel)
+
+
+@receiver(post_delete, sender=PreInformSubscription)
+def subscription_deleted(sender, instance, **kwargs):
+    rollups.mark_subscription_dirty(instance)
+
+
+@receiver(post_init, sender=BusSchedule)
+@receiver(post_init, sender=Schedule)
+def trip_loaded(sender, instance, **kwargs):
+    """Remember the day a trip was loaded with; None if new or deferred"""
+    instance._loaded_date = instance.__dict__.get('date') if instance.pk else None
+
+
+@receiver(pre_save, sender=BusSchedule)
+@receiver(pre_save, sender=Schedule)
+def trip_moving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The new day is found by its updated_at, the old one is flagged here"""
+    if raw or (update_fields and 'date' not in update_fields):
+        return
+    # Instances built in code may hold raw strings
+    to_date = sender._meta.get_field('date').to_python
+    new_date = to_date(instance.date)
+    old_date = to_date(getattr(instance, '_loaded_date', None))
+    if old_date is None and instance.pk is not None:
+        # Loaded with the date deferred
+        old_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+    if old_date and old_date != new_date:
+        rollups.mark_dirty(old_date)
+    instance._loaded_date = new_date
+
+
+@receiver(pre_save, sender=PreInform)
+def preinform_moving(sender, instance, raw=False, **kwargs):
+    """Same for pre-informs, using the state remembered on load"""
+    state = getattr(instance, '_loaded_state', None)
+    old_date = getattr(state, 'date_of_travel', None)
+    if not raw and old_date and old_date != instance.date_of_travel:
+        rollups.mark_dirty(old_date)
+
+
+@receiver(post_save, sender=Route)
+def route_distance_changed(sender, instance, created, **kwargs):
+    """Kilometres and costs of the route's days follow its distance"""
+    # Set by Route.from_db; routes built in code have nothing to compare
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None or 'total_distance' not in loaded:
+        return
+    if loaded['total_distance'] != instance.total_distance:
+        loaded['total_distance'] = instance.total_distance
+        rollups.mark_rows_dirty(route_id=instance.pk)
+
+
+@receiver(post_init, sender=Bus)
+def bus_loaded(sender, instance, **kwargs):
+    """Remember the mileage a bus was loaded with; None if new or deferred"""
+    instance._loaded_mileage = instance.__dict__.get('mileage') if instance.pk else None
+
+
+@receiver(post_save, sender=Bus)
+def bus_mileage_changed(sender, instance, created, **kwargs):
+    """Fuel costs of the bus's days follow its mileage"""
+    loaded = getattr(instance, '_loaded_mileage', None)
+    if created or loaded is None or loaded == instance.mileage:
+        return
+    instance._loaded_mileage = instance.mileage
+    rollups.mark_rows_dirty(bus_id=instance.pk)
+
+
+@receiver(post_save, sender=Route)
+def route_timing_changed(sender, instance, created, **kwargs):
+    """Retime upcoming trips in a job when duration, turnaround or buffer change"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        return
+    timing = {
+        field: instance.__dict__[field]
+        for field in propagation.TIMING_FIELDS if field in instance.__dict__
+    }
+    if all(loaded.get(field, value) == value for field, value in timing.items()):
+        return
+    loaded.update(timing)
+    # Starts once the admin's transaction commits
+    jobs.enqueue(propagation.TASK, route_id=instance.pk)
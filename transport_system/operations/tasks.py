@@ -0,0 +1,71 @@
+"""
+Background Tasks
+Batch work of every app, registered with the job runner
+
+Arguments arrive from JSON, so dates are ISO strings.
+"""
+
+import logging
+from datetime import date
+
+from demand import services as demand_services
+from preinforms import lifecycle
+from schedules import propagation
+from . import archive, forecasting, reports, rollups
+from .jobs import set_progress, task
+
+logger = logging.getLogger(__name__)
+
+
+def _date(value):
+    return date.fromisoformat(value) if value else None
+
+
+@task('operations.weekly_report')
+def weekly_report(job, week_start=None):
+    """Build WeeklyPerformance rows for a week (last week by default)"""
+    week_start = _date(week_start) or reports.last_week_start()
+    set_progress(job, 10, f"Building report for week of {week_start}")
+    rows = reports.build_week(week_start)
+    return {
+        'week_start': week_start,
+        'rows': rows,
+        'created': sum(1 for row in rows if row['created']),
+    }
+
+
+@task('operations.refresh_rollups')
+def refresh_rollups(job, full=False):
+    days, written = rollups.refresh(full=full)
+    return {'days': days, 'rows': written}
+
+
+@task('operations.archive_history')
+def archive_history(job, cutoff=None, batch_size=500):
+    return archive.archive_all(cutoff=_date(cutoff), batch_size=batch_size)
+
+
+@task('operations.train_forecasts')
+def train_forecasts(job, route_ids=None, weeks=None, alpha=forecasting.DEFAULT_ALPHA):
+    return {'trained': forecasting.train(route_ids=route_ids, weeks=weeks, alpha=alpha)}
+
+
+@task('preinforms.close_past')
+def close_past_preinforms(job):
+    return lifecycle.close_past()
+
+
+@task('demand.expire_alerts')
+def expire_demand_alerts(job):
+    return {'expired': demand_services.expire_overdue()}
+
+
+@task('schedules.propagate_route_timing')
+def propagate_route_timing(job, route_id):
+    set_progress(job, 10, f"Recomputing upcoming trips of route {route_id}")
+    result = propagation.propagate_route_timing(route_id)
+    logger.info(
+        "Propagated timing change for route %s: %s trip(s) updated, %s conflict(s)",
+        route_id, result['updated'], len(result['conflicts'])
+    )
+    return result
@@ -1,3 +1,536 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from routes.models import Route, Stop
+from schedules.models import ArchivedSchedule, Bus, BusSchedule, Schedule
+from preinforms import cube
+from preinforms.models import ArchivedPreInform, DemandCell, PreInform, PreInformSubscription
+from users.models import CustomUser
+from .models import DailyPerformance, Job, RollupWatermark, WeeklyPerformance
+from . import analytics, archive, forecasting, jobs, reports, rollups
+
+
+class AnalyticsDashboardTests(TestCase):
+    """
+    Analytics aggregates are computed in the database
+    """
+
+    def setUp(self):
+        self.start_date = timezone.now().date() - timedelta(weeks=8)
+        self.week = self.start_date + timedelta(days=7 - self.start_date.weekday())
+        self.routes = [
+            Route.objects.create(
+                number=str(100 + i), name=f'Route {i}', origin='A', destination='B',
+                total_distance=Decimal('20'), duration=Decimal('1.0')
+            )
+            for i in range(2)
+        ]
+        self.bus_count = 0
+
+    def add_performances(self, count, weeks=1):
+        for _ in range(count):
+            self.bus_count += 1
+            bus = Bus.objects.create(number_plate=f'KL-{self.bus_count}', capacity=40)
+            for week in range(weeks):
+                WeeklyPerformance.objects.create(
+                    bus=bus,
+                    route=self.routes[self.bus_count % 2],
+                    week_start_date=self.week + timedelta(weeks=week),
+                    estimated_passengers=10 * self.bus_count,
+                    total_kms=Decimal('100')
+                )
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_performances(2)
+        with self.assertNumQueries(5):
+            analytics.dashboard(self.start_date)
+
+        self.add_performances(20, weeks=3)
+        with self.assertNumQueries(5):
+            context = analytics.dashboard(self.start_date)
+
+        self.assertEqual(len(context['weekly_trends']), 3)
+        self.assertEqual(len(context['route_performance']), 2)
+        self.assertEqual(len(context['bus_efficiency']), 10)
+
+    def test_aggregates_match_rows(self):
+        self.add_performances(4, weeks=2)
+        performances = WeeklyPerformance.objects.all()
+
+        trends = analytics.weekly_trends(self.start_date)
+        self.assertEqual(
+            [week['week_start_date'] for week in trends],
+            [self.week, self.week + timedelta(weeks=1)]
+        )
+        self.assertEqual(
+            sum(week['total_profit'] for week in trends),
+            sum(p.total_profit for p in performances)
+        )
+
+        for route in analytics.route_performance(self.start_date):
+            rows = performances.filter(route__number=route['route__number'])
+            profit = sum(p.total_profit for p in rows)
+            kms = sum(p.total_kms for p in rows)
+            self.assertEqual(route['total_profit'], profit)
+            self.assertAlmostEqual(route['profit_per_km'], float(profit / kms))
+
+        efficiency = analytics.bus_efficiency(self.start_date)
+        ratios = [bus['revenue_per_km'] for bus in efficiency]
+        self.assertEqual(ratios, sorted(ratios, reverse=True))
+        self.assertEqual(efficiency[0]['bus__number_plate'], 'KL-4')
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class DemandCountingTests(TestCase):
+    """
+    Which pre-informs the demand pattern and weekly estimates count
+    """
+
+    def setUp(self):
+        self.week = reports.last_week_start()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        self.user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+        BusSchedule.objects.create(
+            bus=bus, route=self.route, date=self.week,
+            start_time=time(8), end_time=time(9)
+        )
+
+    def preinform(self, status='pending', passengers=2):
+        return PreInform.objects.create(
+            user=self.user, route=self.route, boarding_stop=self.stop,
+            date_of_travel=self.week, desired_time=time(8, 30),
+            passenger_count=passengers, status=status
+        )
+
+    def test_pattern_sums_expected_passengers_by_travel_day(self):
+        self.preinform(passengers=3)
+        self.preinform(passengers=4)
+        self.preinform(status='cancelled', passengers=5)
+
+        with self.assertNumQueries(2):
+            pattern = cube.weekday_hour_pattern(self.week)
+
+        self.assertEqual(pattern, [{
+            'day_of_week': self.week.isoweekday() % 7 + 1,
+            'hour': 8,
+            'demand_count': 7,
+        }])
+        self.assertEqual(cube.weekday_hour_pattern(self.week + timedelta(days=1)), [])
+
+    def test_weekly_estimate_leaves_out_cancelled(self):
+        self.preinform(passengers=3)
+        self.preinform(status='cancelled', passengers=5)
+
+        [row] = reports.build_week(self.week)
+
+        self.assertEqual(row['estimated_passengers'], 3)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None, ROLLUP_WATERMARK_LAG_SECONDS=300)
+class RollupRefreshTests(TestCase):
+    """
+    Incremental refreshes find every day whose rollups changed
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+        BusSchedule.objects.create(
+            bus=self.bus, route=self.route, date=self.today,
+            start_time=time(8), end_time=time(9)
+        )
+        rollups.refresh()
+
+    def rollup_days(self):
+        return set(DailyPerformance.objects.values_list('date', flat=True))
+
+    def test_watermark_stays_behind_the_refresh(self):
+        watermark = RollupWatermark.objects.get(name=rollups.WATERMARK)
+        self.assertLessEqual(watermark.processed_until, timezone.now() - timedelta(seconds=300))
+
+    def test_moved_trip_rebuilds_both_days(self):
+        trip = BusSchedule.objects.get()
+        tomorrow = self.today + timedelta(days=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            trip.date = tomorrow
+            trip.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+        self.assertTrue(DailyPerformance.objects.get(date=self.today).dirty)
+
+        rollups.refresh()
+        self.assertEqual(self.rollup_days(), {tomorrow})
+
+    def test_route_distance_and_bus_mileage_changes_rebuild_costs(self):
+        route = Route.objects.get(pk=self.route.pk)
+        route.name = 'Renamed'
+        route.save()
+        self.assertFalse(DailyPerformance.objects.get().dirty)
+
+        route.total_distance = Decimal('30')
+        route.save()
+        self.assertTrue(DailyPerformance.objects.get().dirty)
+        rollups.refresh()
+        rollup = DailyPerformance.objects.get()
+        self.assertEqual(rollup.total_kms, Decimal('30'))
+
+        bus = Bus.objects.get(pk=self.bus.pk)
+        bus.mileage = bus.mileage * 2
+        bus.save()
+        self.assertTrue(DailyPerformance.objects.get().dirty)
+        rollups.refresh()
+        # Fuel cost is kilometres over mileage
+        self.assertAlmostEqual(DailyPerformance.objects.get().total_cost, rollup.total_cost / 2)
+
+    def test_deleted_subscription_flags_the_days_it_covered(self):
+        stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        subscription = PreInformSubscription.objects.create(
+            user=CustomUser.objects.create_user(email='p@x.com', password='x'),
+            route=self.route, boarding_stop=stop, desired_time=time(8),
+            passenger_count=2, weekday_mask=127, start_date=self.today
+        )
+        rollups.refresh(full=True)
+        self.assertEqual(DailyPerformance.objects.get().estimated_passengers, 2)
+
+        subscription.delete()
+        self.assertTrue(DailyPerformance.objects.get().dirty)
+
+        rollups.refresh()
+        self.assertEqual(DailyPerformance.objects.get().estimated_passengers, 0)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None, ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    """
+    Old rows move to the archive unchanged and stay visible to analytics
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.old, self.recent = [
+            PreInform.objects.create(
+                user=user, route=route, boarding_stop=stop,
+                date_of_travel=self.today - timedelta(days=days),
+                desired_time=time(8), passenger_count=passengers
+            )
+            for days, passengers in ((60, 3), (5, 2))
+        ]
+
+    def test_old_rows_round_trip_through_the_archive(self):
+        fields = archive._copy_fields(PreInform, ArchivedPreInform)
+        before = PreInform.objects.filter(pk=self.old.pk).values(*fields).get()
+        cells = list(DemandCell.objects.values_list('date', 'passenger_count').order_by('date'))
+
+        self.assertEqual(archive.archive_all(dry_run=True)['preinforms.PreInform'], 1)
+        self.assertEqual(archive.archive_all(batch_size=1)['preinforms.PreInform'], 1)
+
+        self.assertEqual(list(PreInform.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertEqual(ArchivedPreInform.objects.filter(pk=self.old.pk).values(*fields).get(), before)
+        # Archived demand stays in the cube
+        self.assertEqual(
+            list(DemandCell.objects.values_list('date', 'passenger_count').order_by('date')), cells
+        )
+        self.assertCountEqual(
+            archive.with_archive(PreInform, 'id', 'passenger_count'),
+            [{'id': self.old.pk, 'passenger_count': 3}, {'id': self.recent.pk, 'passenger_count': 2}]
+        )
+
+        # A second run finds nothing left to move
+        self.assertEqual(archive.archive_all()['preinforms.PreInform'], 0)
+
+    def test_archived_rows_still_count_for_reports_and_reconcile(self):
+        week = self.old.date_of_travel - timedelta(days=self.old.date_of_travel.weekday())
+        BusSchedule.objects.create(
+            bus=Bus.objects.create(number_plate='KL-1', capacity=40),
+            route=self.old.route, date=self.old.date_of_travel,
+            start_time=time(8), end_time=time(9)
+        )
+        cells = list(DemandCell.objects.values_list('date', 'passenger_count').order_by('date'))
+        archive.archive_all()
+
+        self.assertEqual(
+            cube.reconcile(date_from=self.today - timedelta(days=180)),
+            {'created': 0, 'updated': 0, 'deleted': 0}
+        )
+        self.assertEqual(
+            list(DemandCell.objects.values_list('date', 'passenger_count').order_by('date')), cells
+        )
+        [row] = reports.build_week(week)
+        self.assertEqual((row['trips'], row['estimated_passengers']), (1, 3))
+
+    def test_batch_delete_does_not_query_per_row(self):
+        route = self.old.route
+        driver = CustomUser.objects.create_user(email='d@x.com', password='x', role='driver')
+        bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+
+        def archive_trips(count):
+            Schedule.objects.bulk_create([
+                Schedule(
+                    route=route, bus=bus, driver=driver,
+                    date=self.today - timedelta(days=60 + i),
+                    departure_time=time(8), arrival_time=time(9),
+                    total_seats=40, available_seats=40
+                )
+                for i in range(count)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(archive.archive_model(
+                    Schedule, ArchivedSchedule, 'date', archive.default_cutoff()
+                ), count)
+            return len(queries)
+
+        self.assertEqual(archive_trips(1), archive_trips(5))
+        self.assertFalse(Schedule.objects.exists())
+        self.assertEqual(ArchivedSchedule.objects.count(), 6)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class WeeklyReportTests(TestCase):
+    """
+    Regenerating a week updates estimates and keeps entered actuals
+    """
+
+    def setUp(self):
+        self.week = reports.last_week_start()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        self.user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        for plate in ('KL-1', 'KL-2'):
+            BusSchedule.objects.create(
+                bus=Bus.objects.create(number_plate=plate, capacity=40),
+                route=self.route, date=self.week,
+                start_time=time(8), end_time=time(9)
+            )
+
+    def add_preinform(self, passengers):
+        PreInform.objects.create(
+            user=self.user, route=self.route, boarding_stop=self.stop,
+            date_of_travel=self.week, desired_time=time(8), passenger_count=passengers
+        )
+
+    def test_rerun_upserts_and_keeps_actual_passengers(self):
+        self.add_preinform(4)
+        first = reports.build_week(self.week)
+        self.assertEqual([row['created'] for row in first], [True, True])
+
+        entered = WeeklyPerformance.objects.order_by('bus_id').first()
+        entered.actual_passengers = 30
+        entered.save()
+        self.add_preinform(6)
+
+        second = reports.build_week(self.week)
+
+        self.assertEqual([row['created'] for row in second], [False, False])
+        self.assertEqual(WeeklyPerformance.objects.count(), 2)
+        entered.refresh_from_db()
+        self.assertEqual(entered.actual_passengers, 30)
+        self.assertEqual(entered.estimated_passengers, 10)
+        self.assertEqual(entered.total_passengers, 40)
+        other = WeeklyPerformance.objects.exclude(pk=entered.pk).get()
+        self.assertEqual((other.actual_passengers, other.estimated_passengers), (0, 10))
+        # Revenue follows actual passengers once they are entered
+        self.assertGreater(entered.total_revenue, other.total_revenue)
+
+
+@override_settings(JOB_RUNNER='worker')
+class JobRunnerTests(TestCase):
+    """
+    Jobs are claimed once and record how they ended
+    """
+
+    def setUp(self):
+        def add(job, a, b):
+            jobs.set_progress(job, 50, 'Adding')
+            return {'sum': a + b}
+
+        def fail(job):
+            raise RuntimeError('boom')
+
+        for name, func in (('tests.add', add), ('tests.fail', fail)):
+            jobs.task(name)(func)
+            self.addCleanup(jobs._registry.pop, name)
+
+    def test_enqueue_rejects_unknown_tasks(self):
+        job = jobs.enqueue('tests.add', a=1, b=2)
+        self.assertEqual((job.status, job.arguments), ('queued', {'a': 1, 'b': 2}))
+        with self.assertRaises(ValueError):
+            jobs.enqueue('tests.missing')
+
+    def test_second_claimer_loses(self):
+        job = jobs.enqueue('tests.add', a=1, b=2)
+
+        claimed = jobs.claim(job.pk)
+
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(jobs.claim(job.pk))
+        self.assertIsNone(jobs.claim())
+
+    def test_success_and_failure_are_recorded(self):
+        succeeded = jobs.enqueue('tests.add', a=1, b=2)
+        failed = jobs.enqueue('tests.fail')
+
+        self.assertEqual(jobs.run_next().pk, succeeded.pk)
+        with self.assertLogs('operations.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_next().pk, failed.pk)
+        self.assertIsNone(jobs.run_next())
+
+        succeeded.refresh_from_db()
+        self.assertEqual(
+            (succeeded.status, succeeded.progress, succeeded.result, succeeded.message),
+            ('succeeded', 100, {'sum': 3}, 'Adding')
+        )
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.error), ('failed', 'RuntimeError: boom'))
+        self.assertIsNotNone(failed.finished_at)
+
+    def test_run_jobs_once_drains_the_queue(self):
+        for a in range(3):
+            jobs.enqueue('tests.add', a=a, b=1)
+        out = StringIO()
+
+        call_command('run_jobs', '--once', stdout=out)
+
+        self.assertIn('Ran 3 job(s)', out.getvalue())
+        self.assertFalse(Job.objects.exclude(status='succeeded').exists())
+
+
+@override_settings(JOB_RUNNER='worker')
+class JobViewTests(TestCase):
+    """
+    Admins manage every job, other users only see their own
+    """
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email='a@x.com', password='x', role='admin')
+        self.owner = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.other = CustomUser.objects.create_user(email='q@x.com', password='x')
+        self.job = jobs.enqueue('operations.refresh_rollups', user=self.owner)
+        self.client = APIClient()
+
+    def get(self, user, url):
+        self.client.force_authenticate(user)
+        return self.client.get(url)
+
+    def test_job_list_is_admin_only(self):
+        self.assertEqual(self.get(self.owner, '/api/jobs/').status_code, 403)
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.post('/api/jobs/', {'task': 'operations.refresh_rollups'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.get(self.admin, '/api/jobs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([job['id'] for job in response.data['jobs']], [self.job.pk])
+
+    def test_admin_can_start_registered_tasks_only(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/jobs/', {'task': 'operations.refresh_rollups'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        response = self.client.post('/api/jobs/', {'task': 'os.system'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_job_detail_is_limited_to_owner_and_admins(self):
+        url = f'/api/jobs/{self.job.pk}/'
+        self.assertEqual(self.get(self.owner, url).status_code, 200)
+        self.assertEqual(self.get(self.admin, url).status_code, 200)
+        self.assertEqual(self.get(self.other, url).status_code, 404)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class ForecastTests(TestCase):
+    """
+    Forecasts are trained from the demand cube and served per hour
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.start, self.end = forecasting.training_window(2, self.today)
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        # Monday 08:00 of each training week, demand doubling
+        for week, passengers in enumerate((10, 20)):
+            DemandCell.objects.create(
+                route=self.route, boarding_stop=stop, date=self.start + timedelta(weeks=week),
+                hour=8, passenger_count=passengers, preinform_count=1
+            )
+
+    def test_fit_parts(self):
+        self.assertEqual(forecasting.weekly_trend([10, 20, 30]), forecasting.MAX_TREND)
+        self.assertAlmostEqual(forecasting.weekly_trend([20, 22, 24]), 0.1 / 1.1)
+        self.assertEqual(forecasting.weekly_trend([5]), 0.0)
+        self.assertEqual(forecasting.calibration_scale([[1.0] * 4, [2.0] * 4], {1: 16}), 2.0)
+        self.assertEqual(forecasting.calibration_scale([[1.0] * 4], {}), 1.0)
+
+    def test_trained_forecast_predicts_the_next_week(self):
+        self.assertEqual(forecasting.train(weeks=2, alpha=0.5, today=self.today), 1)
+
+        forecast = forecasting.get_forecast(self.route.id)
+        monday = self.end + timedelta(days=1)
+        self.assertAlmostEqual(forecast.trend, forecasting.MAX_TREND)
+        self.assertEqual(forecast.scale, 1.0)
+        # EWMA of 10 and 20, grown by a seventh of a week's trend
+        self.assertAlmostEqual(forecast.expected(monday, 8), 15 * (1 + forecasting.MAX_TREND / 7))
+        self.assertEqual(forecast.expected(monday, 9), 0)
+
+        with self.assertNumQueries(0):
+            forecasting.get_forecast(self.route.id)
+
+    def test_actual_passengers_calibrate_the_scale(self):
+        WeeklyPerformance.objects.create(
+            bus=Bus.objects.create(number_plate='KL-1', capacity=40), route=self.route,
+            week_start_date=self.start + timedelta(weeks=1), actual_passengers=40,
+            total_kms=Decimal('100')
+        )
+        forecasting.train(weeks=2, today=self.today)
+
+        self.assertEqual(forecasting.get_forecast(self.route.id).scale, 2.0)
+
+    def test_endpoint_serves_admins(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(email='a@x.com', password='x', role='admin'))
+        url = f'/api/routes/{self.route.id}/forecast/'
+        self.assertEqual(client.get(url).status_code, 404)
+
+        forecasting.train(weeks=2, alpha=0.5, today=self.today)
+        monday = self.end + timedelta(days=1)
+        response = client.get(url, {'date': monday.isoformat(), 'days': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([day['date'] for day in response.data['days']], [monday, monday + timedelta(days=1)])
+        self.assertEqual(response.data['days'][0]['hours'][8], 15.5)
+        self.assertEqual(client.get(url, {'days': 15}).status_code, 400)
+
+        client.force_authenticate(CustomUser.objects.create_user(email='p@x.com', password='x'))
+        self.assertEqual(client.get(url).status_code, 403)
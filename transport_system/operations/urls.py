@@ -9,5 +9,12 @@ urlpatterns = [
     # Web pages
     path('admin-dashboard/', views.admin_dashboard, name='admin-dashboard'),
     path('generate-report/', views.generate_weekly_report_view, name='generate-report'),
+    path('generate-report/<int:job_id>/', views.report_status_view, name='report-status'),
     path('analytics/', views.analytics_dashboard, name='analytics-dashboard'),
+    
+    # API endpoints
+    path('api/routes/<int:route_id>/forecast/', views.route_forecast_view, name='route-forecast'),
+    path('api/performance/summary/', views.performance_summary_view, name='performance-summary'),
+    path('api/jobs/', views.job_list_view, name='job-list'),
+    path('api/jobs/<int:job_id>/', views.job_detail_view, name='job-detail'),
 ]
\ No newline at end of file
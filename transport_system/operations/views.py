@@ -7,12 +7,20 @@ from django.contrib.auth.decorators import user_passes_test
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg, Q
 from django.contrib import messages
-from datetime import timedelta
-from .models import WeeklyPerformance
-from schedules.models import BusSchedule, Bus
-from preinforms.models import PreInform
+from datetime import datetime, timedelta
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import WeeklyPerformance, Job
+from .serializers import JobSerializer
+from . import analytics, forecasting, jobs, reports, rollups
+from schedules.models import Bus
 from routes.models import Route
 
+# Seconds between reloads of a running report's status page
+REPORT_STATUS_REFRESH_SECONDS = 2
+
 
 def admin_check(user):
     """Check if user is authenticated and is admin"""
@@ -77,91 +85,73 @@ def generate_weekly_report_view(request):
     Generate weekly performance reports from BusSchedule and PreInform data
     
     URL: /generate-report/
+    
+    The report is built by a background job; this redirects to its
+    status page.
     """
-    # Calculate last week's dates
-    today = timezone.now().date()
-    start_of_last_week = today - timedelta(days=today.weekday() + 7)
-    end_of_last_week = start_of_last_week + timedelta(days=6)
+    job = jobs.enqueue(
+        'operations.weekly_report',
+        user=request.user,
+        week_start=reports.last_week_start(timezone.now().date())
+    )
+    messages.info(request, f"Weekly report generation started (job #{job.pk})")
+    return redirect('report-status', job_id=job.pk)
+
+
+@user_passes_test(admin_check)
+def report_status_view(request, job_id):
+    """
+    Progress and, once done, results of a weekly report job
     
-    report_data = []
+    URL: /generate-report/<job_id>/
     
-    # Get all bus assignments from last week
-    weekly_assignments = BusSchedule.objects.filter(
-        date__gte=start_of_last_week,
-        date__lte=end_of_last_week
-    ).select_related('bus', 'route')
-    
-    if not weekly_assignments.exists():
-        messages.warning(
-            request,
-            "No bus assignments found for last week. Create BusSchedule records first."
-        )
+    While the job runs the page gets the job and its progress, and
+    reloads itself every REPORT_STATUS_REFRESH_SECONDS.
+    """
+    try:
+        job = Job.objects.get(pk=job_id, task='operations.weekly_report')
+    except Job.DoesNotExist:
+        messages.error(request, "Report job not found.")
         return redirect('admin-dashboard')
     
-    # Group by bus and route
-    from itertools import groupby
-    from operator import attrgetter
-    
-    assignments_sorted = sorted(
-        weekly_assignments,
-        key=lambda x: (x.bus_id, x.route_id)
-    )
+    if job.status == 'failed':
+        messages.error(request, f"Weekly report failed: {job.error}")
+        return redirect('admin-dashboard')
     
-    for (bus, route), bus_assignments in groupby(
-        assignments_sorted,
-        key=lambda x: (x.bus, x.route)
-    ):
-        bus_assignments = list(bus_assignments)
-        
-        # Calculate total kilometers
-        total_kms = sum(
-            assignment.route.total_distance
-            for assignment in bus_assignments
-        )
+    week_start = reports.last_week_start(job.created_at.date())
+    report_data = []
+    if job.status == 'succeeded':
+        week_start = datetime.strptime(job.result['week_start'], '%Y-%m-%d').date()
+        report_data = job.result['rows']
+        if not report_data:
+            messages.warning(
+                request,
+                "No bus assignments found for last week. Create BusSchedule records first."
+            )
+            return redirect('admin-dashboard')
         
-        # Calculate estimated passengers from PreInform
-        estimated_passengers = PreInform.objects.filter(
-            route=route,
-            date_of_travel__gte=start_of_last_week,
-            date_of_travel__lte=end_of_last_week
-        ).aggregate(total=Sum('passenger_count'))['total'] or 0
+        buses = Bus.objects.in_bulk({row['bus_id'] for row in report_data})
+        routes = Route.objects.in_bulk({row['route_id'] for row in report_data})
+        for row in report_data:
+            row['bus'] = buses.get(row['bus_id'])
+            row['route'] = routes.get(row['route_id'])
         
-        # Create or update weekly performance record
-        weekly_perf, created = WeeklyPerformance.objects.get_or_create(
-            bus=bus,
-            route=route,
-            week_start_date=start_of_last_week,
-            defaults={
-                'estimated_passengers': estimated_passengers,
-                'total_kms': total_kms,
-                'actual_passengers': 0
-            }
+        messages.success(
+            request,
+            f"Generated weekly report for {week_start} to {week_start + timedelta(days=6)}"
         )
-        
-        # If record already exists, update it
-        if not created:
-            weekly_perf.estimated_passengers = estimated_passengers
-            weekly_perf.total_kms = total_kms
-            weekly_perf.save()
-        
-        report_data.append({
-            'bus': bus,
-            'route': route,
-            'estimated_passengers': estimated_passengers,
-            'total_kms': total_kms,
-            'created': created
-        })
-    
-    messages.success(
-        request,
-        f"Generated weekly report for {start_of_last_week} to {end_of_last_week}"
-    )
     
-    return render(request, 'report_generated.html', {
+    response = render(request, 'report_generated.html', {
+        'job': job,
+        'progress': job.progress,
+        'progress_message': job.message,
         'report_data': report_data,
-        'week_start': start_of_last_week,
-        'week_end': end_of_last_week
+        'week_start': week_start,
+        'week_end': week_start + timedelta(days=6)
     })
+    if job.status in ('queued', 'running'):
+        response['Refresh'] = str(REPORT_STATUS_REFRESH_SECONDS)
+    return response
 
 
 @user_passes_test(admin_check)
@@ -174,104 +164,197 @@ def analytics_dashboard(request):
     today = timezone.now().date()
     start_date = today - timedelta(weeks=8)
     
-    # 1. Weekly Trends
-    weekly_data = WeeklyPerformance.objects.filter(
-        week_start_date__gte=start_date
-    ).values('week_start_date').distinct()
+    # Weekly trends, route performance, bus efficiency and demand
+    # patterns, each from one grouped query
+    context = analytics.dashboard(start_date)
     
-    weekly_trends = []
-    for week in weekly_data:
-        week_start = week['week_start_date']
-        week_data = WeeklyPerformance.objects.filter(week_start_date=week_start)
-        
-        weekly_trends.append({
-            'week_start_date': week_start,
-            'total_profit': sum(p.total_profit for p in week_data),
-            'total_revenue': sum(p.total_revenue for p in week_data),
-            'total_passengers': sum(p.total_passengers for p in week_data),
+    return render(request, 'analytics_dashboard.html', context)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def route_forecast_view(request, route_id):
+    """
+    Forecast hourly demand for a route (Admin only)
+    
+    GET /api/routes/<route_id>/forecast/
+    Optional params:
+    - date: First day to forecast (default: today)
+    - days: Number of days, 1-14 (default: 1)
+    
+    Served from the trained model cache; train with
+    python manage.py train_forecasts
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can view demand forecasts'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        date_param = request.query_params.get('date')
+        start = (
+            datetime.strptime(date_param, '%Y-%m-%d').date()
+            if date_param else timezone.localdate()
+        )
+        days = int(request.query_params.get('days', 1))
+    except ValueError:
+        return Response(
+            {'error': 'date must be YYYY-MM-DD and days an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not 1 <= days <= 14:
+        return Response(
+            {'error': 'days must be between 1 and 14'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    forecast = forecasting.get_forecast(route_id)
+    if forecast is None:
+        return Response(
+            {'error': 'No forecast trained for this route'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    forecast_days = []
+    for offset in range(days):
+        date = start + timedelta(days=offset)
+        hours = [round(value, 1) for value in forecast.day(date)]
+        forecast_days.append({
+            'date': date,
+            'expected_passengers': round(sum(hours), 1),
+            'hours': hours,
         })
     
-    # Sort by date
-    weekly_trends.sort(key=lambda x: x['week_start_date'])
-    
-    # 2. Route Performance
-    route_data = {}
-    for performance in WeeklyPerformance.objects.filter(week_start_date__gte=start_date):
-        route_key = performance.route.number
-        if route_key not in route_data:
-            route_data[route_key] = {
-                'route__number': performance.route.number,
-                'route__name': performance.route.name,
-                'total_profit': 0,
-                'total_kms': 0,
-                'total_passengers': 0,
-            }
-        
-        route_data[route_key]['total_profit'] += float(performance.total_profit)
-        route_data[route_key]['total_kms'] += float(performance.total_kms)
-        route_data[route_key]['total_passengers'] += performance.total_passengers
-    
-    # Calculate profit per km
-    for route in route_data.values():
-        if route['total_kms'] > 0:
-            route['profit_per_km'] = route['total_profit'] / route['total_kms']
-        else:
-            route['profit_per_km'] = 0
-    
-    route_performance = sorted(
-        route_data.values(),
-        key=lambda x: x['total_profit'],
-        reverse=True
-    )[:10]
-    
-    # 3. Bus Efficiency
-    bus_data = {}
-    for performance in WeeklyPerformance.objects.filter(week_start_date__gte=start_date):
-        bus_key = performance.bus.number_plate
-        if bus_key not in bus_data:
-            bus_data[bus_key] = {
-                'bus__number_plate': performance.bus.number_plate,
-                'total_profit': 0,
-                'total_revenue': 0,
-                'total_kms': 0,
-                'total_passengers': 0,
-            }
-        
-        bus_data[bus_key]['total_profit'] += float(performance.total_profit)
-        bus_data[bus_key]['total_revenue'] += float(performance.total_revenue)
-        bus_data[bus_key]['total_kms'] += float(performance.total_kms)
-        bus_data[bus_key]['total_passengers'] += performance.total_passengers
-    
-    # Calculate revenue per km
-    for bus in bus_data.values():
-        if bus['total_kms'] > 0:
-            bus['revenue_per_km'] = bus['total_revenue'] / bus['total_kms']
-        else:
-            bus['revenue_per_km'] = 0
-    
-    bus_efficiency = sorted(
-        bus_data.values(),
-        key=lambda x: x['revenue_per_km'],
-        reverse=True
-    )[:10]
-    
-    # 4. Demand Patterns
-    from django.db.models.functions import ExtractHour, ExtractWeekDay
-    
-    demand_patterns = PreInform.objects.filter(
-        created_at__gte=start_date
-    ).annotate(
-        hour=ExtractHour('desired_time'),
-        day_of_week=ExtractWeekDay('date_of_travel')
-    ).values('hour', 'day_of_week').annotate(
-        demand_count=Count('id')
-    ).order_by('day_of_week', 'hour')
+    return Response({
+        'route_id': route_id,
+        'trained_at': forecast.trained_at,
+        'trend': round(forecast.trend, 4),
+        'scale': round(forecast.scale, 3),
+        'days': forecast_days,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def performance_summary_view(request):
+    """
+    Performance totals over a date range from daily rollups (Admin only)
     
-    context = {
-        'weekly_trends': weekly_trends,
-        'route_performance': route_performance,
-        'bus_efficiency': bus_efficiency,
-        'demand_patterns': list(demand_patterns),
+    GET /api/performance/summary/?from=2024-12-01&to=2024-12-31&group_by=week
+    Optional params:
+    - from, to: Date range (default: last 30 days)
+    - group_by: day, week, month, route or bus (default: day)
+    
+    Rollups are refreshed with
+    python manage.py refresh_daily_performance
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can view performance summaries'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    today = timezone.localdate()
+    try:
+        date_from = request.query_params.get('from')
+        date_from = (
+            datetime.strptime(date_from, '%Y-%m-%d').date()
+            if date_from else today - timedelta(days=30)
+        )
+        date_to = request.query_params.get('to')
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else today
+    except ValueError:
+        return Response(
+            {'error': 'from and to must be YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    group_by = request.query_params.get('group_by', 'day')
+    if group_by not in rollups.GROUPINGS:
+        return Response(
+            {'error': f"group_by must be one of: {', '.join(rollups.GROUPINGS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rows = rollups.summarize(date_from, date_to, group_by=group_by)
+    
+    return Response({
+        'from': date_from,
+        'to': date_to,
+        'group_by': group_by,
+        'rows': rows,
+    })
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def job_list_view(request):
+    """
+    Recent background jobs, or start one (Admin only)
+    
+    GET /api/jobs/?task=operations.weekly_report&status=running
+    POST /api/jobs/
+    {
+        "task": "operations.refresh_rollups",
+        "arguments": {"full": true}
     }
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can manage jobs'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if request.method == 'POST':
+        serializer = JobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(created_by=request.user)
+        return Response(
+            {
+                'success': True,
+                'message': f'Job #{job.pk} queued',
+                'data': JobSerializer(job).data
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+    
+    queryset = Job.objects.all()
+    task_param = request.query_params.get('task')
+    status_param = request.query_params.get('status')
+    if task_param:
+        queryset = queryset.filter(task=task_param)
+    if status_param:
+        queryset = queryset.filter(status=status_param)
+    
+    return Response({
+        'tasks': jobs.registered(),
+        'jobs': JobSerializer(queryset[:50], many=True).data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail_view(request, job_id):
+    """
+    Status, progress and result of a background job
+    
+    GET /api/jobs/<job_id>/
+    
+    Admins see every job, other users only the ones they started.
+    """
+    try:
+        job = Job.objects.get(pk=job_id)
+    except Job.DoesNotExist:
+        return Response(
+            {'error': 'Job not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if request.user.role != 'admin' and job.created_by_id != request.user.id:
+        return Response(
+            {'error': 'Job not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    return render(request, 'analytics_dashboard.html', context)
\ No newline at end of file
+    return Response(JobSerializer(job).data)
@@ -6,7 +6,8 @@ PreInforms Admin Configuration
 """
 
 from django.contrib import admin
-from .models import PreInform
+from .models import PreInform, PreInformSubscription
+from .lifecycle import mark_noted
 
 
 @admin.register(PreInform)
@@ -57,4 +58,59 @@ class PreInformAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         """Optimize queries"""
-        return super().get_queryset(request).select_related('user', 'route', 'boarding_stop')
\ No newline at end of file
+        return super().get_queryset(request).select_related('user', 'route', 'boarding_stop')
+    
+    actions = ['mark_as_noted']
+    
+    def mark_as_noted(self, request, queryset):
+        """Bulk action to acknowledge pending pre-informs in one UPDATE"""
+        updated = mark_noted(queryset)
+        self.message_user(request, f"{updated} pre-inform(s) marked as noted.")
+    mark_as_noted.short_description = "Mark selected as Noted"
+
+
+@admin.register(PreInformSubscription)
+class PreInformSubscriptionAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for recurring pre-inform subscriptions
+    """
+    list_display = (
+        'user',
+        'route',
+        'boarding_stop',
+        'desired_time',
+        'weekday_mask',
+        'start_date',
+        'end_date',
+        'passenger_count',
+        'is_active'
+    )
+    list_filter = ('is_active', 'route', 'start_date')
+    search_fields = (
+        'user__email',
+        'route__number',
+        'boarding_stop__name'
+    )
+    ordering = ('-created_at',)
+    
+    fieldsets = (
+        ('User Information', {
+            'fields': ('user',)
+        }),
+        ('Travel Details', {
+            'fields': ('route', 'boarding_stop', 'desired_time', 'passenger_count')
+        }),
+        ('Recurrence', {
+            'fields': ('weekday_mask', 'start_date', 'end_date', 'is_active')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    readonly_fields = ('created_at', 'updated_at')
+    
+    def get_queryset(self, request):
+        """Optimize queries"""
+        return super().get_queryset(request).select_related('user', 'route', 'boarding_stop')
@@ -0,0 +1,319 @@
+"""
+Demand Cube
+Incrementally maintained passenger counts keyed by
+(route, boarding stop, date, hour)
+
+Recurring subscriptions are not stored in cells; readers add their
+virtual occurrences on top.
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay
+from django.utils import timezone
+
+from .models import ArchivedPreInform, PreInform, DemandCell
+from .subscriptions import virtual_cells
+
+# Cancelled pre-informs carry no demand
+EXCLUDED_STATUSES = ('cancelled',)
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended():
+    """
+    Stop signal handlers from touching the cube on this thread
+
+    Used when pre-informs leave the live table without their demand
+    going away.
+    """
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def cell_key(route_id, boarding_stop_id, date, hour):
+    return (route_id, boarding_stop_id, date, hour)
+
+
+def contribution(preinform):
+    """
+    What a pre-inform adds to the cube
+
+    Returns:
+        tuple: (cell key, passengers) or None if it does not count
+    """
+    if preinform.status in EXCLUDED_STATUSES:
+        return None
+    key = cell_key(
+        preinform.route_id,
+        preinform.boarding_stop_id,
+        preinform.date_of_travel,
+        preinform.desired_time.hour
+    )
+    return key, preinform.passenger_count
+
+
+def apply_deltas(deltas):
+    """
+    Add passenger and pre-inform deltas to cube cells
+
+    Args:
+        deltas: {cell key: (passenger delta, pre-inform delta)}
+    """
+    for (route_id, stop_id, date, hour), (passengers, preinforms) in deltas.items():
+        if not passengers and not preinforms:
+            continue
+
+        cells = DemandCell.objects.filter(
+            route_id=route_id,
+            boarding_stop_id=stop_id,
+            date=date,
+            hour=hour
+        )
+        updated = cells.update(
+            passenger_count=F('passenger_count') + passengers,
+            preinform_count=F('preinform_count') + preinforms
+        )
+        if updated:
+            continue
+
+        try:
+            with transaction.atomic():
+                DemandCell.objects.create(
+                    route_id=route_id,
+                    boarding_stop_id=stop_id,
+                    date=date,
+                    hour=hour,
+                    passenger_count=passengers,
+                    preinform_count=preinforms
+                )
+        except IntegrityError:
+            # Another writer created the cell first
+            cells.update(
+                passenger_count=F('passenger_count') + passengers,
+                preinform_count=F('preinform_count') + preinforms
+            )
+
+
+def apply_change(old, new):
+    """
+    Move a pre-inform's contribution from its old cell to its new one
+
+    Args:
+        old, new: Results of contribution(), either may be None
+    """
+    if old == new:
+        return
+
+    deltas = defaultdict(lambda: [0, 0])
+    if old:
+        deltas[old[0]][0] -= old[1]
+        deltas[old[0]][1] -= 1
+    if new:
+        deltas[new[0]][0] += new[1]
+        deltas[new[0]][1] += 1
+    apply_deltas(deltas)
+
+
+def add_preinforms(preinforms, sign=1):
+    """
+    Apply many pre-informs at once, e.g. after bulk_create
+
+    Args:
+        sign: 1 to add, -1 to remove
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for preinform in preinforms:
+        counted = contribution(preinform)
+        if counted:
+            deltas[counted[0]][0] += sign * counted[1]
+            deltas[counted[0]][1] += sign
+    apply_deltas(deltas)
+
+
+def _source_cells(date_from=None, date_to=None):
+    """
+    Aggregate raw pre-informs into cells with one grouped query per
+    table; archived pre-informs keep their demand in the cube
+    """
+    cells = defaultdict(lambda: (0, 0))
+    for model in (PreInform, ArchivedPreInform):
+        queryset = model.objects.exclude(status__in=EXCLUDED_STATUSES)
+        if date_from:
+            queryset = queryset.filter(date_of_travel__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date_of_travel__lte=date_to)
+
+        rows = queryset.annotate(
+            hour=ExtractHour('desired_time')
+        ).values(
+            'route_id', 'boarding_stop_id', 'date_of_travel', 'hour'
+        ).annotate(
+            passengers=Sum('passenger_count'),
+            preinforms=Count('id')
+        ).order_by()
+
+        for row in rows:
+            key = cell_key(row['route_id'], row['boarding_stop_id'], row['date_of_travel'], row['hour'])
+            passengers, preinforms = cells[key]
+            cells[key] = (passengers + row['passengers'], preinforms + row['preinforms'])
+
+    return dict(cells)
+
+
+def reconcile(date_from=None, date_to=None):
+    """
+    Rebuild cube cells from live and archived pre-informs and fix any drift
+
+    Returns:
+        dict: Number of cells created, updated and deleted
+    """
+    expected = _source_cells(date_from, date_to)
+
+    cells = DemandCell.objects.all()
+    if date_from:
+        cells = cells.filter(date__gte=date_from)
+    if date_to:
+        cells = cells.filter(date__lte=date_to)
+
+    to_update = []
+    to_delete = []
+    for cell in cells:
+        key = cell_key(cell.route_id, cell.boarding_stop_id, cell.date, cell.hour)
+        counts = expected.pop(key, None)
+        if counts is None:
+            to_delete.append(cell.pk)
+        elif (cell.passenger_count, cell.preinform_count) != counts:
+            cell.passenger_count, cell.preinform_count = counts
+            to_update.append(cell)
+
+    to_create = [
+        DemandCell(
+            route_id=route_id,
+            boarding_stop_id=stop_id,
+            date=date,
+            hour=hour,
+            passenger_count=passengers,
+            preinform_count=preinforms
+        )
+        for (route_id, stop_id, date, hour), (passengers, preinforms) in expected.items()
+    ]
+
+    with transaction.atomic():
+        DemandCell.objects.filter(pk__in=to_delete).delete()
+        DemandCell.objects.bulk_update(
+            to_update, ['passenger_count', 'preinform_count'], batch_size=500
+        )
+        DemandCell.objects.bulk_create(to_create, batch_size=500)
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+    }
+
+
+def _virtual_range(date_from, date_to):
+    """Bound subscription expansion when a range is open-ended"""
+    if date_to is None:
+        horizon = getattr(settings, 'SUBSCRIPTION_HORIZON_DAYS', 28)
+        date_to = timezone.localdate() + timedelta(days=horizon)
+    return date_from, date_to
+
+
+def weekday_hour_pattern(date_from, date_to=None):
+    """
+    Expected passengers by day of week and hour of travel, read from
+    cube cells plus virtual subscription occurrences
+
+    Returns:
+        list: dicts with day_of_week (1=Sunday), hour and demand_count
+    """
+    cells = DemandCell.objects.filter(date__gte=date_from)
+    if date_to:
+        cells = cells.filter(date__lte=date_to)
+
+    pattern = defaultdict(int)
+    for row in cells.annotate(
+        day_of_week=ExtractWeekDay('date')
+    ).values('day_of_week', 'hour').annotate(
+        demand_count=Sum('passenger_count')
+    ).order_by():
+        pattern[(row['day_of_week'], row['hour'])] += row['demand_count']
+
+    for (_, _, date, hour), (passengers, _) in virtual_cells(
+        *_virtual_range(date_from, date_to)
+    ).items():
+        # Same numbering as ExtractWeekDay: 1=Sunday ... 7=Saturday
+        pattern[(date.isoweekday() % 7 + 1, hour)] += passengers
+
+    return [
+        {'day_of_week': day_of_week, 'hour': hour, 'demand_count': count}
+        for (day_of_week, hour), count in sorted(pattern.items())
+        if count
+    ]
+
+
+def route_passenger_totals(date_from, date_to):
+    """
+    Estimated passengers per route over a date range,
+    including virtual subscription occurrences
+
+    Cancelled pre-informs are not counted: the passengers said they
+    will not travel, so they are not expected revenue.
+
+    Returns:
+        dict: {route_id: passengers}
+    """
+    totals = defaultdict(int)
+    for route_id, total in DemandCell.objects.filter(
+        date__gte=date_from,
+        date__lte=date_to
+    ).values('route_id').annotate(
+        total=Sum('passenger_count')
+    ).order_by().values_list('route_id', 'total'):
+        totals[route_id] += total
+
+    for (route_id, _, _, _), (passengers, _) in virtual_cells(date_from, date_to).items():
+        totals[route_id] += passengers
+
+    return dict(totals)
+
+
+def route_day_totals(date_from, date_to):
+    """
+    Estimated passengers per route and day over a date range,
+    including virtual subscription occurrences
+
+    Returns:
+        dict: {(route_id, date): passengers}
+    """
+    totals = defaultdict(int)
+    for route_id, date, total in DemandCell.objects.filter(
+        date__gte=date_from,
+        date__lte=date_to
+    ).values('route_id', 'date').annotate(
+        total=Sum('passenger_count')
+    ).order_by().values_list('route_id', 'date', 'total'):
+        totals[(route_id, date)] += total
+
+    for (route_id, _, date, _), (passengers, _) in virtual_cells(date_from, date_to).items():
+        totals[(route_id, date)] += passengers
+
+    return dict(totals)
@@ -0,0 +1,79 @@
+"""
+Pre-Inform Lifecycle
+Set-based status transitions for pre-informs
+
+Transitions run as UPDATE statements on the (status, date_of_travel)
+index instead of loading and saving rows one by one. update() skips
+signals; the demand cube counts every status except cancelled, so it is
+unaffected, and cached trip load projections are dropped explicitly.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PreInform
+from . import matching
+
+# Where a pre-inform goes once its travel date has passed
+PAST_TRANSITIONS = (
+    ('pending', 'expired'),     # Never acknowledged
+    ('noted', 'completed'),     # Acknowledged by a controller
+)
+
+
+def close_past(today=None, batch_size=1000, dry_run=False):
+    """
+    Move pre-informs whose travel date has passed out of the open statuses
+
+    Each chunk of primary keys is transitioned with one UPDATE in its own
+    transaction, so long sweeps do not hold locks on the whole table.
+
+    Returns:
+        dict: {'pending->expired': count, 'noted->completed': count}
+    """
+    today = today or timezone.localdate()
+    results = {}
+
+    for from_status, to_status in PAST_TRANSITIONS:
+        label = f'{from_status}->{to_status}'
+        due = PreInform.objects.filter(status=from_status, date_of_travel__lt=today)
+
+        if dry_run:
+            results[label] = due.count()
+            continue
+
+        moved = 0
+        while True:
+            ids = list(due.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                # Status is re-checked in case a row changed since it was read
+                moved += PreInform.objects.filter(
+                    pk__in=ids,
+                    status=from_status
+                ).update(status=to_status, updated_at=timezone.now())
+        results[label] = moved
+
+    if not dry_run:
+        matching.invalidate_before(today)
+    return results
+
+
+def mark_noted(queryset):
+    """
+    Acknowledge pending pre-informs in a single UPDATE
+
+    Args:
+        queryset: PreInform queryset to acknowledge; rows that are not
+                  pending are left alone
+
+    Returns:
+        int: Number of pre-informs marked as noted
+    """
+    # pending and noted both count towards trip loads, so cached
+    # projections stay valid
+    return queryset.filter(status='pending').update(
+        status='noted',
+        updated_at=timezone.now()
+    )
@@ -0,0 +1,42 @@
+"""
+Close pre-informs whose travel date has passed
+
+Pending pre-informs become expired and noted ones completed. Intended
+to run nightly.
+
+Usage:
+    python manage.py close_past_preinforms
+    python manage.py close_past_preinforms --batch-size 5000 --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from preinforms.lifecycle import close_past
+
+
+class Command(BaseCommand):
+    help = "Expire or complete pre-informs with a travel date in the past"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows transitioned per UPDATE"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many rows would change"
+        )
+
+    def handle(self, *args, **options):
+        results = close_past(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+
+        verb = "Would move" if options['dry_run'] else "Moved"
+        for label, count in results.items():
+            self.stdout.write(f"{verb} {count} pre-inform(s) {label}")
+        self.stdout.write(self.style.SUCCESS("Pre-inform lifecycle sweep complete"))
@@ -0,0 +1,40 @@
+"""
+Rebuild demand cube cells from live and archived pre-informs
+
+Intended to run nightly to correct any drift from the incremental updates.
+
+Usage:
+    python manage.py reconcile_demand_cube
+    python manage.py reconcile_demand_cube --days 30
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from preinforms.cube import reconcile
+
+
+class Command(BaseCommand):
+    help = "Reconcile the pre-inform demand cube with the live and archived pre-informs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180),
+            help="Reconcile travel dates from this many days ago onwards"
+        )
+
+    def handle(self, *args, **options):
+        date_from = timezone.localdate() - timedelta(days=options['days'])
+        result = reconcile(date_from=date_from)
+
+        self.stdout.write(
+            f"Cells created: {result['created']}, "
+            f"updated: {result['updated']}, "
+            f"deleted: {result['deleted']}"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Demand cube reconciled from {date_from}"))
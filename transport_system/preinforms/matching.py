@@ -0,0 +1,242 @@
+"""
+Pre-Inform Matching
+Assigns pending pre-informs to concrete departures and projects the
+expected boarding load of every trip
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from routes.models import Route, Stop
+from schedules import timetable
+from .models import PreInform
+from .subscriptions import expand
+
+# Pre-informs still expected to show up
+MATCHED_STATUSES = ('pending', 'noted')
+
+
+class LoadProjection:
+    """
+    Expected boardings for one route and day
+
+    For every stop the times serving trips pass it are kept sorted, so
+    matching a desired time to a trip is a binary search.
+    """
+
+    def __init__(self, compiled, stops, total_distance):
+        """
+        Args:
+            compiled: schedules.timetable.CompiledTimetable for the day
+            stops: (id, distance_from_origin) tuples ordered by sequence
+        """
+        self.timetable = compiled
+        self.stop_ids = [stop_id for stop_id, _ in stops]
+        self.stop_times = {}
+        self.passing_times = {}
+        self.loads = defaultdict(lambda: defaultdict(int))
+
+        total_distance = float(total_distance) or 1.0
+        pattern = compiled.pattern
+        for stop_id, distance in stops:
+            fraction = min(max(float(distance) / total_distance, 0.0), 1.0)
+            bit = pattern.bit(stop_id)
+            passing = []
+            for index in range(len(compiled)):
+                if not compiled.stop_masks[index] & bit:
+                    continue
+                start = compiled.departures[index]
+                end = compiled.arrivals[index]
+                if end < start:
+                    end += 86400
+                passing.append((int(start + (end - start) * fraction), index))
+            passing.sort()
+            self.passing_times[stop_id] = {index: seconds for seconds, index in passing}
+            self.stop_times[stop_id] = (
+                array('l', [seconds for seconds, _ in passing]),
+                array('l', [index for _, index in passing]),
+            )
+
+    def match(self, stop_id, desired_time):
+        """
+        Best trip for a passenger at a stop
+
+        The first serving trip at or after the desired time, or the last
+        one before it if nothing later runs that day.
+
+        Returns:
+            int: Trip position in the timetable, or None
+        """
+        times, trips = self.stop_times.get(stop_id, ((), ()))
+        if not times:
+            return None
+        position = bisect_left(times, timetable.time_to_seconds(desired_time))
+        if position == len(times):
+            position -= 1
+        return trips[position]
+
+    def add(self, stop_id, desired_time, passengers):
+        """Add (or with negative passengers, remove) expected boardings"""
+        index = self.match(stop_id, desired_time)
+        if index is None:
+            return None
+        load = self.loads[index]
+        load[stop_id] += passengers
+        if not load[stop_id]:
+            del load[stop_id]
+        return index
+
+    def schedule_profile(self, schedule_id):
+        """
+        Expected boardings per stop for one trip
+
+        Returns:
+            list: dicts with stop_id, time, boarding and cumulative load,
+                  or None if the trip is not in this projection
+        """
+        index = self.timetable.positions.get(schedule_id)
+        if index is None:
+            return None
+
+        load = self.loads.get(index, {})
+        profile = []
+        cumulative = 0
+        for stop_id in self.stop_ids:
+            seconds = self.passing_times[stop_id].get(index)
+            if seconds is None:
+                continue  # Trip does not serve this stop
+            boarding = load.get(stop_id, 0)
+            cumulative += boarding
+            profile.append({
+                'stop_id': stop_id,
+                'time': timetable.seconds_to_time(seconds),
+                'boarding': boarding,
+                'cumulative': cumulative,
+            })
+        return profile
+
+
+_projections = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cache_size():
+    return getattr(settings, 'TIMETABLE_CACHE_SIZE', 512)
+
+
+def build_projection(route_id, date, compiled=None):
+    """Match every expected passenger for a route and day"""
+    compiled = compiled or timetable.get_timetable(route_id, date)
+    stops = list(
+        Stop.objects.filter(route_id=route_id)
+        .order_by('sequence')
+        .values_list('id', 'distance_from_origin')
+    )
+    total_distance = Route.objects.filter(pk=route_id).values_list(
+        'total_distance', flat=True
+    ).first() or 0
+    projection = LoadProjection(compiled, stops, total_distance)
+
+    for stop_id, desired_time, passengers in PreInform.objects.filter(
+        route_id=route_id,
+        date_of_travel=date,
+        status__in=MATCHED_STATUSES
+    ).values_list('boarding_stop_id', 'desired_time', 'passenger_count'):
+        projection.add(stop_id, desired_time, passengers)
+
+    for subscription, _ in expand(date, date, route_id=route_id):
+        projection.add(
+            subscription.boarding_stop_id,
+            subscription.desired_time,
+            subscription.passenger_count
+        )
+
+    return projection
+
+
+def get_projection(route_id, date):
+    """
+    Get the cached load projection for a route and day
+
+    The projection is tied to the compiled timetable it was built from;
+    when a schedule change replaces that timetable it is rebuilt.
+    """
+    key = (int(route_id), date)
+    compiled = timetable.get_timetable(*key)
+
+    with _lock:
+        projection = _projections.get(key)
+        if projection is not None and projection.timetable is compiled:
+            _projections.move_to_end(key)
+            return projection
+
+    projection = build_projection(*key, compiled=compiled)
+
+    with _lock:
+        _projections[key] = projection
+        while len(_projections) > _cache_size():
+            _projections.popitem(last=False)
+    return projection
+
+
+def matched(preinform):
+    """Whether a pre-inform (or loaded snapshot) counts towards trip loads"""
+    return preinform is not None and preinform.status in MATCHED_STATUSES
+
+
+def apply_change(old, new):
+    """
+    Patch cached projections when a pre-inform changes
+
+    Args:
+        old, new: Objects with route_id, boarding_stop_id, date_of_travel,
+                  desired_time, passenger_count and status, or None
+    """
+    with _lock:
+        for preinform, sign in ((old, -1), (new, 1)):
+            if not matched(preinform):
+                continue
+            projection = _projections.get((preinform.route_id, preinform.date_of_travel))
+            if projection is not None:
+                projection.add(
+                    preinform.boarding_stop_id,
+                    preinform.desired_time,
+                    sign * preinform.passenger_count
+                )
+
+
+def add_preinforms(preinforms):
+    """Add newly created pre-informs, e.g. after bulk_create"""
+    for preinform in preinforms:
+        apply_change(None, preinform)
+
+
+def invalidate(route_id, date):
+    """Drop the cached projection of one route and day"""
+    with _lock:
+        _projections.pop((route_id, date), None)
+
+
+def invalidate_route(route_id):
+    """Drop cached projections for every day of a route"""
+    with _lock:
+        stale = [key for key in _projections if key[0] == route_id]
+        for key in stale:
+            del _projections[key]
+
+
+def invalidate_before(date):
+    """Drop cached projections for days before a date"""
+    with _lock:
+        stale = [key for key in _projections if key[1] < date]
+        for key in stale:
+            del _projections[key]
+
+
+def clear():
+    with _lock:
+        _projections.clear()
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0002_initial'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPreInform',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original pre-inform id', primary_key=True, serialize=False)),
+                ('date_of_travel', models.DateField(db_index=True)),
+                ('desired_time', models.TimeField()),
+                ('passenger_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('noted', 'Noted by Controller'), ('completed', 'Journey Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('boarding_stop', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='routes.stop')),
+                ('route', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='routes.route')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Pre-Inform',
+                'verbose_name_plural': 'Archived Pre-Informs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0003_archivedpreinform'),
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Date of travel')),
+                ('hour', models.PositiveSmallIntegerField(help_text='Hour of desired boarding time (0-23)')),
+                ('passenger_count', models.IntegerField(default=0, help_text='Total passengers in this cell')),
+                ('preinform_count', models.IntegerField(default=0, help_text='Number of pre-informs in this cell')),
+                ('boarding_stop', models.ForeignKey(help_text='Boarding stop of the pre-informs', on_delete=django.db.models.deletion.CASCADE, related_name='demand_cells', to='routes.stop')),
+                ('route', models.ForeignKey(help_text='Route of the pre-informs', on_delete=django.db.models.deletion.CASCADE, related_name='demand_cells', to='routes.route')),
+            ],
+            options={
+                'verbose_name': 'Demand Cell',
+                'verbose_name_plural': 'Demand Cells',
+                'ordering': ['date', 'hour'],
+                'indexes': [models.Index(fields=['date', 'route'], name='preinforms__date_7c7413_idx')],
+                'unique_together': {('route', 'boarding_stop', 'date', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0004_demandcell'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreInformSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desired_time', models.TimeField(help_text='Preferred boarding time')),
+                ('passenger_count', models.PositiveIntegerField(default=1, help_text='Number of passengers traveling')),
+                ('weekday_mask', models.PositiveSmallIntegerField(default=31, help_text='Days of travel as bits: 1=Mon, 2=Tue, 4=Wed ... 64=Sun')),
+                ('start_date', models.DateField(help_text='First day of travel')),
+                ('end_date', models.DateField(blank=True, help_text='Last day of travel (blank for no end)', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('boarding_stop', models.ForeignKey(help_text='Stop where passenger boards', on_delete=django.db.models.deletion.CASCADE, related_name='preinform_subscriptions', to='routes.stop')),
+                ('route', models.ForeignKey(help_text='Route passenger takes', on_delete=django.db.models.deletion.CASCADE, related_name='preinform_subscriptions', to='routes.route')),
+                ('user', models.ForeignKey(help_text='Passenger who travels regularly', on_delete=django.db.models.deletion.CASCADE, related_name='preinform_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Pre-Inform Subscription',
+                'verbose_name_plural': 'Pre-Inform Subscriptions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='preinform',
+            name='subscription',
+            field=models.ForeignKey(blank=True, help_text='Recurring subscription this trip belongs to', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='preinforms.preinformsubscription'),
+        ),
+        migrations.AddConstraint(
+            model_name='preinform',
+            constraint=models.UniqueConstraint(condition=models.Q(('subscription__isnull', False)), fields=('subscription', 'date_of_travel'), name='unique_subscription_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='preinformsubscription',
+            index=models.Index(fields=['is_active', 'start_date', 'end_date'], name='preinforms__is_acti_4d186e_idx'),
+        ),
+    ]
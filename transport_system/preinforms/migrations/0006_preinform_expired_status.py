@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0005_preinformsubscription_preinform_subscription_and_more'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='preinform',
+            name='preinforms__status_b1b1dc_idx',
+        ),
+        migrations.AlterField(
+            model_name='archivedpreinform',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('noted', 'Noted by Controller'), ('completed', 'Journey Completed'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='preinform',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('noted', 'Noted by Controller'), ('completed', 'Journey Completed'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], default='pending', help_text='Current status of pre-inform', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='preinform',
+            index=models.Index(fields=['status', 'date_of_travel'], name='preinforms__status_5591c4_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0006_preinform_expired_status'),
+        ('routes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preinform',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='preinforms__user_id_5fc7ad_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0007_preinform_feed_index'),
+        ('routes', '0003_link_stops_to_places'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preinform',
+            index=models.Index(fields=['updated_at'], name='preinforms__updated_171db8_idx'),
+        ),
+    ]
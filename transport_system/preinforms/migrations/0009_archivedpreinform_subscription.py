@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preinforms', '0008_preinform_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpreinform',
+            name='subscription',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='preinforms.preinformsubscription'),
+        ),
+    ]
@@ -3,8 +3,11 @@ PreInform Model
 Allows passengers to inform their travel plans in advance
 """
 
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from routes.models import Route, Stop
 
 
@@ -52,11 +55,22 @@ class PreInform(models.Model):
         help_text="Number of passengers traveling"
     )
     
+    # Set when this row is a materialized subscription occurrence
+    subscription = models.ForeignKey(
+        'PreInformSubscription',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        help_text="Recurring subscription this trip belongs to"
+    )
+    
     # Status tracking
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('noted', 'Noted by Controller'),
         ('completed', 'Journey Completed'),
+        ('expired', 'Expired'),
         ('cancelled', 'Cancelled'),
     )
     status = models.CharField(
@@ -79,7 +93,20 @@ class PreInform(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['date_of_travel', 'route']),
-            models.Index(fields=['status']),
+            # Also serves lifecycle sweeps over past travel dates
+            models.Index(fields=['status', 'date_of_travel']),
+            # Keyset pagination of a user's feed
+            models.Index(fields=['user', 'created_at', 'id']),
+            # Changed-day scans of the performance rollup job
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            # At most one materialized occurrence per subscription and day
+            models.UniqueConstraint(
+                fields=['subscription', 'date_of_travel'],
+                condition=models.Q(subscription__isnull=False),
+                name='unique_subscription_occurrence'
+            ),
         ]
     
     def __str__(self):
@@ -88,4 +115,202 @@ class PreInform(models.Model):
     def is_active(self):
         """Check if pre-inform is still active"""
         from django.utils import timezone
-        return self.date_of_travel >= timezone.now().date() and self.status == 'pending'
\ No newline at end of file
+        return self.date_of_travel >= timezone.now().date() and self.status == 'pending'
+
+class PreInformSubscription(models.Model):
+    """
+    Recurring PreInform Subscription
+    A regular trip (e.g. weekday commute) that counts as a pre-inform on
+    every matching day without storing a row per day. A PreInform row is
+    only created for a day when its status has to change.
+    """
+    # Weekday bits, Monday first (matches date.weekday())
+    MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = (1 << day for day in range(7))
+    WEEKDAYS = MONDAY | TUESDAY | WEDNESDAY | THURSDAY | FRIDAY
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='preinform_subscriptions',
+        help_text="Passenger who travels regularly"
+    )
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='preinform_subscriptions',
+        help_text="Route passenger takes"
+    )
+    boarding_stop = models.ForeignKey(
+        Stop,
+        on_delete=models.CASCADE,
+        related_name='preinform_subscriptions',
+        help_text="Stop where passenger boards"
+    )
+    desired_time = models.TimeField(help_text="Preferred boarding time")
+    passenger_count = models.PositiveIntegerField(
+        default=1,
+        help_text="Number of passengers traveling"
+    )
+    weekday_mask = models.PositiveSmallIntegerField(
+        default=WEEKDAYS,
+        help_text="Days of travel as bits: 1=Mon, 2=Tue, 4=Wed ... 64=Sun"
+    )
+    start_date = models.DateField(help_text="First day of travel")
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Last day of travel (blank for no end)"
+    )
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Pre-Inform Subscription'
+        verbose_name_plural = 'Pre-Inform Subscriptions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'start_date', 'end_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} on route {self.route_id} at {self.desired_time} from {self.start_date}"
+    
+    def runs_on(self, date):
+        """Check if the subscription covers a date"""
+        if date < self.start_date or (self.end_date and date > self.end_date):
+            return False
+        return bool(self.weekday_mask & (1 << date.weekday()))
+    
+    def dates(self, date_from, date_to):
+        """Yield every covered date in a range"""
+        day = max(date_from, self.start_date)
+        last = min(date_to, self.end_date) if self.end_date else date_to
+        while day <= last:
+            if self.weekday_mask & (1 << day.weekday()):
+                yield day
+            day += timedelta(days=1)
+    
+    def end(self, today=None):
+        """
+        Stop travelling from today on
+        
+        Past occurrences stay in reports, so the subscription is ended by
+        date; it is only deactivated if it never covered a past day.
+        """
+        last_day = (today or timezone.localdate()) - timedelta(days=1)
+        if self.start_date > last_day:
+            self.is_active = False
+        elif self.end_date is None or self.end_date > last_day:
+            self.end_date = last_day
+        self.save(update_fields=['is_active', 'end_date', 'updated_at'])
+    
+    def materialize(self, date):
+        """
+        Get or create the concrete PreInform for one day
+        
+        Returns:
+            tuple: (PreInform, created)
+        """
+        return PreInform.objects.get_or_create(
+            subscription=self,
+            date_of_travel=date,
+            defaults={
+                'user_id': self.user_id,
+                'route_id': self.route_id,
+                'boarding_stop_id': self.boarding_stop_id,
+                'desired_time': self.desired_time,
+                'passenger_count': self.passenger_count,
+            }
+        )
+
+
+class DemandCell(models.Model):
+    """
+    Demand Cube Cell
+    Pre-aggregated passenger counts per route, boarding stop, date and hour
+    Kept up to date incrementally from PreInform changes
+    """
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='demand_cells',
+        help_text="Route of the pre-informs"
+    )
+    boarding_stop = models.ForeignKey(
+        Stop,
+        on_delete=models.CASCADE,
+        related_name='demand_cells',
+        help_text="Boarding stop of the pre-informs"
+    )
+    date = models.DateField(help_text="Date of travel")
+    hour = models.PositiveSmallIntegerField(help_text="Hour of desired boarding time (0-23)")
+    passenger_count = models.IntegerField(
+        default=0,
+        help_text="Total passengers in this cell"
+    )
+    preinform_count = models.IntegerField(
+        default=0,
+        help_text="Number of pre-informs in this cell"
+    )
+    
+    class Meta:
+        verbose_name = 'Demand Cell'
+        verbose_name_plural = 'Demand Cells'
+        ordering = ['date', 'hour']
+        unique_together = [['route', 'boarding_stop', 'date', 'hour']]
+        indexes = [
+            models.Index(fields=['date', 'route']),
+        ]
+    
+    def __str__(self):
+        return f"Route {self.route_id} stop {self.boarding_stop_id} {self.date} {self.hour}:00 ({self.passenger_count})"
+
+class ArchivedPreInform(models.Model):
+    """
+    Archived PreInform Model
+    Cold storage for past pre-informs moved out of the live table
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original pre-inform id")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    date_of_travel = models.DateField(db_index=True)
+    desired_time = models.TimeField()
+    boarding_stop = models.ForeignKey(
+        Stop,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    passenger_count = models.PositiveIntegerField()
+    subscription = models.ForeignKey(
+        'PreInformSubscription',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=PreInform.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Archived Pre-Inform'
+        verbose_name_plural = 'Archived Pre-Informs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Archived pre-inform {self.id} on {self.date_of_travel}"
@@ -3,9 +3,17 @@ PreInforms Serializers
 """
 
 from rest_framework import serializers
-from .models import PreInform
-from routes.models import Stop
-from routes.serializers import RouteSerializer, StopSerializer
+from .models import PreInform, PreInformSubscription
+from routes import membership
+from routes.serializers import RouteSerializer, StopSerializer, RouteIdField, StopIdField
+
+
+def validate_stop_on_route(route_id, boarding_stop_id):
+    """Check membership against the cached route/stop index"""
+    if boarding_stop_id and not membership.stop_on_route(boarding_stop_id, route_id):
+        raise serializers.ValidationError(
+            "The selected boarding stop does not belong to this route."
+        )
 
 
 class PreInformSerializer(serializers.ModelSerializer):
@@ -42,21 +50,48 @@ class PreInformSerializer(serializers.ModelSerializer):
         """
         Custom validation to ensure boarding stop belongs to route
         """
-        route = data.get('route')
+        route = data.get('route') or getattr(self.instance, 'route', None)
         boarding_stop = data.get('boarding_stop')
         
-        if boarding_stop and boarding_stop not in route.stops.all():
-            raise serializers.ValidationError(
-                "The selected boarding stop does not belong to this route."
-            )
+        if boarding_stop:
+            validate_stop_on_route(route.id if route else None, boarding_stop.id)
         
         return data
 
 
+class PreInformFeedSerializer(serializers.ModelSerializer):
+    """
+    Flat serializer for a user's own pre-inform feed
+    
+    Route and stop are ids; details come from the optional side tables.
+    """
+    class Meta:
+        model = PreInform
+        fields = [
+            'id',
+            'route',
+            'boarding_stop',
+            'date_of_travel',
+            'desired_time',
+            'passenger_count',
+            'status',
+            'subscription',
+            'created_at',
+            'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class PreInformCreateSerializer(serializers.ModelSerializer):
     """
     Simplified serializer for creating pre-informs
+    
+    Route and stop are checked against the cached membership index and
+    saved as ids, so validation costs no queries.
     """
+    route = RouteIdField(source='route_id')
+    boarding_stop = StopIdField(source='boarding_stop_id')
+    
     class Meta:
         model = PreInform
         fields = [
@@ -65,4 +100,53 @@ class PreInformCreateSerializer(serializers.ModelSerializer):
             'desired_time',
             'boarding_stop',
             'passenger_count'
-        ]
\ No newline at end of file
+        ]
+    
+    def validate(self, data):
+        validate_stop_on_route(data['route_id'], data['boarding_stop_id'])
+        return data
+
+
+class PreInformSubscriptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for recurring pre-inform subscriptions
+    """
+    route = RouteIdField(source='route_id')
+    boarding_stop = StopIdField(source='boarding_stop_id')
+    
+    class Meta:
+        model = PreInformSubscription
+        fields = [
+            'id',
+            'route',
+            'boarding_stop',
+            'desired_time',
+            'passenger_count',
+            'weekday_mask',
+            'start_date',
+            'end_date',
+            'is_active',
+            'created_at'
+        ]
+        read_only_fields = ['id', 'is_active', 'created_at']
+    
+    def validate_weekday_mask(self, value):
+        if not 0 < value < 128:
+            raise serializers.ValidationError(
+                "Weekday mask must select at least one day (1=Mon ... 64=Sun)."
+            )
+        return value
+    
+    def validate(self, data):
+        """
+        Ensure boarding stop belongs to route and the date range is valid
+        """
+        validate_stop_on_route(data['route_id'], data['boarding_stop_id'])
+        
+        end_date = data.get('end_date')
+        if end_date and end_date < data['start_date']:
+            raise serializers.ValidationError(
+                "End date cannot be before start date."
+            )
+        
+        return data
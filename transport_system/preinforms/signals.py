@@ -0,0 +1,91 @@
+"""
+PreInforms Signals
+Keep the demand cube, trip load projections and anomaly detector in sync
+with PreInform changes
+"""
+
+from types import SimpleNamespace
+
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date, parse_time
+
+from demand.anomalies import detector
+from .models import PreInform, PreInformSubscription
+from . import cube, matching
+
+# Fields that decide where a pre-inform is counted
+TRACKED_FIELDS = ('route_id', 'boarding_stop_id', 'date_of_travel', 'desired_time', 'passenger_count', 'status')
+
+# Marker for instances loaded with some tracked fields deferred
+UNKNOWN = object()
+
+
+def snapshot(instance):
+    """Copy the tracked fields of a pre-inform"""
+    state = SimpleNamespace(**{name: getattr(instance, name) for name in TRACKED_FIELDS})
+    # Unsaved instances may still hold raw strings
+    if isinstance(state.date_of_travel, str):
+        state.date_of_travel = parse_date(state.date_of_travel)
+    if isinstance(state.desired_time, str):
+        state.desired_time = parse_time(state.desired_time)
+    return state
+
+
+@receiver(post_init, sender=PreInform)
+def preinform_loaded(sender, instance, **kwargs):
+    """Remember the loaded state so saves can apply a delta"""
+    if instance.pk is None:
+        instance._loaded_state = None
+    elif set(TRACKED_FIELDS) & instance.get_deferred_fields():
+        instance._loaded_state = UNKNOWN
+    else:
+        instance._loaded_state = snapshot(instance)
+
+
+@receiver(pre_save, sender=PreInform)
+def preinform_saving(sender, instance, **kwargs):
+    """Load the stored state if it was not known at load time"""
+    if getattr(instance, '_loaded_state', None) is UNKNOWN:
+        stored = PreInform.objects.filter(pk=instance.pk).first()
+        instance._loaded_state = snapshot(stored) if stored else None
+
+
+@receiver(post_save, sender=PreInform)
+def preinform_saved(sender, instance, created, **kwargs):
+    """Move the pre-inform between cube cells and matched trips"""
+    if cube.is_suspended():
+        return
+    old = None if created else getattr(instance, '_loaded_state', None)
+    new = snapshot(instance)
+
+    counted = (cube.contribution(old) if old else None, cube.contribution(new))
+    cube.apply_change(*counted)
+    if created and instance.subscription_id:
+        # Cached projections counted this day as a virtual occurrence
+        matching.invalidate(new.route_id, new.date_of_travel)
+    else:
+        matching.apply_change(old, new)
+    detector.apply_change(*counted)
+    instance._loaded_state = new
+
+
+@receiver(post_delete, sender=PreInform)
+def preinform_deleted(sender, instance, **kwargs):
+    """Remove a deleted pre-inform from the cube and projections"""
+    if cube.is_suspended():
+        return
+    old = getattr(instance, '_loaded_state', None)
+    if old is UNKNOWN:
+        old = snapshot(instance)
+    counted = cube.contribution(old) if old else None
+    cube.apply_change(counted, None)
+    matching.apply_change(old, None)
+    detector.apply_change(counted, None)
+
+
+@receiver(post_save, sender=PreInformSubscription)
+@receiver(post_delete, sender=PreInformSubscription)
+def subscription_changed(sender, instance, **kwargs):
+    """Recurring trips feed every projection of their route"""
+    matching.invalidate_route(instance.route_id)
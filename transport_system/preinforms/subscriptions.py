@@ -0,0 +1,73 @@
+"""
+Recurring Pre-Inform Expansion
+Expands subscriptions into virtual daily pre-informs for reporting
+"""
+
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import PreInform, PreInformSubscription
+
+
+def active_subscriptions(date_from, date_to, **filters):
+    """Subscriptions that cover at least part of a date range"""
+    return PreInformSubscription.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=date_from),
+        is_active=True,
+        start_date__lte=date_to,
+        **filters
+    )
+
+
+def expand(date_from, date_to, **filters):
+    """
+    Virtual occurrences of subscriptions in a date range
+
+    Days that already have a materialized PreInform are skipped; that row
+    is counted on its own, with whatever status it now has.
+
+    Args:
+        **filters: Extra subscription filters, e.g. route_id=1
+
+    Returns:
+        list: (subscription, date) pairs
+    """
+    subscriptions = list(active_subscriptions(date_from, date_to, **filters))
+    if not subscriptions:
+        return []
+
+    materialized = set(
+        PreInform.objects.filter(
+            subscription__in=subscriptions,
+            date_of_travel__gte=date_from,
+            date_of_travel__lte=date_to
+        ).values_list('subscription_id', 'date_of_travel')
+    )
+
+    return [
+        (subscription, date)
+        for subscription in subscriptions
+        for date in subscription.dates(date_from, date_to)
+        if (subscription.id, date) not in materialized
+    ]
+
+
+def virtual_cells(date_from, date_to, **filters):
+    """
+    Demand cube deltas for virtual occurrences
+
+    Returns:
+        dict: {(route_id, boarding_stop_id, date, hour): [passengers, pre-informs]}
+    """
+    cells = defaultdict(lambda: [0, 0])
+    for subscription, date in expand(date_from, date_to, **filters):
+        key = (
+            subscription.route_id,
+            subscription.boarding_stop_id,
+            date,
+            subscription.desired_time.hour
+        )
+        cells[key][0] += subscription.passenger_count
+        cells[key][1] += 1
+    return cells
@@ -1,3 +1,266 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from routes import membership
+from routes.models import Route, Stop
+from schedules.models import Bus, Schedule
+from users.models import CustomUser
+from .models import DemandCell, PreInform, PreInformSubscription
+from . import cube, lifecycle, matching
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class SubscriptionCancellationTests(TestCase):
+    """
+    Ending a subscription keeps its past demand
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        self.user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.subscription = PreInformSubscription.objects.create(
+            user=self.user, route=self.route, boarding_stop=self.stop,
+            desired_time=time(8), passenger_count=2,
+            weekday_mask=127, start_date=self.today - timedelta(days=14)
+        )
+
+    def cancel(self, data=None):
+        return self.client.post(
+            f'/api/preinforms/subscriptions/{self.subscription.id}/cancel/', data or {}, format='json'
+        )
+
+    def test_cancel_keeps_past_occurrences(self):
+        past_week = (self.today - timedelta(days=7), self.today - timedelta(days=1))
+        before = cube.route_passenger_totals(*past_week)
+        self.assertEqual(before, {self.route.id: 14})
+
+        self.assertEqual(self.cancel().status_code, 200)
+
+        self.assertEqual(cube.route_passenger_totals(*past_week), before)
+        self.assertEqual(cube.route_passenger_totals(self.today, self.today + timedelta(days=7)), {})
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.end_date, self.today - timedelta(days=1))
+
+    def test_cancel_before_start_deactivates(self):
+        self.subscription.start_date = self.today + timedelta(days=3)
+        self.subscription.save()
+
+        self.cancel()
+
+        self.subscription.refresh_from_db()
+        self.assertFalse(self.subscription.is_active)
+        self.assertEqual(cube.route_passenger_totals(self.today, self.today + timedelta(days=14)), {})
+
+    def test_cancelled_day_leaves_cached_trip_loads(self):
+        matching.clear()
+        self.addCleanup(matching.clear)
+        day = self.today + timedelta(days=1)
+        schedule = Schedule.objects.create(
+            route=self.route,
+            bus=Bus.objects.create(number_plate='KL-1', capacity=40),
+            driver=CustomUser.objects.create_user(email='d@x.com', password='x', role='driver'),
+            date=day, departure_time=time(8, 30), arrival_time=time(9, 30),
+            total_seats=40, available_seats=40
+        )
+
+        def boarding():
+            profile = matching.get_projection(self.route.id, day).schedule_profile(schedule.id)
+            return profile[0]['boarding']
+
+        self.assertEqual(boarding(), 2)
+
+        self.assertEqual(self.cancel({'date': day.isoformat()}).status_code, 200)
+
+        self.assertEqual(boarding(), 0)
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class BulkPreInformTests(TestCase):
+    """
+    Bulk submissions report invalid items and create the rest atomically
+    """
+
+    def setUp(self):
+        membership.invalidate()
+        self.travel = timezone.localdate() + timedelta(days=1)
+        self.route, other = [
+            Route.objects.create(
+                number=number, name='R', origin='A', destination='B',
+                total_distance=Decimal('20'), duration=Decimal('1.0')
+            )
+            for number in ('101', '102')
+        ]
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        self.other_stop = Stop.objects.create(route=other, name='C', sequence=1, distance_from_origin=0)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email='p@x.com', password='x'))
+
+    def item(self, **fields):
+        return {
+            'route': self.route.id, 'date_of_travel': self.travel.isoformat(),
+            'desired_time': '08:00', 'boarding_stop': self.stop.id, 'passenger_count': 2,
+            **fields
+        }
+
+    def submit(self, items):
+        return self.client.post('/api/preinforms/bulk/', {'preinforms': items}, format='json')
+
+    def test_invalid_items_are_reported_by_index(self):
+        response = self.submit([
+            self.item(),
+            self.item(boarding_stop=self.other_stop.id),
+            self.item(desired_time='soon'),
+            self.item(route=999999),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 3))
+        results = response.data['results']
+        self.assertEqual(results[0], {'index': 0, 'id': PreInform.objects.get().id})
+        self.assertEqual([result['index'] for result in results[1:]], [1, 2, 3])
+        self.assertIn('desired_time', results[2]['errors'])
+        self.assertIn('route', results[3]['errors'])
+        self.assertEqual(cube.route_passenger_totals(self.travel, self.travel), {self.route.id: 2})
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.submit([self.item(passenger_count='many')])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PreInform.objects.exists())
+
+    def test_failed_cube_update_rolls_back_the_batch(self):
+        with mock.patch.object(cube, 'add_preinforms', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.submit([self.item(), self.item(passenger_count=3)])
+
+        self.assertFalse(PreInform.objects.exists())
+        self.assertFalse(DemandCell.objects.exists())
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class LifecycleSweepTests(TestCase):
+    """
+    Past pre-informs leave the open statuses in batched updates
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.preinforms = {
+            (status, days): PreInform.objects.create(
+                user=user, route=route, boarding_stop=stop,
+                date_of_travel=self.today + timedelta(days=days),
+                desired_time=time(8), status=status
+            )
+            for status in ('pending', 'noted', 'cancelled')
+            for days in (-2, -1, 0)
+        }
+
+    def statuses(self):
+        return {
+            key: PreInform.objects.get(pk=preinform.pk).status
+            for key, preinform in self.preinforms.items()
+        }
+
+    def test_past_pending_expire_and_noted_complete(self):
+        self.assertEqual(
+            lifecycle.close_past(dry_run=True),
+            {'pending->expired': 2, 'noted->completed': 2}
+        )
+        self.assertEqual(set(self.statuses().values()), {'pending', 'noted', 'cancelled'})
+
+        self.assertEqual(
+            lifecycle.close_past(batch_size=1),
+            {'pending->expired': 2, 'noted->completed': 2}
+        )
+
+        expected = {
+            ('pending', -2): 'expired', ('pending', -1): 'expired', ('pending', 0): 'pending',
+            ('noted', -2): 'completed', ('noted', -1): 'completed', ('noted', 0): 'noted',
+        }
+        self.assertEqual(
+            self.statuses(),
+            {**expected, **{('cancelled', days): 'cancelled' for days in (-2, -1, 0)}}
+        )
+        self.assertEqual(lifecycle.close_past(), {'pending->expired': 0, 'noted->completed': 0})
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command('close_past_preinforms', stdout=out)
+
+        self.assertIn('Moved 2 pre-inform(s) pending->expired', out.getvalue())
+        self.assertIn('Moved 2 pre-inform(s) noted->completed', out.getvalue())
+
+
+@override_settings(ANOMALY_SNAPSHOT_PATH=None)
+class FeedETagTests(TestCase):
+    """
+    The pre-inform feed answers unchanged requests with 304
+    """
+
+    def setUp(self):
+        route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=route, name='A', sequence=1, distance_from_origin=0)
+        self.user = CustomUser.objects.create_user(email='p@x.com', password='x')
+        self.other = CustomUser.objects.create_user(email='q@x.com', password='x')
+        self.preinform, _ = [
+            PreInform.objects.create(
+                user=user, route=route, boarding_stop=self.stop,
+                date_of_travel=timezone.localdate() + timedelta(days=1), desired_time=time(8)
+            )
+            for user in (self.user, self.other)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def feed(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/preinforms/my/feed/', params, **headers)
+
+    def test_unchanged_feed_is_not_modified(self):
+        first = self.feed()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([row['id'] for row in first.data['results']], [self.preinform.id])
+
+        second = self.feed(first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Cache-Control'], 'private, no-cache')
+
+        # Another user's changes and a different page have their own tags
+        PreInform.objects.filter(user=self.other).update(passenger_count=3, updated_at=timezone.now())
+        self.assertEqual(self.feed(first['ETag']).status_code, 304)
+        self.assertEqual(self.feed(first['ETag'], include='routes').status_code, 200)
+
+    def test_changed_preinform_changes_the_tag(self):
+        etag = self.feed()['ETag']
+
+        self.preinform.passenger_count = 2
+        self.preinform.save()
+
+        response = self.feed(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
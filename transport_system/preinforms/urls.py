@@ -11,7 +11,13 @@ urlpatterns = [
     
     # API endpoints
     path('api/preinforms/', views.PreInformCreateView.as_view(), name='preinform-create'),
+    path('api/preinforms/bulk/', views.bulk_preinform_view, name='preinform-bulk'),
     path('api/preinforms/list/', views.PreInformListView.as_view(), name='preinform-list'),
     path('api/preinforms/my/', views.my_preinforms_view, name='my-preinforms'),
+    path('api/preinforms/my/feed/', views.MyPreInformFeedView.as_view(), name='my-preinforms-feed'),
+    path('api/preinforms/mark-noted/', views.mark_noted_view, name='preinform-mark-noted'),
     path('api/preinforms/<int:preinform_id>/cancel/', views.cancel_preinform_view, name='cancel-preinform'),
+    path('api/preinforms/subscriptions/', views.PreInformSubscriptionListCreateView.as_view(), name='preinform-subscriptions'),
+    path('api/preinforms/subscriptions/<int:subscription_id>/cancel/', views.cancel_subscription_view, name='cancel-preinform-subscription'),
+    path('api/schedules/<int:schedule_id>/expected-load/', views.schedule_expected_load_view, name='schedule-expected-load'),
 ]
\ No newline at end of file
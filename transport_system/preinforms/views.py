@@ -7,12 +7,29 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authentication import SessionAuthentication
+from rest_framework.pagination import CursorPagination
+from datetime import datetime
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag
 
-from .models import PreInform
-from .serializers import PreInformSerializer, PreInformCreateSerializer
+from .models import PreInform, PreInformSubscription
+from .serializers import (
+    PreInformSerializer,
+    PreInformFeedSerializer,
+    PreInformCreateSerializer,
+    PreInformSubscriptionSerializer,
+)
+from . import cube, matching, lifecycle
+from demand.anomalies import detector
+from routes.models import Route, Stop
+from routes.serializers import RouteListSerializer, StopSerializer
 from schedules.models import Schedule
 
 
@@ -68,6 +85,72 @@ class PreInformCreateView(generics.CreateAPIView):
         )
 
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_preinform_view(request):
+    """
+    Submit many pre-informs at once (e.g. a week of commutes or a school group)
+    
+    POST /api/preinforms/bulk/
+    {
+        "preinforms": [
+            {"route": 1, "date_of_travel": "2024-12-23", "desired_time": "09:00",
+             "boarding_stop": 5, "passenger_count": 1},
+            ...
+        ]
+    }
+    
+    Valid items are created in one transaction; invalid items are
+    reported by index without failing the rest of the batch.
+    """
+    items = request.data.get('preinforms') if isinstance(request.data, dict) else request.data
+    max_items = getattr(settings, 'PREINFORM_BULK_MAX_ITEMS', 200)
+    
+    if not isinstance(items, list) or not items:
+        return Response(
+            {'error': 'Provide a non-empty "preinforms" list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > max_items:
+        return Response(
+            {'error': f'At most {max_items} pre-informs per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Ids and stop membership are checked against the cached index,
+    # so validating the batch costs no queries
+    results = [None] * len(items)
+    to_create = []
+    for index, item in enumerate(items):
+        serializer = PreInformCreateSerializer(data=item)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'errors': serializer.errors}
+            continue
+        to_create.append((index, PreInform(user=request.user, **serializer.validated_data)))
+    
+    with transaction.atomic():
+        created = PreInform.objects.bulk_create([preinform for _, preinform in to_create])
+        # bulk_create skips signals, so update the demand cube here
+        cube.add_preinforms(created)
+    matching.add_preinforms(created)
+    for preinform in created:
+        detector.observe_preinform(preinform)
+    
+    for (index, _), preinform in zip(to_create, created):
+        results[index] = {'index': index, 'id': preinform.id}
+    
+    return Response(
+        {
+            'success': bool(created),
+            'created': len(created),
+            'failed': len(items) - len(created),
+            'results': results,
+        },
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    )
+
+
 class PreInformListView(generics.ListAPIView):
     """
     API endpoint to list pre-informs
@@ -116,15 +199,91 @@ def my_preinforms_view(request):
     Get pre-informs for currently logged-in user
     
     GET /api/preinforms/my/
+    
+    Returns every pre-inform with nested route details; kept for
+    existing clients. New clients should use /api/preinforms/my/feed/.
     """
     preinforms = PreInform.objects.filter(
         user=request.user
-    ).select_related('route', 'boarding_stop').order_by('-created_at')
+    ).select_related(
+        'user', 'route', 'boarding_stop'
+    ).prefetch_related('route__stops').order_by('-created_at')
     
     serializer = PreInformSerializer(preinforms, many=True)
     return Response(serializer.data)
 
 
+class PreInformFeedPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first
+    """
+    page_size = getattr(settings, 'PREINFORM_FEED_PAGE_SIZE', 20)
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class MyPreInformFeedView(generics.ListAPIView):
+    """
+    Paginated feed of the logged-in user's pre-informs
+    
+    GET /api/preinforms/my/feed/
+    Optional params:
+    - cursor: Opaque cursor from the previous page's "next" link
+    - limit: Page size (max 100)
+    - include: "routes" and/or "stops" (comma separated) to add side
+      tables keyed by id for the routes and stops on the page
+    
+    Responses carry an ETag that changes whenever any of the user's
+    pre-informs does; send it back as If-None-Match to get 304.
+    """
+    serializer_class = PreInformFeedSerializer
+    pagination_class = PreInformFeedPagination
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return PreInform.objects.filter(user=self.request.user)
+    
+    def get_etag(self, request):
+        """Fingerprint of the user's pre-informs and this page's query"""
+        state = self.get_queryset().aggregate(
+            count=Count('id'),
+            last_change=Max('updated_at')
+        )
+        fingerprint = f"{request.user.pk}:{state['count']}:{state['last_change']}:{request.get_full_path()}"
+        return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+            self.add_side_tables(request, response)
+        
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    def add_side_tables(self, request, response):
+        include = set(request.query_params.get('include', '').split(','))
+        page = self.paginator.page
+        
+        if 'routes' in include:
+            routes = Route.objects.filter(id__in={row.route_id for row in page})
+            response.data['routes'] = {
+                route.id: data
+                for route, data in zip(routes, RouteListSerializer(routes, many=True).data)
+            }
+        if 'stops' in include:
+            stops = Stop.objects.filter(id__in={row.boarding_stop_id for row in page})
+            response.data['stops'] = {
+                stop.id: data
+                for stop, data in zip(stops, StopSerializer(stops, many=True).data)
+            }
+
+
 @csrf_exempt
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
@@ -159,6 +318,195 @@ def cancel_preinform_view(request, preinform_id):
         )
 
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_noted_view(request):
+    """
+    Acknowledge many pending pre-informs at once (Admin only)
+    
+    POST /api/preinforms/mark-noted/
+    {"ids": [1, 2, 3]}
+    or
+    {"route_id": 1, "date": "2024-12-25"}   (either or both)
+    
+    Runs as one UPDATE however many pre-informs match.
+    """
+    if request.user.role != 'admin':
+        return Response(
+            {'error': 'Only admins can mark pre-informs as noted'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    ids = request.data.get('ids')
+    route_id = request.data.get('route_id')
+    date_param = request.data.get('date')
+    
+    if not ids and not route_id and not date_param:
+        return Response(
+            {'error': 'Provide "ids" or a "route_id"/"date" selection'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    queryset = PreInform.objects.all()
+    try:
+        if ids:
+            if not isinstance(ids, list):
+                raise ValueError
+            queryset = queryset.filter(pk__in=[int(pk) for pk in ids])
+        if route_id:
+            queryset = queryset.filter(route_id=int(route_id))
+        if date_param:
+            date = datetime.strptime(date_param, '%Y-%m-%d').date()
+            queryset = queryset.filter(date_of_travel=date)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'ids and route_id must be integers and date YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    updated = lifecycle.mark_noted(queryset)
+    
+    return Response({
+        'success': True,
+        'message': f'{updated} pre-inform(s) marked as noted',
+        'updated': updated
+    })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class PreInformSubscriptionListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint for recurring pre-informs (e.g. a daily commute)
+    
+    GET /api/preinforms/subscriptions/
+    POST /api/preinforms/subscriptions/
+    {
+        "route": 1,
+        "boarding_stop": 5,
+        "desired_time": "08:30",
+        "passenger_count": 1,
+        "weekday_mask": 31,
+        "start_date": "2024-12-02",
+        "end_date": "2025-03-31"
+    }
+    
+    weekday_mask bits: 1=Mon, 2=Tue, 4=Wed, 8=Thu, 16=Fri, 32=Sat, 64=Sun
+    """
+    serializer_class = PreInformSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = (CsrfExemptSessionAuthentication,)
+    
+    def get_queryset(self):
+        return PreInformSubscription.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        """Set the user to currently logged-in user"""
+        serializer.save(user=self.request.user)
+
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_subscription_view(request, subscription_id):
+    """
+    Cancel one day of a subscription, or the whole subscription
+    
+    POST /api/preinforms/subscriptions/<id>/cancel/
+    {"date": "2024-12-25"}   (omit date to end the subscription)
+    
+    Ending a subscription keeps the days already travelled.
+    """
+    try:
+        subscription = PreInformSubscription.objects.get(
+            id=subscription_id,
+            user=request.user
+        )
+    except PreInformSubscription.DoesNotExist:
+        return Response(
+            {'error': 'Subscription not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    date_param = request.data.get('date')
+    if not date_param:
+        subscription.end()
+        return Response({
+            'success': True,
+            'message': 'Subscription cancelled successfully'
+        })
+    
+    try:
+        date = datetime.strptime(date_param, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Date must be in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not subscription.is_active or not subscription.runs_on(date):
+        return Response(
+            {'error': 'Subscription does not cover this date'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Only now does the day get its own PreInform row
+    preinform, _ = subscription.materialize(date)
+    if preinform.status != 'pending':
+        return Response(
+            {'error': 'Can only cancel pending pre-informs'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    preinform.status = 'cancelled'
+    preinform.save()
+    
+    return Response({
+        'success': True,
+        'message': f'Trip on {date} cancelled successfully'
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def schedule_expected_load_view(request, schedule_id):
+    """
+    Expected boardings per stop for a trip, from matched pre-informs
+    
+    GET /api/schedules/<schedule_id>/expected-load/
+    """
+    if request.user.role not in ('admin', 'driver'):
+        return Response(
+            {'error': 'Only controllers and drivers can view expected loads'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        schedule = Schedule.objects.only(
+            'id', 'route_id', 'date', 'departure_time', 'total_seats'
+        ).get(id=schedule_id)
+    except Schedule.DoesNotExist:
+        return Response(
+            {'error': 'Schedule not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    projection = matching.get_projection(schedule.route_id, schedule.date)
+    profile = projection.schedule_profile(schedule.id) or []
+    expected = profile[-1]['cumulative'] if profile else 0
+    
+    return Response({
+        'schedule_id': schedule.id,
+        'route_id': schedule.route_id,
+        'date': schedule.date,
+        'departure_time': schedule.departure_time,
+        'total_seats': schedule.total_seats,
+        'expected_passengers': expected,
+        'load_factor': round(expected / schedule.total_seats, 2) if schedule.total_seats else None,
+        'stops': profile,
+    })
+
+
 def preinform_form_page(request):
     """
     Serve the pre-inform form page
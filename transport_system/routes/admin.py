@@ -2,8 +2,14 @@
 Routes Admin Configuration
 """
 
-from django.contrib import admin
-from .models import Route, Stop
+from django.contrib import admin, messages
+from django.db.models import Count
+from operations import jobs
+from schedules.propagation import TASK, TIMING_FIELDS
+from .models import Route, Stop, StopPlace
+
+# Propagation conflicts listed on a route's page before summarising
+MAX_LISTED_CONFLICTS = 5
 
 
 class StopInline(admin.TabularInline):
@@ -55,6 +61,49 @@ class RouteAdmin(admin.ModelAdmin):
     def stop_count(self, obj):
         """Display number of stops"""
         return obj.stops.count()
+    
+    def save_model(self, request, obj, form, change):
+        """Tell the admin that a timing change is applied in the background"""
+        super().save_model(request, obj, form, change)
+        if change and set(form.changed_data) & set(TIMING_FIELDS):
+            self.message_user(
+                request,
+                "Upcoming trips are being retimed in the background. "
+                "Any conflicts will be listed when this route is opened again.",
+                messages.INFO
+            )
+    
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        """Show conflicts left by the route's latest timing change"""
+        if request.method == 'GET' and object_id.isdigit():
+            self.warn_conflicts(request, int(object_id))
+        return super().change_view(request, object_id, form_url, extra_context)
+    
+    def warn_conflicts(self, request, route_id):
+        job = jobs.latest(TASK, route_id=route_id)
+        if job is None:
+            return
+        if job.status == 'failed':
+            self.message_user(
+                request, f"Retiming upcoming trips failed (job #{job.pk}): {job.error}", messages.ERROR
+            )
+            return
+        
+        conflicts = (job.result or {}).get('conflicts', [])
+        for conflict in conflicts[:MAX_LISTED_CONFLICTS]:
+            if 'schedule_id' in conflict:
+                subject = f"Trip #{conflict['schedule_id']}"
+            else:
+                subject = f"Bus #{conflict['bus_id']}"
+            self.message_user(
+                request, f"{subject} on {conflict['date']}: {conflict['message']}", messages.WARNING
+            )
+        if len(conflicts) > MAX_LISTED_CONFLICTS:
+            self.message_user(
+                request,
+                f"{len(conflicts) - MAX_LISTED_CONFLICTS} more conflict(s) in job #{job.pk}",
+                messages.WARNING
+            )
     stop_count.short_description = 'Stops'
 
 
@@ -71,14 +120,33 @@ class StopAdmin(admin.ModelAdmin):
         'is_limited_stop'
     )
     list_filter = ('route', 'is_limited_stop')
+    raw_id_fields = ('place',)
     search_fields = ('name', 'route__number', 'route__name')
     ordering = ('route', 'sequence')
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('route', 'name', 'sequence')
+            'fields': ('route', 'name', 'sequence', 'place')
         }),
         ('Location Details', {
             'fields': ('distance_from_origin', 'is_limited_stop')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(StopPlace)
+class StopPlaceAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for StopPlace model
+    """
+    list_display = ('name', 'latitude', 'longitude', 'route_count')
+    search_fields = ('name', 'normalized_name')
+    readonly_fields = ('created_at', 'updated_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(route_count=Count('stops__route', distinct=True))
+    
+    def route_count(self, obj):
+        """Display number of routes serving the place"""
+        return obj.route_count
+    route_count.short_description = 'Routes'
@@ -0,0 +1,135 @@
+"""
+Route/Stop Membership Index
+Process-wide cache of which stops belong to which route
+
+Every process keeps its own copy, stamped with a generation number.
+Route and stop changes bump the generation, so other processes rebuild
+before answering from a stale copy. The generation lives in the default
+cache when every process shares it, and in a MembershipGeneration row
+otherwise: a local-memory cache is private to its process, so a bump
+there would never reach the others. Ids missing from the index are
+checked with one query rather than a rebuild, so unknown ids cannot
+force full reloads.
+"""
+
+import threading
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+
+from .models import MembershipGeneration, Route, Stop
+
+GENERATION_KEY = 'routes:membership:generation'
+
+# Cache backends whose entries other processes cannot see
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+class MembershipIndex:
+    """
+    Route to stop ids and stop to route lookups
+
+    Used by create paths to check ids and stop/route membership without
+    a query per foreign key.
+    """
+    __slots__ = ('route_stops', 'stop_routes', 'generation')
+
+    def __init__(self, route_ids, stops, generation=0):
+        """
+        Args:
+            route_ids: Every route id
+            stops: (stop id, route id) tuples
+            generation: Shared generation the rows were read at
+        """
+        self.generation = generation
+        route_stops = {route_id: set() for route_id in route_ids}
+        self.stop_routes = {}
+        for stop_id, route_id in stops:
+            self.stop_routes[stop_id] = route_id
+            route_stops.setdefault(route_id, set()).add(stop_id)
+        self.route_stops = {
+            route_id: frozenset(stop_ids) for route_id, stop_ids in route_stops.items()
+        }
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def shared_cache():
+    """Whether every process sees the default cache"""
+    return not isinstance(caches['default'], LOCAL_CACHE_BACKENDS)
+
+
+def _generation():
+    if shared_cache():
+        return cache.get(GENERATION_KEY, 0)
+    return MembershipGeneration.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def build_index(generation=0):
+    return MembershipIndex(
+        Route.objects.values_list('id', flat=True),
+        Stop.objects.values_list('id', 'route_id'),
+        generation
+    )
+
+
+def get_index(refresh=False):
+    """Get the membership index, rebuilding it when another process changed rows"""
+    global _index
+    generation = _generation()
+    with _lock:
+        index = _index
+    if index is not None and index.generation == generation and not refresh:
+        return index
+
+    index = build_index(generation)
+    with _lock:
+        _index = index
+    return index
+
+
+def route_exists(route_id):
+    return route_id in get_index().route_stops or Route.objects.filter(pk=route_id).exists()
+
+
+def stop_exists(stop_id):
+    return stop_id in get_index().stop_routes or Stop.objects.filter(pk=stop_id).exists()
+
+
+def stop_route(stop_id):
+    """Route id a stop belongs to, or None"""
+    route_id = get_index().stop_routes.get(stop_id)
+    if route_id is None:
+        route_id = Stop.objects.filter(pk=stop_id).values_list('route_id', flat=True).first()
+    return route_id
+
+
+def stop_on_route(stop_id, route_id):
+    return (
+        stop_id in get_index().route_stops.get(route_id, ())
+        or Stop.objects.filter(pk=stop_id, route_id=route_id).exists()
+    )
+
+
+def stops_for_route(route_id):
+    return get_index().route_stops.get(route_id, frozenset())
+
+
+def invalidate():
+    """Drop the index here and in every other process"""
+    global _index
+    if shared_cache():
+        cache.add(GENERATION_KEY, 0, None)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(GENERATION_KEY, 1, None)
+    elif not MembershipGeneration.objects.filter(pk=1).update(value=F('value') + 1):
+        MembershipGeneration.objects.get_or_create(pk=1, defaults={'value': 1})
+    with _lock:
+        _index = None
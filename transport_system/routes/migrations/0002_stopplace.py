@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopPlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Display name of the stop', max_length=100)),
+                ('normalized_name', models.CharField(help_text='Name used to match route stops to this place', max_length=100, unique=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, help_text='Latitude of the stop', max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, help_text='Longitude of the stop', max_digits=9, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stop Place',
+                'verbose_name_plural': 'Stop Places',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stop',
+            name='place',
+            field=models.ForeignKey(blank=True, help_text='Physical stop (matched by name when left blank)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stops', to='routes.stopplace'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import re
+
+from django.db import migrations
+
+
+def normalize_stop_name(name):
+    # Frozen copy of routes.models.normalize_stop_name
+    return ' '.join(re.sub(r'[^\w\s&]', ' ', name.lower()).split())
+
+
+def link_stops(apps, schema_editor):
+    """Create one place per distinct normalized stop name"""
+    Stop = apps.get_model('routes', 'Stop')
+    StopPlace = apps.get_model('routes', 'StopPlace')
+
+    places = {place.normalized_name: place for place in StopPlace.objects.all()}
+    stops = list(Stop.objects.filter(place__isnull=True).order_by('id'))
+    for stop in stops:
+        key = normalize_stop_name(stop.name)
+        if key not in places:
+            places[key] = StopPlace.objects.create(name=stop.name.strip(), normalized_name=key)
+        stop.place_id = places[key].id
+    Stop.objects.bulk_update(stops, ['place'], batch_size=500)
+
+
+def unlink_stops(apps, schema_editor):
+    Stop = apps.get_model('routes', 'Stop')
+    StopPlace = apps.get_model('routes', 'StopPlace')
+    Stop.objects.update(place=None)
+    StopPlace.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0002_stopplace'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_stops, unlink_stops),
+    ]
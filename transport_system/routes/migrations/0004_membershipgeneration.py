@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_link_stops_to_places'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Membership Generation',
+                'verbose_name_plural': 'Membership Generations',
+            },
+        ),
+    ]
@@ -3,9 +3,22 @@ Route and Stop Models
 Defines bus routes and their stops
 """
 
+import re
+
 from django.db import models
 
 
+def normalize_stop_name(name):
+    """
+    Key used to recognise the same physical stop across routes
+    
+    Case, punctuation and repeated whitespace are ignored, so
+    "Central Library", "central library." and " Central  Library"
+    all map to "central library".
+    """
+    return ' '.join(re.sub(r'[^\w\s&]', ' ', name.lower()).split())
+
+
 class Route(models.Model):
     """
     Bus Route Model
@@ -74,6 +87,13 @@ class Route(models.Model):
     def __str__(self):
         return f"{self.number}: {self.origin} to {self.destination}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored values, so saves can tell which fields changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     def calculate_trips_per_day(self, operational_hours=15):
         """
         Calculate how many round trips a bus can make on this route in a day.
@@ -93,6 +113,64 @@ class Route(models.Model):
         return int(trips)
 
 
+class StopPlace(models.Model):
+    """
+    Stop Place Model
+    A physical stop, shared by every route that serves it
+    """
+    name = models.CharField(
+        max_length=100,
+        help_text="Display name of the stop"
+    )
+    normalized_name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Name used to match route stops to this place"
+    )
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="Latitude of the stop"
+    )
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="Longitude of the stop"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Stop Place'
+        verbose_name_plural = 'Stop Places'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def for_name(cls, name):
+        """Get or create the place for a stop name"""
+        place, _ = cls.objects.get_or_create(
+            normalized_name=normalize_stop_name(name),
+            defaults={'name': name.strip()}
+        )
+        return place
+    
+    def save(self, *args, **kwargs):
+        if not self.normalized_name:
+            self.normalized_name = normalize_stop_name(self.name)
+        super().save(*args, **kwargs)
+    
+    def has_location(self):
+        return self.latitude is not None and self.longitude is not None
+
+
 class Stop(models.Model):
     """
     Bus Stop Model
@@ -121,6 +199,16 @@ class Stop(models.Model):
         help_text="Whether this is a major stop served by limited stop buses"
     )
     
+    # Physical stop shared with other routes
+    place = models.ForeignKey(
+        StopPlace,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='stops',
+        help_text="Physical stop (matched by name when left blank)"
+    )
+    
     class Meta:
         verbose_name = 'Stop'
         verbose_name_plural = 'Stops'
@@ -131,4 +219,48 @@ class Stop(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.sequence}. {self.name} (Route {self.route.number})"
\ No newline at end of file
+        return f"{self.sequence}. {self.name} (Route {self.route.number})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored name, so a rename can move the stop to its new place
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+    
+    def place_follows_rename(self):
+        """
+        Whether a rename should move the stop to another place
+        
+        Only a place matched by the stored name follows; a place chosen
+        by hand under a different name is kept.
+        """
+        loaded = getattr(self, '_loaded_name', None)
+        if loaded is None or normalize_stop_name(loaded) == normalize_stop_name(self.name):
+            return False
+        return self.place.normalized_name == normalize_stop_name(loaded)
+    
+    def save(self, *args, **kwargs):
+        """
+        Override save to link the stop to its physical place
+        """
+        if self.place_id is None or self.place_follows_rename():
+            self.place = StopPlace.for_name(self.name)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'place'}
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+
+class MembershipGeneration(models.Model):
+    """
+    Membership Generation Model
+    Counter of route and stop changes, for processes that share no cache
+    """
+    value = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Membership Generation'
+        verbose_name_plural = 'Membership Generations'
+    
+    def __str__(self):
+        return f"Membership generation {self.value}"
@@ -0,0 +1,135 @@
+"""
+Stop Patterns
+Precomputed bitsets of which stops each service type serves on a route
+"""
+
+import threading
+
+from .models import Stop
+
+# Service types as defined on schedules.Bus
+ALL_STOP = 'all_stop'
+LIMITED_STOP = 'limited_stop'
+EXPRESS = 'express'
+
+
+class StopPattern:
+    """
+    Stop pattern for one route
+
+    Each stop gets a bit position by sequence. A service type's mask has
+    the bit set for every stop it serves, so "does this trip serve this
+    stop" is a single AND.
+    """
+    __slots__ = ('route_id', 'positions', 'masks')
+
+    def __init__(self, route_id, stops):
+        """
+        Args:
+            stops: (id, is_limited_stop) tuples ordered by sequence
+        """
+        self.route_id = route_id
+        self.positions = {stop_id: bit for bit, (stop_id, _) in enumerate(stops)}
+
+        all_mask = (1 << len(stops)) - 1
+        # Origin and destination are served by every service type
+        terminals = 0
+        if stops:
+            terminals = 1 | (1 << (len(stops) - 1))
+
+        limited = terminals
+        for bit, (_, is_limited_stop) in enumerate(stops):
+            if is_limited_stop:
+                limited |= 1 << bit
+
+        self.masks = {
+            ALL_STOP: all_mask,
+            LIMITED_STOP: limited,
+            EXPRESS: terminals,
+        }
+
+    def mask(self, service_type):
+        """Bitset for a service type (unknown types serve every stop)"""
+        return self.masks.get(service_type, self.masks[ALL_STOP])
+
+    def bit(self, stop_id):
+        """Bit for a stop, or 0 if it is not on this route"""
+        position = self.positions.get(stop_id)
+        return 0 if position is None else 1 << position
+
+    def serves(self, service_type, stop_id):
+        return bool(self.mask(service_type) & self.bit(stop_id))
+
+    def serving_stop_ids(self, service_type):
+        mask = self.mask(service_type)
+        return [
+            stop_id for stop_id, position in self.positions.items()
+            if mask >> position & 1
+        ]
+
+
+_patterns = {}
+_lock = threading.Lock()
+
+
+def get_pattern(route_id):
+    """Get the stop pattern for a route, compiling it on first use"""
+    route_id = int(route_id)
+    with _lock:
+        pattern = _patterns.get(route_id)
+    if pattern is not None:
+        return pattern
+
+    stops = list(
+        Stop.objects.filter(route_id=route_id)
+        .order_by('sequence')
+        .values_list('id', 'is_limited_stop')
+    )
+    pattern = StopPattern(route_id, stops)
+
+    with _lock:
+        _patterns[route_id] = pattern
+    return pattern
+
+
+def get_patterns(route_ids):
+    """Get stop patterns for many routes, compiling missing ones in one query"""
+    route_ids = {int(route_id) for route_id in route_ids}
+    with _lock:
+        found = {rid: _patterns[rid] for rid in route_ids if rid in _patterns}
+
+    missing = route_ids - found.keys()
+    if missing:
+        stops = {rid: [] for rid in missing}
+        for route_id, stop_id, is_limited_stop in (
+            Stop.objects.filter(route_id__in=missing)
+            .order_by('route_id', 'sequence')
+            .values_list('route_id', 'id', 'is_limited_stop')
+        ):
+            stops[route_id].append((stop_id, is_limited_stop))
+
+        compiled = {rid: StopPattern(rid, rows) for rid, rows in stops.items()}
+        with _lock:
+            _patterns.update(compiled)
+        found.update(compiled)
+
+    return found
+
+
+def invalidate(route_id):
+    """Drop the cached pattern for a route"""
+    with _lock:
+        _patterns.pop(route_id, None)
+
+
+def invalidate_stop(stop_id):
+    """Drop every cached pattern that contains the given stop"""
+    with _lock:
+        stale = [rid for rid, pattern in _patterns.items() if stop_id in pattern.positions]
+        for route_id in stale:
+            del _patterns[route_id]
+
+
+def clear():
+    with _lock:
+        _patterns.clear()
@@ -4,7 +4,8 @@ Convert Route and Stop models to JSON for API responses
 """
 
 from rest_framework import serializers
-from .models import Route, Stop
+from .models import Route, Stop, StopPlace
+from . import membership
 
 
 class StopSerializer(serializers.ModelSerializer):
@@ -19,7 +20,8 @@ class StopSerializer(serializers.ModelSerializer):
             'name',
             'sequence',
             'distance_from_origin',
-            'is_limited_stop'
+            'is_limited_stop',
+            'place'
         ]
 
 
@@ -59,4 +61,82 @@ class RouteListSerializer(serializers.ModelSerializer):
             'origin',
             'destination',
             'total_distance'
-        ]
\ No newline at end of file
+        ]
+
+
+class PlaceStopSerializer(serializers.ModelSerializer):
+    """
+    A route's stop at a place, with just enough route details to list it
+    """
+    route_number = serializers.CharField(source='route.number', read_only=True)
+    destination = serializers.CharField(source='route.destination', read_only=True)
+    
+    class Meta:
+        model = Stop
+        fields = [
+            'id',
+            'route',
+            'route_number',
+            'destination',
+            'sequence',
+            'is_limited_stop'
+        ]
+
+
+class StopPlaceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for StopPlace model
+    Includes every route stop at the place
+    """
+    stops = PlaceStopSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = StopPlace
+        fields = [
+            'id',
+            'name',
+            'latitude',
+            'longitude',
+            'stops'
+        ]
+
+
+class IndexedIdField(serializers.IntegerField):
+    """
+    Related id checked against the cached membership index
+    
+    Pair with a source ending in _id (e.g. source='route_id') so create
+    paths validate and save foreign keys without fetching the objects.
+    Subclasses set `model` and may override exists() with a cached check.
+    """
+    model = None
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+    }
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('min_value', 1)
+        super().__init__(**kwargs)
+    
+    def exists(self, value):
+        return self.model.objects.filter(pk=value).exists()
+    
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not self.exists(value):
+            self.fail('does_not_exist', pk_value=value)
+        return value
+
+
+class RouteIdField(IndexedIdField):
+    model = Route
+    
+    def exists(self, value):
+        return membership.route_exists(value)
+
+
+class StopIdField(IndexedIdField):
+    model = Stop
+    
+    def exists(self, value):
+        return membership.stop_exists(value)
@@ -0,0 +1,25 @@
+"""
+Routes Signals
+Keep cached stop indexes in sync with Route and Stop changes
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Route, Stop
+from . import membership, patterns
+
+
+@receiver(post_save, sender=Stop)
+@receiver(post_delete, sender=Stop)
+def stop_changed(sender, instance, **kwargs):
+    """Recompile stop patterns for the affected route"""
+    patterns.invalidate_stop(instance.id)
+    patterns.invalidate(instance.route_id)
+    membership.invalidate()
+
+
+@receiver(post_delete, sender=Route)
+def route_deleted(sender, instance, **kwargs):
+    """Forget a deleted route, even one without stops"""
+    membership.invalidate()
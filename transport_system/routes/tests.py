@@ -1,3 +1,135 @@
-from django.test import TestCase
+import os
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from .models import MembershipGeneration, Route, Stop, StopPlace
+from .serializers import RouteIdField, StopIdField
+from . import membership
+
+
+# A cache every process on the host sees
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'transport-membership-tests'),
+    }
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class MembershipIndexTests(TestCase):
+    """
+    Id validation against the cached membership index
+    """
+
+    def setUp(self):
+        cache.clear()
+        membership.invalidate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+        membership.get_index()
+
+    def test_known_ids_need_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.stop_exists(self.stop.id))
+            self.assertTrue(membership.route_exists(self.route.id))
+            self.assertTrue(membership.stop_on_route(self.stop.id, self.route.id))
+
+    def test_unknown_id_costs_one_query_not_a_rebuild(self):
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                self.assertFalse(membership.stop_exists(999999))
+
+    def test_stop_created_elsewhere_is_found(self):
+        # Written without signals, as another process's index would see it
+        stop = Stop(route=self.route, name='B', sequence=2, distance_from_origin=20)
+        Stop.objects.bulk_create([stop])
+        self.assertTrue(membership.stop_on_route(stop.id, self.route.id))
+
+    def test_stop_deleted_elsewhere_is_rejected(self):
+        Stop.objects.filter(pk=self.stop.id)._raw_delete(Stop.objects.db)
+        # The deleting process bumps the shared generation
+        cache.incr(membership.GENERATION_KEY)
+        self.assertFalse(membership.stop_exists(self.stop.id))
+
+    def test_fields_reject_unknown_ids(self):
+        self.assertEqual(StopIdField().run_validation(str(self.stop.id)), self.stop.id)
+        for field, value in ((StopIdField(), 999999), (RouteIdField(), 999999), (StopIdField(), 0)):
+            with self.assertRaises(ValidationError):
+                field.run_validation(value)
+
+
+class LocalCacheMembershipTests(TestCase):
+    """
+    Without a shared cache the generation is kept in the database
+    """
+
+    def setUp(self):
+        membership.invalidate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stop = Stop.objects.create(route=self.route, name='A', sequence=1, distance_from_origin=0)
+
+    def test_known_ids_cost_one_generation_read(self):
+        self.assertFalse(membership.shared_cache())
+        membership.get_index()
+        with self.assertNumQueries(1):
+            self.assertTrue(membership.stop_on_route(self.stop.id, self.route.id))
+
+    def test_stop_deleted_elsewhere_is_rejected(self):
+        membership.get_index()
+        Stop.objects.filter(pk=self.stop.id)._raw_delete(Stop.objects.db)
+        # The deleting process bumps the generation row
+        MembershipGeneration.objects.update(value=MembershipGeneration.objects.get().value + 1)
+        self.assertFalse(membership.stop_exists(self.stop.id))
+
+
+class StopPlaceTests(TestCase):
+    """
+    Stops are linked to the physical place matching their name
+    """
+
+    def setUp(self):
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+
+    def test_renamed_stop_moves_to_its_new_place(self):
+        Stop.objects.create(route=self.route, name='Central Library', sequence=1, distance_from_origin=0)
+        stop = Stop.objects.get(name='Central Library')
+
+        stop.name = 'Town Hall'
+        stop.save()
+
+        stop.refresh_from_db()
+        self.assertEqual(stop.place.normalized_name, 'town hall')
+
+    def test_respelled_stop_keeps_its_place(self):
+        stop = Stop.objects.create(route=self.route, name='Central Library', sequence=1, distance_from_origin=0)
+        place = stop.place
+
+        stop = Stop.objects.get(pk=stop.pk)
+        stop.name = 'central library.'
+        stop.save()
+
+        self.assertEqual(Stop.objects.get(pk=stop.pk).place, place)
+
+    def test_place_chosen_by_hand_is_kept_on_rename(self):
+        place = StopPlace.objects.create(name='Interchange')
+        Stop.objects.create(route=self.route, name='Bay 4', sequence=1, distance_from_origin=0, place=place)
+        stop = Stop.objects.get(name='Bay 4')
+
+        stop.name = 'Bay 5'
+        stop.save()
+
+        self.assertEqual(Stop.objects.get(pk=stop.pk).place, place)
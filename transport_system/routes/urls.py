@@ -13,4 +13,6 @@ urlpatterns = [
     path('api/routes/', views.RouteListView.as_view(), name='route-list'),
     path('api/routes/<int:pk>/', views.RouteDetailView.as_view(), name='route-detail'),
     path('api/routes/<int:route_id>/stops/', views.route_stops_view, name='route-stops'),
+    path('api/places/', views.StopPlaceListView.as_view(), name='place-list'),
+    path('api/places/<int:place_id>/', views.stop_place_detail_view, name='place-detail'),
 ]
\ No newline at end of file
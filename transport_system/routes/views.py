@@ -9,9 +9,10 @@ from rest_framework.response import Response
 from django.shortcuts import render
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Sum
 
-from .models import Route, Stop
-from .serializers import RouteSerializer, RouteListSerializer, StopSerializer
+from .models import Route, Stop, StopPlace, normalize_stop_name
+from .serializers import RouteSerializer, RouteListSerializer, StopSerializer, StopPlaceSerializer
 
 # Extra models for dashboard stats
 from schedules.models import Schedule, Bus
@@ -40,18 +41,40 @@ def api_welcome(request):
                 'list': '/api/routes/',
                 'detail': '/api/routes/<id>/',
                 'stops': '/api/routes/<id>/stops/',
+                'forecast': '/api/routes/<id>/forecast/',
+            },
+            'places': {
+                'search': '/api/places/?q=<name>',
+                'detail': '/api/places/<id>/',
+                'departures': '/api/places/<id>/departures/',
             },
             'schedules': {
                 'list': '/api/schedules/',
                 'driver': '/api/schedules/driver/',
+                'next': '/api/schedules/next/',
+                'stop_departures': '/api/stops/<id>/departures/',
+                'expected_load': '/api/schedules/<id>/expected-load/',
             },
             'preinforms': {
                 'create': '/api/preinforms/',
+                'bulk': '/api/preinforms/bulk/',
+                'subscriptions': '/api/preinforms/subscriptions/',
+                'mark_noted': '/api/preinforms/mark-noted/',
+                'my_feed': '/api/preinforms/my/feed/',
                 'list': '/api/preinforms/',
             },
             'demand': {
                 'create': '/api/demand-alerts/',
                 'list': '/api/demand-alerts/',
+                'hotspots': '/api/demand-hotspots/',
+                'dispatch': '/api/demand-alerts/dispatch/',
+                'anomalies': '/api/demand-anomalies/',
+                'resolve': '/api/demand-alerts/resolve/',
+            },
+            'operations': {
+                'performance_summary': '/api/performance/summary/?from=<date>&to=<date>&group_by=week',
+                'jobs': '/api/jobs/',
+                'job_status': '/api/jobs/<id>/',
             },
         }
     })
@@ -120,6 +143,56 @@ def route_stops_view(request, route_id):
         )
 
 
+class StopPlaceListView(generics.ListAPIView):
+    """
+    API view to find physical stops by name
+    
+    GET /api/places/?q=library
+    """
+    serializer_class = StopPlaceSerializer
+    
+    def get_queryset(self):
+        queryset = StopPlace.objects.prefetch_related('stops__route')
+        
+        query = self.request.query_params.get('q')
+        if query:
+            queryset = queryset.filter(normalized_name__contains=normalize_stop_name(query))
+        
+        return queryset
+
+
+@api_view(['GET'])
+def stop_place_detail_view(request, place_id):
+    """
+    Everything at a physical stop: serving routes and open demand
+    
+    GET /api/places/<place_id>/
+    """
+    try:
+        place = StopPlace.objects.prefetch_related('stops__route').get(id=place_id)
+    except StopPlace.DoesNotExist:
+        return Response(
+            {'error': 'Place not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    demand = DemandAlert.objects.active().filter(stop__place_id=place.id).aggregate(
+        alerts=Count('id'),
+        people=Sum('number_of_people')
+    )
+    
+    data = StopPlaceSerializer(place).data
+    data['active_alerts'] = demand['alerts']
+    data['people_reported'] = demand['people'] or 0
+    data['upcoming_preinforms'] = PreInform.objects.filter(
+        boarding_stop__place_id=place.id,
+        date_of_travel__gte=timezone.localdate(),
+        status__in=['pending', 'noted']
+    ).aggregate(passengers=Sum('passenger_count'))['passengers'] or 0
+    
+    return Response(data)
+
+
 @login_required
 def homepage(request):
     """
@@ -150,10 +223,7 @@ def homepage(request):
             status__in=["pending", "noted"],
         ).count()
 
-        active_demand_alerts = DemandAlert.objects.filter(
-            expires_at__gt=timezone.now(),
-            status__in=["reported", "verified", "dispatched"],
-        ).count()
+        active_demand_alerts = DemandAlert.objects.active().count()
 
         # Recent records (tables)
         recent_preinforms = PreInform.objects.select_related(
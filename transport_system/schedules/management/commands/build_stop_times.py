@@ -0,0 +1,46 @@
+"""
+Materialize the stop time index for upcoming service days
+
+Usage:
+    python manage.py build_stop_times
+    python manage.py build_stop_times --date 2024-12-25 --days 7
+"""
+
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from schedules.stop_times import materialize_day
+
+
+class Command(BaseCommand):
+    help = "Interpolate per-stop times for every trip on the given service days"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help="First service day (YYYY-MM-DD, default today)"
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help="Number of consecutive days to build"
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                start = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Date must be in YYYY-MM-DD format")
+        else:
+            start = timezone.localdate()
+
+        for offset in range(options['days']):
+            day = start + timedelta(days=offset)
+            count = materialize_day(day)
+            self.stdout.write(f"{day}: {count} stop time(s)")
+
+        self.stdout.write(self.style.SUCCESS("Stop time index built"))
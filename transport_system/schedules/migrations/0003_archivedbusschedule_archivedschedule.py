@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+        ('schedules', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBusSchedule',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original assignment id', primary_key=True, serialize=False)),
+                ('date', models.DateField(db_index=True)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('bus', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='schedules.bus')),
+                ('route', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='routes.route')),
+            ],
+            options={
+                'verbose_name': 'Archived Bus Assignment',
+                'verbose_name_plural': 'Archived Bus Assignments',
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSchedule',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original schedule id', primary_key=True, serialize=False)),
+                ('date', models.DateField(db_index=True)),
+                ('departure_time', models.TimeField()),
+                ('arrival_time', models.TimeField()),
+                ('total_seats', models.PositiveIntegerField()),
+                ('available_seats', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('bus', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='schedules.bus')),
+                ('driver', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('route', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='routes.route')),
+            ],
+            options={
+                'verbose_name': 'Archived Schedule',
+                'verbose_name_plural': 'Archived Schedules',
+                'ordering': ['date', 'departure_time'],
+            },
+        ),
+    ]
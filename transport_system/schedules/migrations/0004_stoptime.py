@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+        ('schedules', '0003_archivedbusschedule_archivedschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Service day (same as the schedule date)')),
+                ('time', models.TimeField(help_text='Interpolated time at this stop')),
+                ('schedule', models.ForeignKey(help_text='Trip passing this stop', on_delete=django.db.models.deletion.CASCADE, related_name='stop_times', to='schedules.schedule')),
+                ('stop', models.ForeignKey(help_text='Stop being served', on_delete=django.db.models.deletion.CASCADE, related_name='stop_times', to='routes.stop')),
+            ],
+            options={
+                'verbose_name': 'Stop Time',
+                'verbose_name_plural': 'Stop Times',
+                'ordering': ['date', 'time'],
+                'indexes': [models.Index(fields=['stop', 'date', 'time'], name='schedules_s_stop_id_b0aeac_idx')],
+                'unique_together': {('schedule', 'stop')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_places(apps, schema_editor):
+    """Fill StopTime.place from each row's stop"""
+    StopTime = apps.get_model('schedules', 'StopTime')
+    Stop = apps.get_model('routes', 'Stop')
+    StopTime.objects.update(
+        place_id=models.Subquery(
+            Stop.objects.filter(pk=models.OuterRef('stop_id')).values('place_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_link_stops_to_places'),
+        ('schedules', '0004_stoptime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stoptime',
+            name='place',
+            field=models.ForeignKey(help_text='Physical stop (copied from the stop)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stop_times', to='routes.stopplace'),
+        ),
+        migrations.RunPython(copy_places, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='stoptime',
+            index=models.Index(fields=['place', 'date', 'time'], name='schedules_s_place_i_303531_idx'),
+        ),
+    ]
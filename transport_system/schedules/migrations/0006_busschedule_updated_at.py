@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_link_stops_to_places'),
+        ('schedules', '0005_stoptime_place'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='busschedule',
+            index=models.Index(fields=['updated_at'], name='schedules_b_updated_3df3f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['updated_at'], name='schedules_s_updated_d9d264_idx'),
+        ),
+    ]
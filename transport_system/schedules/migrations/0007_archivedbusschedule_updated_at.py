@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0006_busschedule_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbusschedule',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -5,7 +5,7 @@ Manages buses and their schedules
 
 from django.db import models
 from django.conf import settings
-from routes.models import Route
+from routes.models import Route, Stop, StopPlace
 
 
 class Bus(models.Model):
@@ -160,6 +160,10 @@ class Schedule(models.Model):
             ['bus', 'date', 'departure_time'],
             ['driver', 'date', 'departure_time'],
         ]
+        indexes = [
+            # Changed-day scans of the performance rollup job
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.route.number} - {self.date} {self.departure_time} ({self.bus.number_plate})"
@@ -180,11 +184,54 @@ class Schedule(models.Model):
         """
         if self.available_seats >= count:
             self.available_seats -= count
-            self.save()
+            # Seat-only save lets cached timetables patch in place
+            self.save(update_fields=['available_seats', 'updated_at'])
             return True
         return False
 
 
+class StopTime(models.Model):
+    """
+    Stop Time Model
+    Interpolated time a trip reaches each stop, materialized per service day
+    """
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.CASCADE,
+        related_name='stop_times',
+        help_text="Trip passing this stop"
+    )
+    stop = models.ForeignKey(
+        Stop,
+        on_delete=models.CASCADE,
+        related_name='stop_times',
+        help_text="Stop being served"
+    )
+    place = models.ForeignKey(
+        StopPlace,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='stop_times',
+        help_text="Physical stop (copied from the stop)"
+    )
+    date = models.DateField(help_text="Service day (same as the schedule date)")
+    time = models.TimeField(help_text="Interpolated time at this stop")
+    
+    class Meta:
+        verbose_name = 'Stop Time'
+        verbose_name_plural = 'Stop Times'
+        ordering = ['date', 'time']
+        unique_together = [['schedule', 'stop']]
+        indexes = [
+            # Departure boards are a range scan on this index
+            models.Index(fields=['stop', 'date', 'time']),
+            # Departures of every route at a physical stop
+            models.Index(fields=['place', 'date', 'time']),
+        ]
+    
+    def __str__(self):
+        return f"{self.stop.name} at {self.time} on {self.date}"
+
 class BusSchedule(models.Model):
     """
     Bus Assignment Model
@@ -206,10 +253,16 @@ class BusSchedule(models.Model):
     start_time = models.TimeField(help_text="When bus starts this route")
     end_time = models.TimeField(help_text="When bus finishes this route")
     
+    updated_at = models.DateTimeField(auto_now=True)
+    
     class Meta:
         verbose_name = 'Bus Assignment'
         verbose_name_plural = 'Bus Assignments'
         ordering = ['date', 'start_time']
+        indexes = [
+            # Changed-day scans of the performance rollup job
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.bus} on {self.route} - {self.date} {self.start_time}-{self.end_time}"
@@ -220,4 +273,78 @@ class BusSchedule(models.Model):
         start = datetime.combine(self.date, self.start_time)
         end = datetime.combine(self.date, self.end_time)
         duration = (end - start).total_seconds() / 3600
-        return round(duration, 1)
\ No newline at end of file
+        return round(duration, 1)
+
+class ArchivedSchedule(models.Model):
+    """
+    Archived Schedule Model
+    Cold storage for past trips moved out of the live Schedule table
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original schedule id")
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    driver = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    date = models.DateField(db_index=True)
+    departure_time = models.TimeField()
+    arrival_time = models.TimeField()
+    total_seats = models.PositiveIntegerField()
+    available_seats = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Archived Schedule'
+        verbose_name_plural = 'Archived Schedules'
+        ordering = ['date', 'departure_time']
+    
+    def __str__(self):
+        return f"Archived trip {self.id} on {self.date} {self.departure_time}"
+
+
+class ArchivedBusSchedule(models.Model):
+    """
+    Archived Bus Assignment Model
+    Cold storage for past bus assignments
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original assignment id")
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    date = models.DateField(db_index=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    updated_at = models.DateTimeField(null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Archived Bus Assignment'
+        verbose_name_plural = 'Archived Bus Assignments'
+        ordering = ['date', 'start_time']
+    
+    def __str__(self):
+        return f"Archived assignment {self.id} on {self.date}"
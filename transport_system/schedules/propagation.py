@@ -0,0 +1,160 @@
+"""
+Route Timing Propagation
+Recomputes upcoming schedules when a route's timings change
+
+Run as the TASK background job, queued by the operations app.
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils import timezone
+
+from routes.models import Route
+from .models import Schedule
+from . import timetable, stop_times
+from .timetable import time_to_seconds, seconds_to_time
+
+logger = logging.getLogger(__name__)
+
+# Fields on Route that affect schedule timings
+TIMING_FIELDS = ('duration', 'turnaround_time', 'buffer_time')
+
+TASK = 'schedules.propagate_route_timing'
+
+
+def _hours_to_seconds(hours):
+    return int(round(float(hours) * 3600))
+
+
+def _find_conflicts(route, schedule_filter):
+    """
+    Check buses and drivers touched by a propagation
+
+    Reports trips that now start before the previous trip has arrived
+    and turned around, trips that run past midnight, and buses running
+    more trips on the route than calculate_trips_per_day() allows.
+    """
+    rows = list(
+        Schedule.objects.filter(schedule_filter).order_by(
+            'date', 'departure_time'
+        ).values(
+            'id', 'route_id', 'bus_id', 'driver_id', 'date',
+            'departure_time', 'arrival_time',
+            'route__turnaround_time', 'route__buffer_time'
+        )
+    )
+
+    conflicts = []
+    by_bus = defaultdict(list)
+    by_driver = defaultdict(list)
+    for row in rows:
+        by_bus[(row['bus_id'], row['date'])].append(row)
+        by_driver[(row['driver_id'], row['date'])].append(row)
+
+        if row['route_id'] == route.id and row['arrival_time'] < row['departure_time']:
+            conflicts.append({
+                'type': 'overnight',
+                'schedule_id': row['id'],
+                'date': row['date'],
+                'message': 'Trip now arrives after midnight',
+            })
+
+    for kind, groups in (('bus', by_bus), ('driver', by_driver)):
+        for (owner_id, date), trips in groups.items():
+            for previous, current in zip(trips, trips[1:]):
+                ready_at = (
+                    time_to_seconds(previous['arrival_time'])
+                    + _hours_to_seconds(previous['route__turnaround_time'])
+                    + _hours_to_seconds(previous['route__buffer_time'])
+                )
+                if time_to_seconds(current['departure_time']) < ready_at:
+                    conflicts.append({
+                        'type': f'{kind}_overlap',
+                        f'{kind}_id': owner_id,
+                        'schedule_id': current['id'],
+                        'previous_schedule_id': previous['id'],
+                        'date': date,
+                        'message': (
+                            f"Departs at {current['departure_time']} but previous "
+                            f"trip is not ready until {seconds_to_time(ready_at)}"
+                        ),
+                    })
+
+    # Each schedule is one direction, so a round trip is two schedules
+    max_trips = route.calculate_trips_per_day() * 2
+    for (bus_id, date), trips in by_bus.items():
+        on_route = sum(1 for trip in trips if trip['route_id'] == route.id)
+        if on_route > max_trips:
+            conflicts.append({
+                'type': 'capacity',
+                'bus_id': bus_id,
+                'date': date,
+                'message': f"{on_route} trips scheduled, route allows {max_trips}",
+            })
+
+    return conflicts
+
+
+def propagate_route_timing(route_id, batch_size=500):
+    """
+    Recompute arrival times of upcoming schedules on a route
+
+    Rows are rewritten with set-based bulk_update batches rather than
+    one save() per trip. bulk_update skips signals, so the timetable
+    cache and stop time index are refreshed explicitly afterwards.
+
+    Returns:
+        dict: Number of updated trips and any conflicts found
+    """
+    route = Route.objects.get(pk=route_id)
+    duration = _hours_to_seconds(route.duration)
+    now = timezone.now()
+    local_now = timezone.localtime(now)
+
+    # Trips that have already left keep the timing they ran with
+    upcoming = Schedule.objects.filter(route=route).filter(
+        Q(date__gt=local_now.date())
+        | Q(date=local_now.date(), departure_time__gte=local_now.time())
+    )
+
+    changed = []
+    updated = 0
+    rows = upcoming.order_by('pk').only('id', 'date', 'departure_time', 'arrival_time')
+    for schedule in rows.iterator(chunk_size=batch_size):
+        arrival = seconds_to_time(time_to_seconds(schedule.departure_time) + duration)
+        if arrival == schedule.arrival_time:
+            continue
+        schedule.arrival_time = arrival
+        schedule.updated_at = now
+        changed.append(schedule)
+
+        if len(changed) >= batch_size:
+            updated += Schedule.objects.bulk_update(changed, ['arrival_time', 'updated_at'])
+            changed = []
+
+    if changed:
+        updated += Schedule.objects.bulk_update(changed, ['arrival_time', 'updated_at'])
+
+    timetable.invalidate_route(route.id)
+    stop_times.materialize_schedules(upcoming)
+
+    # Check every bus and driver working this route on affected days
+    affected = list(upcoming.values_list('bus_id', 'driver_id', 'date'))
+    conflicts = []
+    if affected:
+        bus_ids, driver_ids, dates = (set(column) for column in zip(*affected))
+        conflicts = _find_conflicts(
+            route,
+            Q(date__in=dates) & (Q(bus_id__in=bus_ids) | Q(driver_id__in=driver_ids))
+        )
+
+    for conflict in conflicts:
+        logger.warning("Route %s timing change: %s", route.number, conflict['message'])
+
+    return {
+        'route_id': route.id,
+        'updated': updated,
+        'conflicts': conflicts,
+    }
@@ -0,0 +1,87 @@
+"""
+Schedules Signals
+Keep timetables and the stop time index in sync
+"""
+
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from routes.models import Stop
+from .models import Bus, Schedule
+from . import timetable, stop_times
+
+# Saves that only touch these fields are patched in place
+SEAT_FIELDS = {'available_seats', 'total_seats', 'updated_at'}
+
+# Fields that place a trip in timetables and stop times
+TRIP_FIELDS = ('route_id', 'bus_id', 'date', 'departure_time', 'arrival_time')
+
+
+def trip_values(schedule):
+    """A trip's TRIP_FIELDS; None for deferred ones"""
+    return tuple(schedule.__dict__.get(field) for field in TRIP_FIELDS)
+
+
+@receiver(post_init, sender=Schedule)
+def schedule_loaded(sender, instance, **kwargs):
+    """Remember where a trip runs so saves can tell if it moved"""
+    instance._loaded_trip = trip_values(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Schedule)
+def schedule_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Patch seat and driver changes, recompile anything else"""
+    if not created and update_fields and set(update_fields) <= SEAT_FIELDS:
+        timetable.patch_seats(instance)
+        return
+
+    trip = trip_values(instance)
+    moved = created or getattr(instance, '_loaded_trip', None) != trip
+    instance._loaded_trip = trip
+    if not moved:
+        timetable.patch_seats(instance)
+        return
+
+    # Route, date or time may have changed: drop old and new entries
+    timetable.invalidate_schedule(instance.id)
+    timetable.invalidate(instance.route_id, instance.date)
+    stop_times.materialize_schedules(Schedule.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Schedule)
+def schedule_deleted(sender, instance, **kwargs):
+    """Remove a deleted trip from cached timetables and boards"""
+    timetable.invalidate_schedule(instance.id)
+    timetable.invalidate(instance.route_id, instance.date)
+    stop_times.invalidate_route_boards(instance.route_id, stop_times.board_dates(instance.date))
+
+
+@receiver(post_save, sender=Stop)
+@receiver(post_delete, sender=Stop)
+def stop_changed(sender, instance, **kwargs):
+    """Re-interpolate upcoming trips when a route's stops change"""
+    timetable.invalidate_route(instance.route_id)
+    stop_times.materialize_schedules(Schedule.objects.filter(
+        route_id=instance.route_id,
+        date__gte=timezone.localdate()
+    ))
+
+
+@receiver(post_init, sender=Bus)
+def bus_loaded(sender, instance, **kwargs):
+    """Remember the service type so changes can be detected on save"""
+    instance._loaded_service_type = instance.service_type
+
+
+@receiver(post_save, sender=Bus)
+def bus_saved(sender, instance, created, **kwargs):
+    """Rebuild upcoming stop patterns when a bus changes service type"""
+    if created or instance.service_type == instance._loaded_service_type:
+        return
+    instance._loaded_service_type = instance.service_type
+
+    upcoming = Schedule.objects.filter(bus=instance, date__gte=timezone.localdate())
+    for route_id in set(upcoming.values_list('route_id', flat=True)):
+        timetable.invalidate_route(route_id)
+    stop_times.materialize_schedules(upcoming)
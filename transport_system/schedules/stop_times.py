@@ -0,0 +1,222 @@
+"""
+Stop Time Index
+Interpolates each trip's time at every stop and serves departure boards
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from routes.models import Stop
+from routes.patterns import get_patterns
+from .models import Schedule, StopTime
+from .timetable import time_to_seconds, seconds_to_time
+
+
+def interpolate_time(departure, arrival, distance, total_distance):
+    """
+    Estimate when a trip reaches a stop
+
+    Assumes constant speed between origin and destination.
+    Trips that arrive after midnight are handled by wrapping.
+    """
+    start = time_to_seconds(departure)
+    end = time_to_seconds(arrival)
+    if end < start:
+        end += 86400
+
+    if not total_distance:
+        return departure
+
+    fraction = min(max(float(distance) / float(total_distance), 0.0), 1.0)
+    return seconds_to_time(start + (end - start) * fraction)
+
+
+def _stops_by_route(route_ids):
+    """Load stops for many routes with a single query"""
+    stops = defaultdict(list)
+    for stop in Stop.objects.filter(route_id__in=route_ids).order_by('sequence'):
+        stops[stop.route_id].append(stop)
+    return stops
+
+
+def _build_rows(schedules, stops_by_route, patterns):
+    """
+    Create unsaved StopTime rows for the given trips
+
+    Stops skipped by a trip's service type get no row, so departure
+    boards never see trips that do not serve the stop.
+    """
+    rows = []
+    for schedule in schedules:
+        total_distance = schedule.route.total_distance
+        pattern = patterns[schedule.route_id]
+        mask = pattern.mask(schedule.bus.service_type)
+        for stop in stops_by_route.get(schedule.route_id, []):
+            if not mask & pattern.bit(stop.id):
+                continue
+            time = interpolate_time(
+                schedule.departure_time,
+                schedule.arrival_time,
+                stop.distance_from_origin,
+                total_distance
+            )
+            rows.append(StopTime(
+                schedule_id=schedule.id,
+                stop_id=stop.id,
+                place_id=stop.place_id,
+                # Past midnight the stop is reached the next day
+                date=schedule.date + timedelta(days=1) if time < schedule.departure_time else schedule.date,
+                time=time
+            ))
+    return rows
+
+
+def _invalidate_boards(stop_ids, dates):
+    cache.delete_many([
+        board_cache_key(stop_id, date)
+        for stop_id in stop_ids
+        for date in dates
+    ])
+
+
+def invalidate_route_boards(route_id, dates):
+    """Drop cached boards for every stop on a route"""
+    stop_ids = Stop.objects.filter(route_id=route_id).values_list('id', flat=True)
+    _invalidate_boards(list(stop_ids), dates)
+
+
+def invalidate_trip_boards(trips):
+    """
+    Drop cached boards for the stops of many trips with one Stop query
+
+    Args:
+        trips: Iterable of (route_id, date) pairs
+    """
+    dates_by_route = defaultdict(set)
+    for route_id, date in trips:
+        dates_by_route[route_id].add(date)
+
+    stops = Stop.objects.filter(route_id__in=dates_by_route).values_list('route_id', 'id')
+    cache.delete_many([
+        board_cache_key(stop_id, date)
+        for route_id, stop_id in stops
+        for date in dates_by_route[route_id]
+    ])
+
+
+def materialize_schedules(schedules):
+    """
+    Rebuild stop times for a set of trips
+
+    Args:
+        schedules: Schedule queryset
+
+    Returns:
+        int: Number of stop time rows written
+    """
+    schedules = list(schedules.select_related('route', 'bus'))
+    if not schedules:
+        return 0
+
+    route_ids = {s.route_id for s in schedules}
+    stops_by_route = _stops_by_route(route_ids)
+    rows = _build_rows(schedules, stops_by_route, get_patterns(route_ids))
+
+    with transaction.atomic():
+        StopTime.objects.filter(schedule__in=[s.id for s in schedules]).delete()
+        StopTime.objects.bulk_create(rows, batch_size=1000)
+
+    # Include stops that just lost service, not only those with rows
+    _invalidate_boards(
+        [stop.id for stops in stops_by_route.values() for stop in stops],
+        {date for s in schedules for date in board_dates(s.date)}
+    )
+    return len(rows)
+
+
+def materialize_day(date):
+    """Rebuild the stop time index for one service day"""
+    return materialize_schedules(Schedule.objects.filter(date=date))
+
+
+def board_dates(date):
+    """Days whose boards can list a trip of the given day"""
+    return [date, date + timedelta(days=1)]
+
+
+def board_cache_key(stop_id, date):
+    return f"departure-board:{stop_id}:{date.isoformat()}"
+
+
+def _board_rows(rows):
+    """Departure board entries for StopTime rows, in time order"""
+    return [
+        {
+            'schedule_id': row['schedule_id'],
+            'time': row['time'],
+            'route_id': row['schedule__route_id'],
+            'route_number': row['schedule__route__number'],
+            'destination': row['schedule__route__destination'],
+            'bus': row['schedule__bus__number_plate'],
+            'service_type': row['schedule__bus__service_type'],
+            'available_seats': row['schedule__available_seats'],
+        }
+        for row in rows.order_by('time').values(
+            'schedule_id',
+            'time',
+            'schedule__route_id',
+            'schedule__route__number',
+            'schedule__route__destination',
+            'schedule__bus__number_plate',
+            'schedule__bus__service_type',
+            'schedule__available_seats',
+        )
+    ]
+
+
+def _load_board(stop_id, date):
+    """Fetch a stop's departures for a day with one range scan"""
+    return _board_rows(StopTime.objects.filter(stop_id=stop_id, date=date))
+
+
+def departure_board(stop_id, date, after=None, limit=None):
+    """
+    Get departures from a stop, cached per stop and day
+
+    Args:
+        after: Only include departures at or after this time
+        limit: Maximum number of departures
+    """
+    key = board_cache_key(stop_id, date)
+    board = cache.get(key)
+    if board is None:
+        board = _load_board(stop_id, date)
+        cache.set(key, board, getattr(settings, 'DEPARTURE_BOARD_CACHE_TTL', 30))
+
+    if after is not None:
+        times = [entry['time'] for entry in board]
+        board = board[bisect_left(times, after):]
+    if limit:
+        board = board[:limit]
+    return board
+
+
+def place_departures(place_id, date, after=None, limit=None):
+    """
+    Get departures of every route serving a physical stop
+
+    One range scan on the (place, date, time) index; not cached, since
+    it would need invalidating for every route at the place.
+    """
+    rows = StopTime.objects.filter(place_id=place_id, date=date)
+    if after is not None:
+        rows = rows.filter(time__gte=after)
+    board = _board_rows(rows)
+    if limit:
+        board = board[:limit]
+    return board
@@ -1,3 +1,242 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from operations.models import Job
+from routes.models import Route, Stop
+from users.models import CustomUser
+from .models import Bus, Schedule
+from .propagation import TASK, propagate_route_timing
+from . import timetable
+
+
+@override_settings(JOB_RUNNER='worker')
+class RouteTimingTests(TestCase):
+    """
+    Route timing changes are retimed in a job whose conflicts reach the admin
+    """
+
+    def setUp(self):
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+
+    def test_only_timing_changes_queue_propagation(self):
+        route = Route.objects.get(pk=self.route.pk)
+        route.name = 'Renamed'
+        route.save()
+        self.assertFalse(Job.objects.exists())
+
+        route.duration = Decimal('1.5')
+        route.save()
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.arguments), (TASK, {'route_id': route.pk}))
+
+    def test_trips_that_already_left_keep_their_timing(self):
+        driver = CustomUser.objects.create_user(email='d@x.com', password='x', role='driver')
+        bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+        today = timezone.localdate()
+        trips = [
+            Schedule.objects.create(
+                route=self.route, bus=bus, driver=driver, date=date,
+                departure_time=time(hour), arrival_time=time(hour + 1),
+                total_seats=40, available_seats=40
+            )
+            for date, hour in ((today, 8), (today, 14), (today + timedelta(days=1), 8))
+        ]
+        Route.objects.filter(pk=self.route.pk).update(duration=Decimal('1.5'))
+
+        noon = timezone.make_aware(datetime.combine(today, time(12)))
+        with mock.patch('django.utils.timezone.now', return_value=noon):
+            result = propagate_route_timing(self.route.pk)
+
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual(
+            [Schedule.objects.get(pk=trip.pk).arrival_time for trip in trips],
+            [time(9), time(15, 30), time(9, 30)]
+        )
+
+    def test_admin_page_lists_conflicts(self):
+        Job.objects.create(
+            task=TASK,
+            arguments={'route_id': self.route.pk},
+            status='succeeded',
+            result={'route_id': self.route.pk, 'updated': 1, 'conflicts': [{
+                'type': 'overnight',
+                'schedule_id': 7,
+                'date': '2026-10-20',
+                'message': 'Trip now arrives after midnight',
+            }]},
+        )
+        self.client.force_login(CustomUser.objects.create_superuser(email='a@x.com', password='x'))
+
+        response = self.client.get(f'/admin/routes/route/{self.route.pk}/change/')
+
+        self.assertContains(response, 'Trip #7 on 2026-10-20: Trip now arrives after midnight')
+
+
+class NextDeparturesTests(TestCase):
+    """
+    Upcoming departures come from the compiled timetable
+    """
+
+    def setUp(self):
+        timetable.clear()
+        self.addCleanup(timetable.clear)
+        self.date = timezone.localdate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        driver = CustomUser.objects.create_user(email='d@x.com', password='x', role='driver')
+        bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+        self.schedules = [
+            Schedule.objects.create(
+                route=self.route, bus=bus, driver=driver, date=self.date,
+                departure_time=time(hour), arrival_time=time(hour + 1),
+                total_seats=40, available_seats=40
+            )
+            for hour in (8, 10)
+        ]
+
+    def next_departures(self, **params):
+        params = {'route_id': self.route.id, 'date': self.date.isoformat(), **params}
+        return self.client.get('/api/schedules/next/', params)
+
+    def test_cached_timetable_is_reused_and_patched_for_seats(self):
+        timetable.get_timetable(self.route.id, self.date)
+        with self.assertNumQueries(0):
+            timetable.get_timetable(self.route.id, self.date)
+
+        first = Schedule.objects.get(pk=self.schedules[0].pk)
+        first.available_seats = 0
+        first.save(update_fields=['available_seats', 'updated_at'])
+
+        with self.assertNumQueries(0):
+            response = self.next_departures(after='07:00', with_seats='true')
+        self.assertEqual(
+            [row['schedule_id'] for row in response.json()['departures']], [self.schedules[1].id]
+        )
+
+    def test_invalidation_during_compile_is_not_cached(self):
+        compile_timetable = timetable.compile_timetable
+
+        def compile_then_retime(route_id, date):
+            compiled = compile_timetable(route_id, date)
+            # Another request retimes a trip before this compile is stored
+            Schedule.objects.filter(pk=self.schedules[0].pk).update(departure_time=time(9))
+            timetable.invalidate(route_id, date)
+            return compiled
+
+        with mock.patch.object(timetable, 'compile_timetable', compile_then_retime):
+            timetable.get_timetable(self.route.id, self.date)
+
+        departures = timetable.get_timetable(self.route.id, self.date).departures_after(time(0))
+        self.assertEqual(departures[0]['departure_time'], time(9))
+
+    def test_limit_and_bad_params(self):
+        response = self.next_departures(after='07:00', limit=1)
+        self.assertEqual(len(response.json()['departures']), 1)
+
+        for params in ({'route_id': 'x'}, {'after': '7am'}, {'limit': 'all'}, {'date': '20-10-2026'}):
+            self.assertEqual(self.next_departures(**params).status_code, 400)
+
+    def test_route_without_stops_lists_its_trips(self):
+        response = self.next_departures(after='07:00')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['schedule_id'] for row in response.json()['departures']],
+            [schedule.id for schedule in self.schedules]
+        )
+
+
+class StopTimeTests(TestCase):
+    """
+    Stop times follow their trip and feed the departure boards
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.date = timezone.localdate()
+        self.route = Route.objects.create(
+            number='101', name='R', origin='A', destination='B',
+            total_distance=Decimal('20'), duration=Decimal('1.0')
+        )
+        self.stops = [
+            Stop.objects.create(route=self.route, name=name, sequence=i, distance_from_origin=distance)
+            for i, (name, distance) in enumerate((('A', 0), ('M', 10), ('B', 20)), 1)
+        ]
+        self.bus = Bus.objects.create(number_plate='KL-1', capacity=40)
+        self.driver = CustomUser.objects.create_user(email='d@x.com', password='x', role='driver')
+
+    def trip(self, departure, arrival):
+        return Schedule.objects.create(
+            route=self.route, bus=self.bus, driver=self.driver, date=self.date,
+            departure_time=departure, arrival_time=arrival,
+            total_seats=40, available_seats=40
+        )
+
+    def board(self, stop, date):
+        return self.client.get(f'/api/stops/{stop.id}/departures/', {
+            'date': date.isoformat(), 'after': '00:00'
+        }).json()['departures']
+
+    def test_stops_past_midnight_belong_to_the_next_day(self):
+        schedule = self.trip(time(23, 30), time(0, 30))
+
+        self.assertEqual(
+            list(schedule.stop_times.order_by('stop__sequence').values_list('date', 'time')),
+            [
+                (self.date, time(23, 30)),
+                (self.date + timedelta(days=1), time(0, 0)),
+                (self.date + timedelta(days=1), time(0, 30)),
+            ]
+        )
+        self.assertEqual(self.board(self.stops[2], self.date), [])
+        self.assertEqual(
+            [row['schedule_id'] for row in self.board(self.stops[2], self.date + timedelta(days=1))],
+            [schedule.id]
+        )
+
+    def test_only_trip_changes_rebuild_stop_times(self):
+        schedule = self.trip(time(8), time(9))
+        ids = set(schedule.stop_times.values_list('id', flat=True))
+        self.assertEqual(self.board(self.stops[1], self.date)[0]['time'], '08:30:00')
+
+        schedule = Schedule.objects.get(pk=schedule.pk)
+        schedule.driver = CustomUser.objects.create_user(email='e@x.com', password='x', role='driver')
+        schedule.available_seats = 30
+        schedule.save()
+        self.assertEqual(set(schedule.stop_times.values_list('id', flat=True)), ids)
+
+        schedule.departure_time, schedule.arrival_time = time(10), time(11)
+        schedule.save()
+        self.assertFalse(schedule.stop_times.filter(id__in=ids).exists())
+        # The cached board is dropped with the old stop times
+        self.assertEqual(self.board(self.stops[1], self.date)[0]['time'], '10:30:00')
+
+    def test_board_skips_trips_that_do_not_serve_the_stop(self):
+        express = self.trip(time(8), time(9))
+        local = Schedule.objects.create(
+            route=self.route, bus=Bus.objects.create(number_plate='KL-2', capacity=40),
+            driver=self.driver, date=self.date,
+            departure_time=time(10), arrival_time=time(11),
+            total_seats=40, available_seats=40
+        )
+        self.assertEqual(len(self.board(self.stops[1], self.date)), 2)
+
+        self.bus.service_type = 'express'
+        self.bus.save()
+
+        self.assertEqual(
+            [row['schedule_id'] for row in self.board(self.stops[1], self.date)], [local.id]
+        )
+        self.assertEqual(
+            [row['schedule_id'] for row in self.board(self.stops[0], self.date)], [express.id, local.id]
+        )
@@ -0,0 +1,238 @@
+"""
+Compiled Timetables
+Keeps each route's daily timetable in memory as sorted arrays
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import time
+
+from django.conf import settings
+
+from routes.patterns import get_pattern
+from .models import Schedule
+
+
+def time_to_seconds(value):
+    """Convert a time object to seconds since midnight"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def seconds_to_time(seconds):
+    """Convert seconds since midnight back to a time object"""
+    seconds = int(seconds) % 86400
+    return time(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+
+
+class CompiledTimetable:
+    """
+    One route's timetable for one day
+
+    Departures are kept sorted so lookups are a binary search.
+    Seat counts live in a parallel array and can be patched in place.
+    Each trip also carries its service type's stop pattern bitset so
+    stop-specific lookups skip trips that do not serve the stop.
+    """
+    __slots__ = (
+        'route_id',
+        'date',
+        'schedule_ids',
+        'departures',
+        'arrivals',
+        'total_seats',
+        'available_seats',
+        'stop_masks',
+        'pattern',
+        'positions',
+    )
+
+    def __init__(self, route_id, date, rows, pattern):
+        """
+        Args:
+            rows: (id, departure_time, arrival_time, total_seats, available_seats,
+                  service_type) tuples sorted by departure time
+            pattern: routes.patterns.StopPattern for the route
+        """
+        self.route_id = route_id
+        self.date = date
+        self.pattern = pattern
+        self.schedule_ids = array('q')
+        self.departures = array('l')
+        self.arrivals = array('l')
+        self.total_seats = array('l')
+        self.available_seats = array('l')
+        # Plain ints: routes can have more than 64 stops
+        self.stop_masks = []
+        self.positions = {}
+
+        for schedule_id, departure, arrival, total, available, service_type in rows:
+            self.positions[schedule_id] = len(self.schedule_ids)
+            self.schedule_ids.append(schedule_id)
+            self.departures.append(time_to_seconds(departure))
+            self.arrivals.append(time_to_seconds(arrival))
+            self.total_seats.append(total)
+            self.available_seats.append(available)
+            self.stop_masks.append(pattern.mask(service_type))
+
+    def __len__(self):
+        return len(self.schedule_ids)
+
+    def entry(self, index):
+        """Build a plain dict for the trip at the given position"""
+        return {
+            'schedule_id': self.schedule_ids[index],
+            'departure_time': seconds_to_time(self.departures[index]),
+            'arrival_time': seconds_to_time(self.arrivals[index]),
+            'total_seats': self.total_seats[index],
+            'available_seats': self.available_seats[index],
+        }
+
+    def departures_after(self, after, limit=None, with_seats=False, stop_id=None):
+        """
+        Get trips leaving at or after the given time
+
+        Args:
+            after: time object
+            limit: Maximum number of trips to return
+            with_seats: Skip trips that are full
+            stop_id: Only include trips whose service type serves this stop
+        """
+        index = bisect_left(self.departures, time_to_seconds(after))
+        stop_bit = self.pattern.bit(stop_id) if stop_id is not None else None
+        results = []
+        while index < len(self.schedule_ids):
+            serves_stop = stop_bit is None or self.stop_masks[index] & stop_bit
+            has_seats = not with_seats or self.available_seats[index] > 0
+            if serves_stop and has_seats:
+                results.append(self.entry(index))
+                if limit and len(results) >= limit:
+                    break
+            index += 1
+        return results
+
+    def next_departure(self, after, with_seats=False, stop_id=None):
+        """Get the first trip leaving at or after the given time"""
+        results = self.departures_after(
+            after, limit=1, with_seats=with_seats, stop_id=stop_id
+        )
+        return results[0] if results else None
+
+    def patch_seats(self, schedule_id, available_seats, total_seats=None):
+        """Update seat counts for one trip without recompiling"""
+        index = self.positions.get(schedule_id)
+        if index is None:
+            return False
+        self.available_seats[index] = available_seats
+        if total_seats is not None:
+            self.total_seats[index] = total_seats
+        return True
+
+
+_timetables = OrderedDict()
+_lock = threading.Lock()
+# Bumped by every invalidation; a compile that overlapped one is not cached
+_generation = 0
+
+
+def _cache_size():
+    return getattr(settings, 'TIMETABLE_CACHE_SIZE', 512)
+
+
+def compile_timetable(route_id, date):
+    """Build a timetable for a route and date from the database"""
+    rows = Schedule.objects.filter(
+        route_id=route_id,
+        date=date
+    ).order_by('departure_time', 'id').values_list(
+        'id', 'departure_time', 'arrival_time', 'total_seats', 'available_seats',
+        'bus__service_type'
+    )
+    return CompiledTimetable(route_id, date, rows, get_pattern(route_id))
+
+
+def get_timetable(route_id, date):
+    """
+    Get the compiled timetable for a route and date
+
+    Compiles it on first use and keeps it until a schedule change
+    invalidates it or it falls out of the cache.
+    """
+    key = (int(route_id), date)
+    with _lock:
+        timetable = _timetables.get(key)
+        if timetable is not None:
+            _timetables.move_to_end(key)
+            return timetable
+        generation = _generation
+
+    # Compiled outside the lock so other routes are not held up
+    timetable = compile_timetable(*key)
+
+    with _lock:
+        # An invalidation during the compile may have missed the rows read
+        if generation == _generation:
+            _timetables[key] = timetable
+            while len(_timetables) > _cache_size():
+                _timetables.popitem(last=False)
+    return timetable
+
+
+def _bump():
+    """Record an invalidation; called with the lock held"""
+    global _generation
+    _generation += 1
+
+
+def invalidate(route_id, date):
+    """Drop the cached timetable for a route and date"""
+    with _lock:
+        _bump()
+        _timetables.pop((route_id, date), None)
+
+
+def invalidate_route(route_id):
+    """Drop cached timetables for every date of a route"""
+    with _lock:
+        _bump()
+        stale = [key for key in _timetables if key[0] == route_id]
+        for key in stale:
+            del _timetables[key]
+
+
+def invalidate_schedule(schedule_id):
+    """Drop every cached timetable that contains the given trip"""
+    with _lock:
+        _bump()
+        stale = [
+            key for key, timetable in _timetables.items()
+            if schedule_id in timetable.positions
+        ]
+        for key in stale:
+            del _timetables[key]
+
+
+def patch_seats(schedule):
+    """
+    Apply a seat change to the cached timetable in place
+
+    Returns:
+        bool: True if a cached entry was patched
+    """
+    with _lock:
+        timetable = _timetables.get((schedule.route_id, schedule.date))
+        if timetable is None:
+            return False
+        return timetable.patch_seats(
+            schedule.id,
+            schedule.available_seats,
+            schedule.total_seats
+        )
+
+
+def clear():
+    """Drop all cached timetables"""
+    with _lock:
+        _bump()
+        _timetables.clear()
@@ -12,6 +12,9 @@ urlpatterns = [
     # API endpoints
     path('api/schedules/', views.ScheduleListView.as_view(), name='schedule-list'),
     path('api/schedules/driver/', views.driver_schedules_view, name='driver-schedules'),
+    path('api/schedules/next/', views.next_departures_view, name='next-departures'),
+    path('api/stops/<int:stop_id>/departures/', views.stop_departures_view, name='stop-departures'),
+    path('api/places/<int:place_id>/departures/', views.place_departures_view, name='place-departures'),
     path('api/buses/nearby/', views.nearby_buses, name='nearby-buses'),
     path('api/buses/update-location/', views.update_bus_location, name='update-bus-location'),
     path('api/buses/<int:bus_id>/', views.bus_details, name='bus-details'),
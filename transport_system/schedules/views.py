@@ -11,11 +11,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 from django.shortcuts import render
-from datetime import timedelta
+from datetime import datetime, timedelta
 import math
 
 from .models import Schedule, Bus
 from .serializers import ScheduleSerializer, LiveBusSerializer, BusLocationSerializer
+from . import timetable, stop_times
 
 
 class ScheduleListView(generics.ListAPIView):
@@ -78,6 +79,119 @@ def driver_schedules_view(request):
     return Response(serializer.data)
 
 
+def _board_params(request, default_limit=10, max_limit=100):
+    """
+    Parse date, after and limit params of departure lookups
+    
+    Returns:
+        tuple: (date, after, limit)
+    
+    Raises:
+        ValueError: If a param is malformed
+    """
+    now = timezone.localtime()
+    date_param = request.GET.get('date')
+    date = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else now.date()
+    after_param = request.GET.get('after')
+    after = datetime.strptime(after_param, '%H:%M').time() if after_param else now.time()
+    limit = max(1, min(int(request.GET.get('limit', default_limit)), max_limit))
+    return date, after, limit
+
+
+@api_view(['GET'])
+def next_departures_view(request):
+    """
+    Get upcoming departures for a route from the compiled timetable
+    
+    GET /api/schedules/next/?route_id=1&date=2024-12-25&after=09:00&limit=5
+    Optional params:
+    - date: Service date (default today)
+    - after: Time of day HH:MM (default now)
+    - limit: Number of departures (default 5)
+    - with_seats: Skip full trips (true/false)
+    - stop_id: Only trips whose service type stops here
+    """
+    try:
+        route_id = int(request.GET.get('route_id'))
+        date, after, limit = _board_params(request, default_limit=5, max_limit=50)
+        stop_id = request.GET.get('stop_id')
+        stop_id = int(stop_id) if stop_id else None
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Provide route_id, and optionally date (YYYY-MM-DD), after (HH:MM), limit and stop_id.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    with_seats = request.GET.get('with_seats', 'false').lower() == 'true'
+    compiled = timetable.get_timetable(route_id, date)
+    departures = compiled.departures_after(
+        after, limit=limit, with_seats=with_seats, stop_id=stop_id
+    )
+    
+    return Response({
+        'route_id': route_id,
+        'date': date,
+        'after': after.strftime('%H:%M'),
+        'stop_id': stop_id,
+        'departures': departures,
+    })
+
+
+@api_view(['GET'])
+def stop_departures_view(request, stop_id):
+    """
+    Departure board for a stop from the interpolated stop time index
+    
+    GET /api/stops/<stop_id>/departures/?date=2024-12-25&after=09:00&limit=10
+    Optional params:
+    - date: Service date (default today)
+    - after: Time of day HH:MM (default now)
+    - limit: Number of departures (default 10)
+    """
+    try:
+        date, after, limit = _board_params(request)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Optional params: date (YYYY-MM-DD), after (HH:MM) and limit.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    departures = stop_times.departure_board(stop_id, date, after=after, limit=limit)
+    
+    return Response({
+        'stop_id': stop_id,
+        'date': date,
+        'after': after.strftime('%H:%M'),
+        'departures': departures,
+    })
+
+
+@api_view(['GET'])
+def place_departures_view(request, place_id):
+    """
+    Departures of every route serving a physical stop
+    
+    GET /api/places/<place_id>/departures/?date=2024-12-25&after=09:00&limit=10
+    Same optional params as the stop departure board.
+    """
+    try:
+        date, after, limit = _board_params(request)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Optional params: date (YYYY-MM-DD), after (HH:MM) and limit.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    departures = stop_times.place_departures(place_id, date, after=after, limit=limit)
+    
+    return Response({
+        'place_id': place_id,
+        'date': date,
+        'after': after.strftime('%H:%M'),
+        'departures': departures,
+    })
+
+
 @api_view(['GET'])
 def nearby_buses(request):
     """
@@ -108,6 +108,17 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "transport-system",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -183,3 +194,64 @@ REST_FRAMEWORK = {
 
 TICKET_PRICE_PER_KM = 10  # ₹10 per kilometer
 FUEL_PRICE_PER_LITER = 80
+
+# Number of (route, date) timetables kept compiled in memory
+TIMETABLE_CACHE_SIZE = 512
+
+# Rows older than this many days are moved to archive tables
+ARCHIVE_AFTER_DAYS = 180
+
+# Seconds a stop's departure board stays cached
+DEPARTURE_BOARD_CACHE_TTL = 30
+
+# Maximum pre-informs accepted by one bulk submission
+PREINFORM_BULK_MAX_ITEMS = 200
+
+# Days ahead that open-ended reports expand recurring pre-inform subscriptions
+SUBSCRIPTION_HORIZON_DAYS = 28
+
+# Weeks of history used to train demand forecasts
+FORECAST_TRAINING_WEEKS = 12
+
+# Seconds a trained forecast stays cached for the forecast endpoint
+FORECAST_CACHE_TTL = 300
+
+# Default page size of the "my pre-informs" feed
+PREINFORM_FEED_PAGE_SIZE = 20
+
+# Crowd reports at a stop within this many minutes of each other form one hotspot
+HOTSPOT_WINDOW_MINUTES = 15
+
+# Seconds the in-memory hotspot board is served before reloading
+HOTSPOT_REFRESH_SECONDS = 5
+
+# Trips passing a stop within this many minutes are considered for dispatch
+DISPATCH_LOOKAHEAD_MINUTES = 60
+
+# Seconds the active demand alert feed is shared between clients
+ACTIVE_ALERTS_CACHE_TTL = 5
+
+# Crowd reports allowed per user and stop in a burst, and seconds to earn one more
+DEMAND_ALERT_BURST = 3
+DEMAND_ALERT_REFILL_SECONDS = 300
+
+# Cache alias holding crowd report rate limits across workers (None keeps them in process)
+DEMAND_ALERT_THROTTLE_CACHE = None
+
+# Where the demand anomaly detector snapshots its state, and how often.
+# Off by default: without a snapshot each process rebuilds its
+# statistics from the database on first use. Each process keeps its own
+# state, so give every worker its own file outside the source tree, e.g.
+# /var/lib/transport/demand_anomalies-<worker>.snapshot
+ANOMALY_SNAPSHOT_PATH = None
+ANOMALY_SNAPSHOT_SECONDS = 300
+
+# Where background jobs run: 'thread' in a pool inside the web process
+# (development), 'worker' in python manage.py run_jobs processes
+JOB_RUNNER = 'thread'
+JOB_THREADS = 2
+JOB_POLL_SECONDS = 2
+
+# Seconds the rollup watermark is kept behind a refresh, so rows committed
+# late by long transactions are still picked up
+ROLLUP_WATERMARK_LAG_SECONDS = 300